@@ -0,0 +1,307 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#    ******  The Cloud Toolbox v0.1.2******
+#    This is the cloud toolbox -- a single module used in several packages
+#    found at <https://github.com/cloudformdesign>
+#    For more information see <cloudformdesign.com>
+#
+#    This module may be a part of a python package, and may be out of date.
+#    This behavior is intentional, do NOT update it.
+#    
+#    You are encouraged to use this pacakge, or any code snippets in it, in
+#    your own projects. Hopefully they will be helpful to you!
+#        
+#    This project is Licenced under The MIT License (MIT)
+#    
+#    Copyright (c) 2013 Garrett Berg cloudformdesign.com
+#    An updated version of this file can be found at:
+#    <https://github.com/cloudformdesign/cloudtb>
+#    
+#    Permission is hereby granted, free of charge, to any person obtaining a 
+#    copy of this software and associated documentation files (the "Software"),
+#    to deal in the Software without restriction, including without limitation 
+#    the rights to use, copy, modify, merge, publish, distribute, sublicense,
+#    and/or sell copies of the Software, and to permit persons to whom the 
+#    Software is furnished to do so, subject to the following conditions:
+#    
+#    The above copyright notice and this permission notice shall be included in
+#    all copies or substantial portions of the Software.
+#    
+#    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL 
+#    THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+#    FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
+#    DEALINGS IN THE SOFTWARE.
+#
+#    http://opensource.org/licenses/MIT
+'''
+asyncio counterparts of the iteration module's biter, soliditer and
+solidslice, for async producers (streams, async generators...).
+
+Python 3.5+ only -- this module is kept apart from iteration so that
+iteration still works on python 2.
+
+Usage:
+    s = asoliditer(read_messages(stream))
+    header = await s.peek(30)       # look 30 values ahead
+    first = await s.take(10)        # and take 10 off the front
+    async for value in s[0:100:2]:
+        ...
+'''
+import asyncio
+import collections
+import itertools as itools
+
+import classtools
+import iteration
+from errors import RequestError  # raised by the hard limit, catch it from here
+
+async def _from_sync(iterable):
+    for value in iterable:
+        yield value
+
+def aiter_of(iterable):
+    '''returns an async iterator over iterable, which can be async or a
+    normal (sync) iterable'''
+    if hasattr(iterable, '__aiter__'):
+        return iterable.__aiter__()
+    return _from_sync(iterable)
+
+class abiter(object):
+    '''async biter: async iterates through async (or normal) iterables that
+    you can append to or extend on the back or the front as you go.
+
+    Usage:
+        b = abiter(source())
+        b.front_extend(range(3))
+        async for value in b:
+            ...
+    Slicing gives an async iterator that consumes from the abiter, the same
+    as slicing a biter does.
+    '''
+    def __init__(self, iterable = ()):
+        self._iters = collections.deque((aiter_of(iterable),))
+
+    def append(self, value):
+        self._iters.append(aiter_of((value,)))
+
+    def extend(self, iterable):
+        self._iters.append(aiter_of(iterable))
+
+    def front_extend(self, iterable):
+        self._iters.appendleft(aiter_of(iterable))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        iters = self._iters
+        while iters:
+            try:
+                return await iters[0].__anext__()
+            except StopAsyncIteration:
+                iters.popleft()
+        raise StopAsyncIteration
+
+    async def take(self, n):
+        '''returns a tuple of the next n values (less if it runs out)'''
+        out = []
+        append = out.append
+        async for value in self[:n]:
+            append(value)
+        return tuple(out)
+
+    async def chunks(self, n):
+        '''async yields tuples of n values until the abiter is exhausted'''
+        while True:
+            chunk = await self.take(n)
+            if not chunk:
+                return
+            yield chunk
+
+    def __getitem__(self, item):
+        if type(item) != slice:
+            raise TypeError("abiter can only be sliced, use take")
+        return _aislice(self, *classtools.slice_synatx(item))
+
+async def _aislice(aiterable, start, stop, step):
+    '''async itools.islice'''
+    if stop != None and stop <= start:
+        return
+    index = 0
+    next_index = start
+    async for value in aiterable:
+        if index == next_index:
+            yield value
+            next_index += step
+            if stop != None and next_index >= stop:
+                return
+        index += 1
+
+class asoliditer(object):
+    '''async soliditer: an async iterator you can look ahead into.
+
+    Looking ahead (peek, take, slicing) awaits the source, so other
+    coroutines keep running while it is read. readahead(n) fills the buffer
+    on a background task so the reading overlaps with your own processing.
+    Only one refill reads the source at a time.
+
+    Values are buffered the same way as soliditer -- give a typecode for
+    unboxed (numpy or array) storage.
+    '''
+    def __init__(self, iterable, default_buf = 10, request_hard_limit = None,
+                 slicetype = tuple, typecode = None):
+        self._databuf = iteration._make_buffer(typecode)
+        self._iterbuf = []
+        self._lock = asyncio.Lock()
+        self.default_buf = default_buf
+        self.request_hard_limit = request_hard_limit
+        self.slicetype = slicetype
+        self.typecode = typecode
+        self.extend(iterable)
+
+    def buffer_size(self):
+        return len(self._databuf)
+
+    def front_extend(self, iterable):
+        '''adds data onto the front'''
+        self._databuf.front_extend(iterable)
+
+    def extend(self, iterable):
+        '''adds data (async or not) onto the end'''
+        self._iterbuf.append(aiter_of(iterable))
+
+    def append(self, item):
+        self.extend((item,))
+
+    async def insert(self, index, item):
+        await self.internal_extend(index)
+        self._databuf.insert(index, item)
+
+    async def internal_extend(self, need_length):
+        '''reads the sources until the buffer has need_length values
+        returns whether it made it'''
+        if need_length <= len(self._databuf):
+            return True
+        hlimit = self.request_hard_limit
+        if hlimit != None and need_length - len(self._databuf) > hlimit:
+            raise RequestError("extend higher than hard limit",
+                               need_length - len(self._databuf))
+        async with self._lock:
+            buffer, iterbuf = self._databuf, self._iterbuf
+            want = max(need_length - len(buffer), self.default_buf)
+            while len(buffer) < need_length and iterbuf:
+                it = iterbuf[0]
+                values = []
+                append = values.append
+                try:
+                    while len(values) < want:
+                        append(await it.__anext__())
+                except StopAsyncIteration:
+                    iterbuf.pop(0)
+                finally:
+                    # keep what was read even if the source raised
+                    buffer.extend(values)
+                    want -= len(values)
+        return need_length <= len(self._databuf)
+
+    def readahead(self, n):
+        '''starts filling the buffer up to n values on a background task,
+        returns the task'''
+        return asyncio.ensure_future(self.internal_extend(n))
+
+    async def peek(self, index):
+        '''returns the value index ahead of the current one without consuming
+        anything. Raises IndexError if the sources run out first'''
+        if index < 0:
+            raise IndexError("asoliditer can not peek backwards")
+        await self.internal_extend(index + 1)
+        return self._databuf[index]
+
+    async def peek_chunk(self, n):
+        '''the next n values (less if the sources run out), not consumed'''
+        await self.internal_extend(n)
+        return self.slicetype(self._databuf[:n])
+
+    async def take(self, n):
+        '''returns the next n values (less if the sources run out) and
+        consumes them'''
+        chunk = await self.peek_chunk(n)
+        self._databuf.consume(len(chunk))
+        return chunk
+
+    async def chunks(self, n):
+        '''async yields take(n) until the sources are exhausted'''
+        while True:
+            chunk = await self.take(n)
+            if not len(chunk):
+                return
+            yield chunk
+
+    async def consume(self, n):
+        await self.internal_extend(n)
+        self._databuf.consume(min(n, len(self._databuf)))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        buffer = self._databuf
+        if not len(buffer) and not await self.internal_extend(1):
+            raise StopAsyncIteration
+        return buffer.popleft()
+
+    def __getitem__(self, item):
+        '''s[index] is awaitable (the same as peek). s[start:stop:step] is an
+        asolidslice: async iterate it, or await it for all of it at once.'''
+        if type(item) == slice:
+            return asolidslice(self, *classtools.slice_synatx(item))
+        return self.peek(item)
+
+class asolidslice(object):
+    '''A lazy slice of an asoliditer. Does not consume the asoliditer unless
+    consume = True.
+
+    async for value in asolidslice(s, 0, 10, 2): ...
+    values = await asolidslice(s, 0, 10, 2)      # slicetype of them all
+    '''
+    def __init__(self, asoliditer, start, stop = None, step = 1,
+                 consume = False):
+        if start < 0 or (stop != None and stop < 0) or step < 1:
+            raise IndexError("No negative indexes: " +
+                             repr([start, stop, step]))
+        self.asoliditer = asoliditer
+        self.start, self.stop, self.step = start, stop, step
+        self.consume = consume
+        self.index = start
+        self._consumed = 0
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        index, s = self.index, self.asoliditer
+        if self.stop != None and index >= self.stop:
+            raise StopAsyncIteration
+        self.index += self.step
+        if self.consume:
+            # consumes up to (not including) the value being returned
+            await s.consume(index - self._consumed)
+            self._consumed = index
+            index = 0
+        try:
+            return await s.peek(index)
+        except IndexError:
+            raise StopAsyncIteration
+
+    async def _collect(self):
+        out = []
+        append = out.append
+        async for value in self:
+            append(value)
+        return self.asoliditer.slicetype(out)
+
+    def __await__(self):
+        return self._collect().__await__()
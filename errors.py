@@ -43,7 +43,7 @@ import traceback
 class NeedModule(ImportError):
     def __init__(self, value):
         self.value = value
-    def __str__(self, value):
+    def __str__(self):
         return "Module Dependency not met: " + repr(self.value)
 
 class ModuleError(Exception):
@@ -62,4 +62,4 @@ def get_prev_exception_str(*args, **kwargs):
     return ''.join(traceback.format_exception(E, Estr, tb))
 
 def print_prev_exception(*args, **kwargs):
-    print get_prev_exception_str(*args, **kwargs)
\ No newline at end of file
+    print(get_prev_exception_str(*args, **kwargs))
\ No newline at end of file
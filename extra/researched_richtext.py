@@ -149,7 +149,6 @@ def get_match_paths(folder_path,
     if text_regexp != None:
         if type(text_regexp) in (str, unicode):
             text_regexp = re.compile(text_regexp)
-        text_fnd = text_regexp.finditer
     
     folder_path = os.path.abspath(folder_path)
     fpaths = []
@@ -174,18 +173,18 @@ def get_match_paths(folder_path,
                 continue
         
         if text_regexp:
-            with open(path) as f:
-                #TODO: check if file is a text file
-                text = f.read()
-                if max_len_searched == None:
-                    max_len_searched = len(text)
-                try:
-                    # find any match to text name
-                    next(text_fnd(text, 0, max_len_searched))
-                except StopIteration:
-                    continue
-                else:
-                    fpaths.append(path)
+            #TODO: check if file is a text file
+            researched = textools.re_search_file(text_regexp, path, 
+                end = max_len_searched, no_groups = True)
+            try:
+                # find any match to text name
+                next(n for n in researched if type(n) not in (str, unicode))
+            except StopIteration:
+                continue
+            else:
+                fpaths.append(path)
+            finally:
+                researched.close()
 #                    matches = []
 #                    researched = textools.re_search(file_regexp, 
 #                        text, start = 0, end = max_len_searched, 
@@ -43,16 +43,29 @@ and numpy arrays.
 Note: Imports itertools namespace so can be used instead of itertools
 '''
 import itertools as itools
+import collections
+import array
+import bisect
+import heapq
 import math
 import sys
+import threading
+import tempfile
+import mmap
+import struct
 
 VERSION = sys.version_info.major
 if VERSION == 2:
     range = xrange
+    import Queue as queue
+    import cPickle as pickle
+else:
+    import queue
+    import pickle
 
-NUMPY = True
+_NUMPY_ = True
 try:
-    import _NUMPY_ as np
+    import numpy as np
 except ImportError:
     _NUMPY_ = False
 
@@ -95,66 +108,830 @@ class biter(object):
         el20 = myiter[20]
         
         
-    Note: if you need to iterate directly, pull out the iter with
-        myiter = iter(biter)
-    this will use all c code and be super fast
+    Note: iter(biter) iterates over the same data as the biter, so you can
+    mix the two -- values put in front (front_extend, insert(0, ...)) while
+    looping come out next, like they do with next(biter). The values of each
+    iterable are taken straight from it, so this is still fast.
+
+    Internally the iterables are kept in a flat deque (not nested chains), so
+    extending on either side is O(1) and next only ever looks at the first
+    iterable in the queue.
     '''
     def __init__(self, iterable):
-        self._iter = iter(iterable)
+        self._iters = collections.deque((iter(iterable),))
         self.solid_iter = None
 
     def append(self, value):
-        self._iter = itools.chain(self._iter, (value,))
+        self._iters.append(iter((value,)))
     
     def insert(self, position, value):
         if position not in (0, -1):
             raise ValueError("can only insert in front or back")
         if position == 0:
-            self._iter = itools.chain((value,), self._iter)
+            self._iters.appendleft(iter((value,)))
         elif position == -1:
             self.append(value)
         else:
             assert(0)
         
     def extend(self, iterable):
-        self._iter = itools.chain(self._iter, iterable)
+        self._iters.append(iter(iterable))
 
     def front_extend(self, iterable):
         '''extends in front of the iterator'''
-        self._iter = itools.chain(iterable, self._iter)
+        self._iters.appendleft(iter(iterable))
 
     def __add__(self, iterable):
-        self._iter = itools.chain(self._iter, iterable)
-        return self._iter
+        self.extend(iterable)
+        return self
 
-    def __next__(self):
-        return next(self._iter)
-        
     def next(self):
-        return next(self._iter)
+        iters = self._iters
+        while iters:
+            try:
+                return next(iters[0])
+            except StopIteration:
+                iters.popleft()
+        raise StopIteration
+    __next__ = next
         
     def __iter__(self):
-        return self
+        return _iter_pushback(self._iters)
+
+    def _flat(self):
+        '''iterates over the data entirely in c. Only for taking values
+        where nothing can be pushed back in between (take, indexing...)'''
+        return itools.chain.from_iterable(_iter_queue(self._iters))
 
     def __getitem__(self, item):
         if type(item) == int:
             if item < 0:
                 raise IndexError('Cannot address biter with '
                     'negative index: ' + repr(item))
-            return next(itools.islice(self._iter, item, item + 1))
+            return next(itools.islice(self._flat(), item, item + 1))
 
         if type(item) == slice:
             # get the indexes, and then convert to the number
-            self._iter = itools.islice(self._iter, item.start,
-                    item.stop, item.step)
-            return self._iter
+            sliced = itools.islice(self._flat(), item.start, item.stop,
+                                   item.step)
+            self._iters = collections.deque((sliced,))
+            return sliced
 
     def index(self, value, start = 0, stop = None):
-        ind = first_index_et(self._iter, value)
+        ind = first_index_et(iter(self), value)
         if ind == -1:
             raise IndexError("Could not find Index: {0}".format(value))
         return ind
 
+    def take(self, n):
+        '''consumes and returns the next n values as a tuple (less if the
+        data runs out). Runs in c, no matter how many iterables are queued'''
+        return tuple(itools.islice(self._flat(), n))
+
+    def peek_chunk(self, n):
+        '''same as take, but puts the values back in front'''
+        chunk = self.take(n)
+        self.front_extend(chunk)
+        return chunk
+
+    def chunks(self, n):
+        '''iterate through the data n values at a time (see take). The last
+        chunk may be shorter'''
+        while True:
+            chunk = self.take(n)
+            if not chunk:
+                return
+            yield chunk
+
+def _iter_queue(iters):
+    '''yields the iterators in a biter's queue for chain.from_iterable.
+    chain only asks for the next one once the last is exhausted, so that is
+    when it is removed -- until then the biter can keep using it too'''
+    while iters:
+        it = iters[0]
+        yield it
+        if iters and iters[0] is it:
+            iters.popleft()
+
+def _iter_pushback(iters):
+    '''iter(biter). Loops over the first iterable in the queue, going back
+    to the head of the queue when something was put in front of it'''
+    while iters:
+        it = iters[0]
+        for value in it:
+            yield value
+            if not iters or iters[0] is not it:
+                break   # pushed back, it stays in the queue behind that
+        else:
+            if iters and iters[0] is it:
+                iters.popleft()
+
+_POINTER_SIZE = struct.calcsize('P')
+
+class solidbuffer(object):
+    '''The buffer engine used by soliditer to hold its lookahead data.
+
+    A plain list where data is removed from the front by moving a start
+    offset instead of shifting every element. The dead space at the front is
+    only deleted once it is larger than the live data, so popleft, consume,
+    append and indexing are all O(1) amortized -- list.pop(0) and
+    del list[:n] are O(len(list)) every call.
+
+    Indexing and slicing are relative to the live data, so
+        buf = solidbuffer(range(10))
+        buf.consume(3)
+        buf[0], buf[:2]
+        >>> 3, [3, 4]
+
+    Give a typecode to store the data in an array.array of that type instead
+    of a list (see also npbuffer).
+    '''
+    compact_min = 64    # never bother compacting less than this
+
+    def __init__(self, iterable = (), typecode = None):
+        if typecode == None:
+            self._data = list(iterable)
+        else:
+            self._data = array.array(typecode, iterable)
+        self._start = 0
+
+    def __len__(self):
+        return len(self._data) - self._start
+
+    def __iter__(self):
+        return itools.islice(self._data, self._start, None)
+
+    def nbytes(self):
+        '''memory held by the live data. For lists this is the pointers
+        plus sys.getsizeof of every value (shared values are counted for
+        each time they appear)'''
+        if type(self._data) == array.array:
+            return len(self) * self._data.itemsize
+        return len(self) * _POINTER_SIZE + sum(map(sys.getsizeof, self))
+
+    def __getitem__(self, item):
+        if type(item) == slice:
+            start, stop, step = item.indices(len(self))
+            if step < 0:
+                return self._data[self._start:][item]
+            return self._data[self._start + start:self._start + stop:step]
+        if item < 0:
+            item += len(self)
+            if item < 0:
+                raise IndexError('solidbuffer index out of range')
+        elif item >= len(self):
+            raise IndexError('solidbuffer index out of range')
+        return self._data[self._start + item]
+
+    def _compact(self):
+        '''delete the consumed data once it outweighs the live data'''
+        start = self._start
+        if start > self.compact_min and start * 2 > len(self._data):
+            del self._data[:start]
+            self._start = 0
+
+    def popleft(self):
+        data, start = self._data, self._start
+        try:
+            out = data[start]
+        except IndexError:
+            raise IndexError('pop from empty solidbuffer')
+        start += 1
+        if start > self.compact_min and start * 2 > len(data):
+            del data[:start]
+            start = 0
+        self._start = start
+        return out
+
+    def consume(self, n):
+        '''removes the first n values (or all of them if there are less)'''
+        self._start = min(self._start + n, len(self._data))
+        self._compact()
+
+    def append(self, value):
+        self._data.append(value)
+
+    def extend(self, iterable):
+        self._data.extend(iterable)
+
+    def front_extend(self, iterable):
+        '''adds data onto the front. Reuses the consumed space if it can'''
+        if type(self._data) == list:
+            values = list(iterable)
+        else:
+            values = array.array(self._data.typecode, iterable)
+        k = len(values)
+        if k <= self._start:
+            self._start -= k
+            self._data[self._start:self._start + k] = values
+        else:
+            self._data[:self._start] = values
+            self._start = 0
+
+    def insert(self, index, value):
+        if index < 0:
+            index = max(index + len(self), 0)
+        self._data.insert(self._start + index, value)
+
+    def index(self, value, start = 0, stop = None):
+        '''same as list.index, relative to the live data'''
+        start, stop, _ = slice(start, stop).indices(len(self))
+        if type(self._data) != list:   # array.index doesn't take start, stop
+            return self[start:stop].index(value) + start
+        return self._data.index(value, self._start + start,
+                                self._start + stop) - self._start
+
+class npbuffer(object):
+    '''solidbuffer that keeps its data in a numpy array of a single dtype
+    (a soliditer with a typecode uses it). Numbers are stored unboxed
+    (8 bytes for a float64 instead of a pointer + python float) and slices
+    are numpy views of the buffer -- no copying.
+
+    Views stay valid: memory that is part of the live data is never written
+    to again. New data only goes past the end, and when there is no room
+    left (or on front_extend / insert) the live data is moved into a new
+    array, which also drops the consumed data.
+    '''
+    def __init__(self, iterable = (), dtype = float):
+        self.dtype = np.dtype(dtype)
+        self._data = np.empty(16, self.dtype)
+        self._start = self._end = 0
+        self.extend(iterable)
+
+    def __len__(self):
+        return self._end - self._start
+
+    def nbytes(self):
+        '''memory held by the live data'''
+        return len(self) * self.dtype.itemsize
+
+    def __iter__(self):
+        return iter(self._data[self._start:self._end])
+
+    def __getitem__(self, item):
+        if type(item) == slice:
+            return self._data[self._start:self._end][item]
+        if item < 0:
+            item += len(self)
+            if item < 0:
+                raise IndexError('npbuffer index out of range')
+        elif item >= len(self):
+            raise IndexError('npbuffer index out of range')
+        return self._data[self._start + item]
+
+    def _reallocate(self, pieces, back = 0):
+        '''move the pieces (one after the other) into a new array with room
+        for at least back more values'''
+        size = sum(len(p) for p in pieces) + back
+        data = np.empty(max(16, size + size // 2), self.dtype)
+        size -= back
+        end = 0
+        for p in pieces:
+            data[end:end + len(p)] = p
+            end += len(p)
+        self._data, self._start, self._end = data, 0, size
+
+    def _values(self, iterable):
+        if isinstance(iterable, np.ndarray):
+            return iterable
+        return np.fromiter(iterable, self.dtype)
+
+    def popleft(self):
+        if self._start >= self._end:
+            raise IndexError('pop from empty npbuffer')
+        self._start += 1
+        return self._data[self._start - 1]
+
+    def consume(self, n):
+        '''removes the first n values (or all of them if there are less)'''
+        self._start = min(self._start + n, self._end)
+
+    def append(self, value):
+        if self._end >= len(self._data):
+            self._reallocate((self[:],), 1)
+        self._data[self._end] = value
+        self._end += 1
+
+    def extend(self, iterable):
+        values = self._values(iterable)
+        n = len(values)
+        if self._end + n > len(self._data):
+            self._reallocate((self[:],), n)
+        self._data[self._end:self._end + n] = values
+        self._end += n
+
+    def front_extend(self, iterable):
+        '''adds data onto the front'''
+        self._reallocate((self._values(iterable), self[:]))
+
+    def insert(self, index, value):
+        live = self[:]
+        if index < 0:
+            index = max(index + len(live), 0)
+        self._reallocate((live[:index], np.array((value,), self.dtype),
+                          live[index:]))
+
+    def index(self, value, start = 0, stop = None):
+        '''same as list.index, relative to the live data'''
+        start, stop, _ = slice(start, stop).indices(len(self))
+        index = first_index_et(self._data, value, self._start + start,
+                               self._start + stop)
+        if index == None:
+            raise ValueError('{0!r} is not in npbuffer'.format(value))
+        return index - self._start
+
+_OFFSET_TYPECODE = 'Q' if VERSION == 3 else 'L'
+
+_SPILL_COPY = 1 << 20     # bytes moved at a time by _spillfile.drop_front
+
+class _spillfile(object):
+    '''append only store of values in a temporary file, read back through
+    mmap. Values of a typecode are stored raw (itemsize bytes each, so value
+    i is at i * itemsize), anything else is pickled with the offset of every
+    record kept in an array. Either way reading value i is O(1).'''
+    def __init__(self, typecode = None):
+        self.typecode = typecode
+        if typecode == None:
+            self.itemsize = None
+            self._offsets = array.array(_OFFSET_TYPECODE, (0,))
+        elif _NUMPY_:
+            self.itemsize = np.dtype(typecode).itemsize
+        else:
+            self.itemsize = array.array(typecode).itemsize
+        self._file = tempfile.TemporaryFile()
+        self._map = None
+        self._size = 0      # bytes written
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def _span(self, start, stop):
+        '''byte range of values start:stop'''
+        if self.itemsize != None:
+            return start * self.itemsize, stop * self.itemsize
+        return self._offsets[start], self._offsets[stop]
+
+    def append_values(self, values):
+        if self.itemsize != None:
+            data = values.tobytes() if hasattr(values, 'tobytes') else \
+                values.tostring()
+            count = len(data) // self.itemsize
+        else:
+            records = [pickle.dumps(v, pickle.HIGHEST_PROTOCOL)
+                       for v in values]
+            end = self._size
+            for r in records:
+                end += len(r)
+                self._offsets.append(end)
+            data = b''.join(records)
+            count = len(records)
+        self._file.seek(self._size)
+        self._file.write(data)
+        self._size += len(data)
+        self._count += count
+
+    def _bytes(self, start, stop):
+        begin, end = self._span(start, stop)
+        if self._map == None or end > len(self._map):
+            self._file.flush()
+            if self._map != None:
+                self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), self._size,
+                                  access = mmap.ACCESS_READ)
+        return self._map[begin:end]
+
+    def _decode(self, data, start, stop):
+        if self.itemsize == None:
+            offsets, begin = self._offsets, self._offsets[start]
+            return [pickle.loads(data[offsets[i] - begin:
+                                      offsets[i + 1] - begin])
+                    for i in range(start, stop)]
+        if _NUMPY_:
+            return np.frombuffer(data, self.typecode).copy()
+        out = array.array(self.typecode)
+        if hasattr(out, 'frombytes'):
+            out.frombytes(data)
+        else:
+            out.fromstring(data)
+        return out
+
+    def get(self, index):
+        return self._decode(self._bytes(index, index + 1), index,
+                            index + 1)[0]
+
+    def get_range(self, start, stop):
+        '''values start:stop, read in one go'''
+        return self._decode(self._bytes(start, stop), start, stop)
+
+    def truncate(self, count):
+        '''forget every value from count on (the space is reused)'''
+        if count >= self._count:
+            return
+        if self._map != None:
+            self._map.close()
+            self._map = None
+        self._size = self._span(0, count)[1]
+        self._count = count
+        if self.itemsize == None:
+            del self._offsets[count + 1:]
+        self._file.seek(self._size)
+        self._file.truncate()
+
+    def drop_front(self, count):
+        '''forget the first count values, moving the rest to the front of
+        the file so the space is given back'''
+        if count >= self._count:
+            self.truncate(0)
+            return
+        if count <= 0:
+            return
+        if self._map != None:
+            self._map.close()
+            self._map = None
+        begin = self._span(0, count)[1]
+        f = self._file
+        f.flush()
+        read, write = begin, 0
+        while read < self._size:
+            f.seek(read)
+            data = f.read(min(_SPILL_COPY, self._size - read))
+            f.seek(write)
+            f.write(data)
+            read += len(data)
+            write += len(data)
+        self._size -= begin
+        self._count -= count
+        f.flush()
+        f.truncate(self._size)
+        if self.itemsize == None:
+            self._offsets = array.array(_OFFSET_TYPECODE,
+                (o - begin for o in self._offsets[count:]))
+
+    def close(self):
+        if self._map != None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+class spillbuffer(object):
+    '''solidbuffer that moves its older values to a memory mapped temporary
+    file once it holds more than spill_after of them, so a soliditer can
+    look further ahead than fits in memory.
+
+    The newest values are held in a normal (list or typed) buffer and are
+    spilled to disk half a buffer at a time. Typed values are stored raw,
+    others are pickled. Reading any value or popping is O(1) (an mmap
+    offset); slices that touch the spilled values come back as copies.
+    Once more than half of the temporary file has been consumed the rest is
+    moved to its front, so a stream that keeps spilling while it is read
+    doesn't grow the file (or its offsets) without end. The file is deleted
+    when the buffer is (or on close()).
+    '''
+    def __init__(self, iterable = (), typecode = None, spill_after = 10**6):
+        if spill_after < 2:
+            raise ValueError("spill_after must be at least 2")
+        self.typecode = typecode
+        self.spill_after = spill_after
+        self._front = solidbuffer()     # front_extended before the disk
+        self._disk = None
+        self._disk_start = 0
+        self._mem = _make_buffer(typecode)
+        self.extend(iterable)
+
+    def _disk_len(self):
+        if self._disk == None:
+            return 0
+        return len(self._disk) - self._disk_start
+
+    def __len__(self):
+        return len(self._front) + self._disk_len() + len(self._mem)
+
+    def spilled(self):
+        '''how many values are on disk'''
+        return self._disk_len()
+
+    def nbytes(self):
+        '''memory held by the values that are not on disk'''
+        size = self._front.nbytes() + self._mem.nbytes()
+        if self._disk != None and self._disk.itemsize == None:
+            size += len(self._disk._offsets) * self._disk._offsets.itemsize
+        return size
+
+    def _iter_disk(self, chunk = 4096):
+        start = self._disk_start
+        while start < len(self._disk):
+            stop = min(start + chunk, len(self._disk))
+            for value in self._disk.get_range(start, stop):
+                yield value
+            start = stop
+
+    def __iter__(self):
+        if self._disk_len():
+            return itools.chain(self._front, self._iter_disk(), self._mem)
+        return itools.chain(self._front, self._mem)
+
+    def _locate(self, index):
+        '''returns the store holding value index, and its index in there'''
+        nfront, ndisk = len(self._front), self._disk_len()
+        if index < nfront:
+            return self._front, index
+        index -= nfront
+        if index < ndisk:
+            return self._disk, index + self._disk_start
+        return self._mem, index - ndisk
+
+    def __getitem__(self, item):
+        if type(item) == slice:
+            start, stop, step = item.indices(len(self))
+            nfront, ndisk = len(self._front), self._disk_len()
+            if step == 1 and start >= nfront + ndisk:
+                skip = nfront + ndisk
+                return self._mem[start - skip:stop - skip]
+            return self._collect(range(start, stop, step))
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError('spillbuffer index out of range')
+        store, index = self._locate(item)
+        if store is self._disk:
+            return store.get(index)
+        return store[index]
+
+    def _collect(self, indexes):
+        '''copy of the values at indexes, in the type of a slice'''
+        values = [self[i] for i in indexes]
+        if self.typecode == None:
+            return values
+        if _NUMPY_:
+            return np.array(values, self.typecode)
+        return array.array(self.typecode, values)
+
+    def _spill(self):
+        '''move the older half of the memory buffer to disk'''
+        mem = self._mem
+        n = len(mem) - self.spill_after // 2
+        if self._disk == None:
+            self._disk = _spillfile(self.typecode)
+        self._disk.append_values(mem[:n])
+        mem.consume(n)
+
+    def _disk_consumed(self):
+        '''give back the disk space of consumed values: all of it when the
+        disk is empty, else once they are more than half the file (so the
+        copying is O(1) amortized per value)'''
+        if self._disk == None:
+            return
+        if not self._disk_len():
+            self._disk.truncate(0)
+            self._disk_start = 0
+        elif self._disk_start * 2 > len(self._disk):
+            self._disk.drop_front(self._disk_start)
+            self._disk_start = 0
+
+    def popleft(self):
+        if len(self._front):
+            return self._front.popleft()
+        if self._disk_len():
+            value = self._disk.get(self._disk_start)
+            self._disk_start += 1
+            self._disk_consumed()
+            return value
+        return self._mem.popleft()
+
+    def consume(self, n):
+        '''removes the first n values (or all of them if there are less)'''
+        k = min(n, len(self._front))
+        self._front.consume(k)
+        n -= k
+        k = min(n, self._disk_len())
+        if k:
+            self._disk_start += k
+            self._disk_consumed()
+            n -= k
+        self._mem.consume(n)
+
+    def append(self, value):
+        self._mem.append(value)
+        if len(self._mem) > self.spill_after:
+            self._spill()
+
+    def extend(self, iterable):
+        # a piece at a time, so a huge extend never has to fit in memory
+        size = self.spill_after // 2 + 1
+        if type(iterable) in (list, tuple) or (_NUMPY_ and
+                type(iterable) == np.ndarray):
+            pieces = (iterable[i:i + size]
+                      for i in range(0, len(iterable), size))
+        else:
+            it = iter(iterable)
+            pieces = iter(lambda: list(itools.islice(it, size)), [])
+        for piece in pieces:
+            self._mem.extend(piece)
+            if len(self._mem) > self.spill_after:
+                self._spill()
+
+    def front_extend(self, iterable):
+        if self._disk_len() or len(self._front):
+            self._front.front_extend(iterable)
+        else:
+            self._mem.front_extend(iterable)
+
+    def insert(self, index, value):
+        if index < 0:
+            index = max(index + len(self), 0)
+        store, i = self._locate(index)
+        if store is self._disk:
+            # the values after index come back into memory
+            self._mem.front_extend(self._disk.get_range(i, len(self._disk)))
+            self._disk.truncate(i)
+            self._mem.insert(0, value)
+        else:
+            store.insert(i, value)
+
+    def index(self, value, start = 0, stop = None):
+        '''same as list.index'''
+        start, stop, _ = slice(start, stop).indices(len(self))
+        for i, v in enumerate(itools.islice(self, start, stop)):
+            if v == value:
+                return i + start
+        raise ValueError('{0!r} is not in spillbuffer'.format(value))
+
+    def close(self):
+        '''delete the temporary file'''
+        if self._disk != None:
+            self._disk.close()
+            self._disk = None
+            self._disk_start = 0
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+class indexedbuffer(object):
+    '''Wraps a soliditer buffer with a hash index of where every value is,
+    so index() and "in" are O(1) on average instead of a scan.
+
+    The index is kept up to date as values are added and consumed: each
+    value maps to a deque of the (absolute) positions it is at, in order,
+    so consuming from the front only pops from the front of them.
+    front_extend is O(values added); insert into the middle rebuilds the
+    index. If an unhashable value turns up the index is dropped and index()
+    falls back to scanning. NaN is not indexed: it never equals itself, and
+    typed or spilled buffers hand back a new NaN object every time, so
+    index() and "in" never find it.
+    '''
+    def __init__(self, buffer):
+        self._buf = buffer
+        self._base = 0      # absolute position of buffer[0]
+        self._positions = {}
+        self._add(0, len(buffer))
+
+    def __len__(self):
+        return len(self._buf)
+
+    def __iter__(self):
+        return iter(self._buf)
+
+    def __getitem__(self, item):
+        return self._buf[item]
+
+    def nbytes(self):
+        return self._buf.nbytes()
+
+    def _values(self, start, stop):
+        values = self._buf[start:stop]
+        return values.tolist() if hasattr(values, 'tolist') else values
+
+    def _add(self, start, stop):
+        '''index the values at buffer[start:stop] (they must be newer than
+        anything indexed)'''
+        positions = self._positions
+        if positions == None or start >= stop:
+            return
+        position = self._base + start
+        try:
+            for value in self._values(start, stop):
+                if value == value:  # not NaN
+                    try:
+                        positions[value].append(position)
+                    except KeyError:
+                        positions[value] = collections.deque((position,))
+                position += 1
+        except (TypeError, ValueError):   # unhashable
+            self._positions = None
+
+    def _remove(self, n):
+        '''unindex the first n values'''
+        positions = self._positions
+        if positions != None:
+            for value in self._values(0, n):
+                self._unindex(positions, value)
+        self._base += n
+
+    @staticmethod
+    def _unindex(positions, value):
+        '''drop the first position of value. Values that were never indexed
+        (NaN) are skipped'''
+        found = positions.get(value)
+        if found == None:
+            return
+        found.popleft()
+        if not found:
+            del positions[value]
+
+    def _rebuild(self):
+        self._positions = {}
+        self._add(0, len(self._buf))
+
+    def popleft(self):
+        value = self._buf.popleft()
+        positions = self._positions
+        if positions != None:
+            self._unindex(positions, value)
+        self._base += 1
+        return value
+
+    def consume(self, n):
+        n = min(n, len(self._buf))
+        self._remove(n)
+        self._buf.consume(n)
+
+    def append(self, value):
+        self._buf.append(value)
+        self._add(len(self._buf) - 1, len(self._buf))
+
+    def extend(self, iterable):
+        start = len(self._buf)
+        self._buf.extend(iterable)
+        self._add(start, len(self._buf))
+
+    def front_extend(self, iterable):
+        size = len(self._buf)
+        self._buf.front_extend(iterable)
+        k = len(self._buf) - size
+        self._base -= k
+        positions = self._positions
+        if positions == None:
+            return
+        try:
+            values = self._values(0, k)
+            for i in range(k - 1, -1, -1):
+                value = values[i]
+                if value != value:  # NaN
+                    continue
+                try:
+                    positions[value].appendleft(self._base + i)
+                except KeyError:
+                    positions[value] = collections.deque((self._base + i,))
+        except (TypeError, ValueError):
+            self._positions = None
+
+    def insert(self, index, value):
+        self._buf.insert(index, value)
+        self._rebuild()
+
+    def __contains__(self, value):
+        if self._positions == None:
+            return value in iter(self._buf)
+        try:
+            return value in self._positions
+        except TypeError:
+            return False
+
+    def index(self, value, start = 0, stop = None):
+        '''same as list.index'''
+        if self._positions == None:
+            return self._buf.index(value, start, stop)
+        start, stop, _ = slice(start, stop).indices(len(self._buf))
+        try:
+            found = self._positions.get(value, ())
+        except TypeError:
+            found = ()
+        start, stop = start + self._base, stop + self._base
+        for position in found:
+            if position >= stop:
+                break
+            if position >= start:
+                return position - self._base
+        raise ValueError('{0!r} is not in indexedbuffer'.format(value))
+
+def _make_buffer(typecode = None, spill_after = None, indexed = False):
+    '''the buffer soliditer uses for a typecode: a list for None, else numpy
+    storage when available or array.array. With spill_after a spillbuffer
+    around that, and with indexed an indexedbuffer around that'''
+    if indexed:
+        return indexedbuffer(_make_buffer(typecode, spill_after))
+    if spill_after != None:
+        return spillbuffer(typecode = typecode, spill_after = spill_after)
+    if typecode == None:
+        return solidbuffer()
+    elif _NUMPY_:
+        return npbuffer(dtype = typecode)
+    return solidbuffer(typecode = typecode)
+
 from errors import RequestError
 
 class soliditer(object):
@@ -187,6 +964,16 @@ class soliditer(object):
         data goes above this value. Default is None (no limit)
     slicetype: default type returned on slices is a tuple. For list use
         slicetype = list. For numpy, slicetype = np.array, etc.
+    typecode: store the lookahead data unboxed, for numeric streams. An
+        array.array typecode or numpy dtype ('d', 'i', np.float32...). Uses
+        an npbuffer if numpy is available, otherwise an array.array.
+        Slices are then taken straight from the buffer -- numpy views (no
+        copying) unless you pass some other slicetype (i.e. tuple)
+    spill_after: once more than this many values are looked ahead, the older
+        ones move to a memory mapped temporary file (see spillbuffer), so
+        siter[10**8] does not have to fit in memory. Default None (never)
+    indexed: keep a hash index of the buffered values (see indexedbuffer),
+        for when you call index or use "in" a lot
 
     USAGE:
         myiter = iter(range(1000)) # an iterator you can't peek into
@@ -197,9 +984,12 @@ class soliditer(object):
         ... do some stuff
         s.consume(30)   # dumps the data that we were looking at.
 
-    In situations where you need speed, you will want to do it in the "chunkwise" format.
+    In situations where you need speed, you will want to do it in the "chunkwise" format
+    (take, peek_chunk and chunks return whole slices of the buffer).
     Using next(siter) is extremely slow compared to standard iterators --
     although obviusly if you don't care about speed you can feel free to.
+    The lookahead data is held in a solidbuffer, so next, consume and
+    indexing stay O(1) no matter how far ahead you have looked.
 
     If you are ever DONE with soliditer and just want access to a high speed
     iterable, use soliditer.iterize -- doing so sets the internal variable
@@ -208,15 +998,22 @@ class soliditer(object):
 
     Note:
     Watch out on using too many itertools.chains with hard data that you are
-    re-integrating. You can create a memory leak!
+    re-integrating. You can create a memory leak! If you need to look at the
+    next value of an iterator before handing it over, use peekiter.
     '''
     def __init__(self, iterable, default_buf = 10,
                 request_extend_multiply = 1, request_soft_limit = 1000,
-                request_hard_limit = None, slicetype = tuple):
+                request_hard_limit = None, slicetype = None, typecode = None,
+                spill_after = None, indexed = False):
         self._been_iterized = False
-        self.__next__ = self.next
 
-        self._databuf = []
+        self._databuf = _make_buffer(typecode, spill_after, indexed)
+        self.typecode = typecode
+        if slicetype == None:
+            slicetype = tuple if typecode == None else _buffer_slice
+        elif typecode != None and (slicetype in (array.array, _buffer_slice)
+                or (_NUMPY_ and slicetype in (np.array, np.asarray))):
+            slicetype = _buffer_slice
         self._iterbuf = []
         self.default_buf = default_buf
         self.request_extend_multiply = request_extend_multiply
@@ -231,11 +1028,13 @@ class soliditer(object):
     def next(self):
         assert(not self._been_iterized)
         try:
-            return self._databuf.pop(0)
+            return self._databuf.popleft()
         except IndexError:
             self.internal_extend(1, self.default_buf)
             if self.buffer_size() == 0:
                 raise StopIteration
+            return self._databuf.popleft()
+    __next__ = next
 
     def __iter__(self):
         return self
@@ -251,7 +1050,7 @@ class soliditer(object):
     def front_extend(self, iterable):
         '''adds data onto the front'''
         assert(not self._been_iterized)
-        self._databuf = list(iterable) + self._databuf
+        self._databuf.front_extend(iterable)
     
     def extend(self, iterable):
         '''adds data onto the end'''
@@ -270,55 +1069,77 @@ class soliditer(object):
     def internal_extend(self, need_length, want_length = None):
         '''consume one iter at a time until at correct length.
         return True if operation succeeds,
-        False if it fails
-        min_len is the minimum needed (not ammendable by soft limit)
-        By default all is needed (min_len = None)
+        False if the iterators ran out before need_length was reached
+        need_length is the minimum needed (not ammendable by soft limit)
+        want_length is how much we would like to have on hand. It is never
+        less than default_buf
         '''
         assert(not self._been_iterized)
-        if need_length < self.default_buf:
-            need_length = self.default_buf
+        want_length = need_length if want_length == None else want_length
+        if want_length < self.default_buf:
+            want_length = self.default_buf
 
         hlimit = self.request_hard_limit
         needed = need_length - self.buffer_size()
-        wanted = needed if want_length == None else (
-            want_length - self.buffer_size())
-        want_length = want_length if want_length != None else need_length
+        wanted = want_length - self.buffer_size()
         
         if hlimit != None and needed > hlimit:
             raise RequestError("extend higher than hard limit", needed)
 
         while wanted > 0:
             if len(self._iterbuf) == 0:
-                return False
-            it = self._iterbuf[0]
-            sliced = itools.islice(it, 0, need_length)
-            self._databuf.extend(sliced)
-            iter_done, it = isdone(it)
-            self._iterbuf[0] = it
-            bufsize = self.buffer_size()
-            wanted = want_length - bufsize
-            needed = need_length - bufsize
-            if iter_done:
-                self._iterbuf.pop(0)
-            if needed > 0 and not self._iterbuf:
-                raise IndexError("Index outside of existing extend")
-            elif wanted > 0 and not self._iterbuf:
                 # You can't always get what you want... but if you try 
                 # sometimes, you just might find.... YOU GET WHAT YOU NEED!
                 break
-        return True
+            it = self._iterbuf[0]
+            self._databuf.extend(itools.islice(it, wanted))
+            wanted = want_length - self.buffer_size()
+            if wanted > 0:
+                # islice came up short, so the iterator is done. Checking
+                # it this way keeps it from being re-wrapped by isdone
+                self._iterbuf.pop(0)
+        return need_length <= self.buffer_size()
 
     def consume(self, n):
         assert(not self._been_iterized)
         '''removes the first n variables.'''
         self.internal_extend(n)
-        del self._databuf[:n]
+        self._databuf.consume(n)
+
+    def peek_chunk(self, n, copy = False, start = 0):
+        '''returns the next n values (less if the data runs out) as a
+        single slice of the buffer, without consuming them. start skips
+        that many values first.
+        Typed soliditers return views of the buffer unless copy = True'''
+        assert(not self._been_iterized)
+        self.internal_extend(start + n)
+        chunk = self._databuf[start:start + n]
+        if self.slicetype != _buffer_slice:
+            return self.slicetype(chunk)
+        return chunk.copy() if copy and hasattr(chunk, 'copy') else chunk
+
+    def take(self, n, copy = False):
+        '''same as peek_chunk, but consumes the data'''
+        chunk = self.peek_chunk(n, copy)
+        self._databuf.consume(len(chunk))
+        return chunk
+
+    def chunks(self, n, copy = False):
+        '''iterate through the data n values at a time (see take). The last
+        chunk may be shorter'''
+        while True:
+            chunk = self.take(n, copy)
+            if not len(chunk):
+                return
+            yield chunk
 
     def __getitem__(self, item):
         '''
         neither slices nor indexes consume the iterator'''
         assert(not self._been_iterized)
         if type(item) == slice:
+            if self.slicetype == _buffer_slice:
+                return self._buffer_slice(item)
             return self.slicetype(solidslice(self, item, consume = False))
         elif type(item) == int:
             self.internal_extend(item + 1)
@@ -326,19 +1147,58 @@ class soliditer(object):
         else:
             raise TypeError("can only request slices or indexes")
 
-    def index(self, value, *args):
+    def _buffer_slice(self, item):
+        '''slice the buffer directly (same result as a solidslice)'''
+        start, stop, step = classtools.slice_synatx(item)
+        classtools.iterable_slice_error_check(start, stop, step)
+        if stop == None:
+            self._extend_all()
+        else:
+            self.internal_extend(stop)
+        if start >= self.buffer_size():
+            raise IndexError("Index outside of existing extend")
+        return self._databuf[start:stop:step]
+
+    def _extend_all(self):
+        '''pull everything out of the iterators into the buffer'''
+        while self._iterbuf:
+            size = self.buffer_size()
+            self.internal_extend(size, size + max(self.default_buf, size))
+
+    def index(self, value, start = 0, stop = None):
+        '''index of the first value equal to value from start (up to stop),
+        reading ahead as far as it takes. Raises ValueError if it isn't
+        there. Only the newly read data is searched after the buffer.
+        With indexed = True looking up what is buffered is O(1) average'''
+        assert(not self._been_iterized)
+        buf = self._databuf
+        scan = start
+        while True:
+            size = self.buffer_size()
+            end = size if stop == None else min(stop, size)
+            if scan < end:
+                try:
+                    return buf.index(value, scan, end)
+                except ValueError:
+                    pass
+            if (stop != None and end >= stop) or not self._iterbuf:
+                raise ValueError('{0!r} is not in soliditer'.format(value))
+            scan = max(scan, end)
+            # read ahead geometrically so repeated misses stay O(n) overall
+            self.internal_extend(size + 1, size + max(self.default_buf, size))
+
+    def __contains__(self, value):
+        '''whether value is in the data (reading ahead until it is found)'''
         try:
-            return self._databuf.index(value, *args)
+            self.index(value)
         except ValueError:
-            start = self.buffer_size()
-            # extend buffer, try again.
-            self.internal_extend(1, request_length = self.default_buf + start)
-            # syntax stuff is pretty odd for index. It is [start], stop            
-            if len(args) == 2:
-                return self.index(value, start, args[1])
-            else:
-                # for this one, start actually == stop
-                return self.index(value, start)
+            return False
+        return True
+
+def _buffer_slice(data):
+    '''soliditer slicetype for "slice the buffer directly". Typed soliditers
+    use it by default'''
+    return data
 
 class solidslice(object):
     '''object for handling slicing in soliditer
@@ -390,16 +1250,739 @@ class solidslice(object):
             if self.consume:
                 self.soliditer.consume(step)
         return out
+    __next__ = next
+
+class soliditee(object):
+    '''Several cursors walking one soliditer at their own speed.
+
+    Unlike itools.tee (no indexing) or a soliditer per consumer (a buffer
+    each), all the cursors share one lookahead buffer. It is only trimmed up
+    to the slowest cursor, so a cursor that stops moving holds the data --
+    close() it when you are done. lags() and buffered_bytes() tell you how
+    far apart the cursors are and what that is costing; with max_buffer set,
+    a read (or index or slice) that would make the buffer longer than that
+    raises RequestError.
+
+    Usage:
+        tee = soliditee(read_records(f), 3)
+        parser, indexer, stats = tee.cursors
+        next(parser); parser.peek(10); indexer[5:20]; stats.consume(100)
+    '''
+    def __init__(self, iterable, n = 2, max_buffer = None, **kwargs):
+        if type(iterable) == soliditer:
+            self.soliditer = iterable
+        else:
+            self.soliditer = soliditer(iterable, **kwargs)
+        self.max_buffer = max_buffer
+        self._base = 0      # absolute position of the buffer's front
+        self.cursors = []
+        for i in range(n):
+            self.add_cursor()
+
+    def add_cursor(self):
+        '''returns a new cursor at the start of the buffered data'''
+        cursor = teecursor(self, self._base)
+        self.cursors.append(cursor)
+        return cursor
+
+    def _remove(self, cursor):
+        self.cursors.remove(cursor)
+        self._trim()
+
+    def _need(self, cursor, n):
+        '''make sure n values past cursor are buffered if there are any.
+        returns how many there are (up to n)'''
+        offset = cursor.position - self._base
+        if (self.max_buffer != None and offset + n > self.max_buffer and
+                offset + n > self.buffer_size()):
+            raise RequestError("buffer would be longer than max_buffer",
+                               offset + n)
+        self.soliditer.internal_extend(offset + n)
+        return max(min(n, self.buffer_size() - offset), 0)
+
+    def _need_all(self, cursor):
+        '''buffer all the data that is left (within max_buffer). returns how
+        many values there are past cursor'''
+        if self.max_buffer == None:
+            self.soliditer._extend_all()
+        else:
+            self.soliditer.internal_extend(self.max_buffer + 1)
+            if self.buffer_size() > self.max_buffer:
+                raise RequestError("buffer would be longer than max_buffer",
+                                   self.buffer_size())
+        return self.buffer_size() - (cursor.position - self._base)
+
+    def _trim(self):
+        '''drop the data every cursor has passed'''
+        if not self.cursors:
+            return
+        slowest = min(c.position for c in self.cursors)
+        if slowest > self._base:
+            self.soliditer.consume(slowest - self._base)
+            self._base = slowest
+
+    def _advance(self, cursor, n):
+        was_slowest = cursor.position == self._base
+        cursor.position += n
+        if was_slowest:
+            self._trim()
+
+    def buffer_size(self):
+        return self.soliditer.buffer_size()
+
+    def buffered_bytes(self):
+        '''memory held by the shared buffer (see solidbuffer.nbytes)'''
+        return self.soliditer._databuf.nbytes()
+
+    def lags(self):
+        '''how many values each cursor is behind the fastest cursor'''
+        return [c.lag() for c in self.cursors]
+
+class teecursor(object):
+    '''one cursor of a soliditee. Has the soliditer interface, with
+    indexes relative to the cursor'''
+    def __init__(self, tee, position):
+        self.tee = tee
+        self.position = position
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        tee = self.tee
+        if not tee._need(self, 1):
+            raise StopIteration
+        value = tee.soliditer._databuf[self.position - tee._base]
+        tee._advance(self, 1)
+        return value
+    __next__ = next
+
+    def peek(self, index = 0):
+        '''the value index ahead of the cursor, without moving it'''
+        if index < 0 or self.tee._need(self, index + 1) <= index:
+            raise IndexError("index outside of the data")
+        return self.tee.soliditer._databuf[self.position - self.tee._base
+                                           + index]
+
+    def __getitem__(self, item):
+        '''indexes and slices are relative to the cursor and don't move it'''
+        if type(item) == int:
+            return self.peek(item)
+        if type(item) != slice:
+            raise TypeError("can only request slices or indexes")
+        start, stop, step = classtools.slice_synatx(item)
+        if start < 0 or (stop != None and stop < 0) or step < 1:
+            raise IndexError("No negative indexes: " +
+                             repr([start, stop, step]))
+        if stop == None:
+            stop = self.tee._need_all(self)
+        else:
+            self.tee._need(self, stop)
+        offset = self.position - self.tee._base
+        return self.tee.soliditer[offset + start:offset + stop:step]
+
+    def peek_chunk(self, n, copy = False):
+        '''the next n values as one slice of the shared buffer (see
+        soliditer.peek_chunk)'''
+        self.tee._need(self, n)
+        return self.tee.soliditer.peek_chunk(n, copy,
+                                    start = self.position - self.tee._base)
+
+    def take(self, n, copy = False):
+        chunk = self.peek_chunk(n, copy = copy)
+        self.tee._advance(self, len(chunk))
+        return chunk
+
+    def chunks(self, n, copy = False):
+        while True:
+            chunk = self.take(n, copy)
+            if not len(chunk):
+                return
+            yield chunk
+
+    def consume(self, n):
+        '''skips n values (less if the data runs out)'''
+        self.tee._advance(self, self.tee._need(self, n))
+
+    def lag(self):
+        '''how many values this cursor is behind the fastest cursor.
+        Read-ahead (peeks, the buffer's default_buf) doesn't count'''
+        return max(c.position for c in self.tee.cursors) - self.position
+
+    def close(self):
+        '''stop following the data, so it no longer holds the buffer'''
+        self.tee._remove(self)
+
+class windowview(object):
+    '''A window into a list or array without copying it out. Only good until
+    the data under it changes -- for windows() that is when the next window
+    is asked for. tuple(view) keeps a copy.'''
+    def __init__(self, data, start, size):
+        self._data = data
+        self._start = start
+        self._size = size
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        return itools.islice(self._data, self._start,
+                             self._start + self._size)
+
+    def __getitem__(self, item):
+        if type(item) == slice:
+            start, stop, step = item.indices(self._size)
+            return self._data[self._start + start:self._start + stop:step]
+        if item < 0:
+            item += self._size
+        if not 0 <= item < self._size:
+            raise IndexError('windowview index out of range')
+        return self._data[self._start + item]
+
+    def __eq__(self, other):
+        return tuple(self) == tuple(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'windowview({0!r})'.format(tuple(self))
+
+_WINDOW_REFILL = 1024
+
+def _sliding_view(data, size):
+    '''read only 2d view of every size long window of a 1d array'''
+    stride_tricks = np.lib.stride_tricks
+    if hasattr(stride_tricks, 'sliding_window_view'):
+        return stride_tricks.sliding_window_view(data, size)
+    count = max(len(data) - size + 1, 0)
+    return stride_tricks.as_strided(data, (count, size),
+            (data.strides[0], data.strides[0]), writeable = False)
+
+def windows(iterable, size, step = 1, typecode = None, copy = False):
+    '''yields every window of size values, the windows starting step values
+    apart (step = size gives chunks, without a short last one).
+
+    No window is copied out of the data: numpy arrays give rows of a
+    sliding window view, streams go through a soliditer buffer and give
+    numpy views of it (with a typecode) or windowviews. So each step costs
+    O(step), not O(size) like siter[:size] + consume(1) does.
+    A windowview is only good until the next window -- use copy = True
+    to get tuples (or numpy copies) you can keep.
+    '''
+    if size < 1 or step < 1:
+        raise ValueError("size and step must be at least 1")
+    if _NUMPY_ and type(iterable) == np.ndarray and iterable.ndim == 1:
+        view = _sliding_view(iterable, size)[::step]
+        return (w.copy() for w in view) if copy else iter(view)
+    return _stream_windows(iterable, size, step, typecode, copy)
+
+def _stream_windows(iterable, size, step, typecode, copy):
+    if type(iterable) == soliditer:
+        siter = iterable
+    else:
+        siter = soliditer(iterable, typecode = typecode)
+    buf = siter._databuf
+    want = size + max(size, _WINDOW_REFILL)
+    is_np = _NUMPY_ and type(buf) == npbuffer
+    is_list = type(buf) == solidbuffer
+    while True:
+        if len(buf) < size and not siter.internal_extend(size, want):
+            return
+        if is_np:
+            window = buf[:size]
+            yield window.copy() if copy else window
+        elif copy or not is_list:
+            yield tuple(buf[:size])
+        else:
+            yield windowview(buf._data, buf._start, size)
+        if len(buf) < step:
+            siter.internal_extend(step, want)
+        buf.consume(step)
+
+class rollingsum(object):
+    '''O(1) running sum of a window: add the newest value, remove the
+    oldest. (Floats can drift a little over very long runs)'''
+    def __init__(self):
+        self.total = 0
+
+    def add(self, value):
+        self.total += value
+
+    def remove(self, value):
+        self.total -= value
+
+    def value(self):
+        return self.total
+
+class rollingmin(object):
+    '''O(1) amortized running min of a window (monotonic deque)'''
+    def _better(self, a, b):
+        return a <= b
+
+    def __init__(self):
+        self._queue = collections.deque()   # (index, value), values in order
+        self._added = self._removed = 0
+
+    def add(self, value):
+        queue, better = self._queue, self._better
+        while queue and better(value, queue[-1][1]):
+            queue.pop()
+        queue.append((self._added, value))
+        self._added += 1
+
+    def remove(self, value):
+        if self._queue[0][0] == self._removed:
+            self._queue.popleft()
+        self._removed += 1
+
+    def value(self):
+        return self._queue[0][1]
+
+class rollingmax(rollingmin):
+    '''O(1) amortized running max of a window (monotonic deque)'''
+    def _better(self, a, b):
+        return a >= b
+
+_ROLLING = {'sum': rollingsum, 'min': rollingmin, 'max': rollingmax}
+
+def rolling(iterable, size, aggregate = 'sum', step = 1):
+    '''yields aggregate of every size long window (windows start step values
+    apart) in O(1) amortized per value.
+
+    aggregate is 'sum', 'min', 'max' or your own hook: a class with
+    add(newest_value), remove(oldest_value) and value() (see rollingsum).
+    Give a tuple of them to get a tuple per window.
+    1d numpy arrays are done with numpy instead, giving numpy values, in
+    O(1) per window as well (see _np_rolling).
+    '''
+    if size < 1 or step < 1:
+        raise ValueError("size and step must be at least 1")
+    many = type(aggregate) in (tuple, list)
+    names = tuple(aggregate) if many else (aggregate,)
+    if (_NUMPY_ and type(iterable) == np.ndarray and iterable.ndim == 1 and
+            all(n in _ROLLING for n in names)):
+        results = [_np_rolling(iterable, size, n)[::step] for n in names]
+        return iter(zip(*results)) if many else iter(results[0])
+    return _rolling(iterable, size, names, step, many)
+
+_NP_ROLLING_UFUNCS = {'sum': 'add', 'min': 'minimum', 'max': 'maximum'}
+
+def _np_rolling(data, size, name):
+    '''van Herk / Gil-Werman: cut data into blocks of size values and run
+    the ufunc forwards and backwards inside each block. A window is then
+    the backward run from its start joined with the forward run up to its
+    end, so every window costs O(1) whatever size is. Sums only ever add
+    up one window's worth of values, so float error and int overflow are
+    those of a window's sum, not of a running total over the array'''
+    ufunc = getattr(np, _NP_ROLLING_UFUNCS[name])
+    n = len(data)
+    if n < size:
+        return data[:0]
+    pad = -n % size
+    if pad:
+        # the padding is never part of a window's result
+        data = np.concatenate((data, np.repeat(data[-1:], pad)))
+    blocks = data.reshape(-1, size)
+    forward = ufunc.accumulate(blocks, axis = 1).ravel()
+    backward = ufunc.accumulate(blocks[:, ::-1], axis = 1)[:, ::-1].ravel()
+    count = n - size + 1
+    backward, forward = backward[:count], forward[size - 1:n]
+    if name == 'sum':
+        # a window starting a block is the whole block, which backward
+        # already holds
+        forward = forward.copy()
+        forward[::size] = 0
+    return ufunc(backward, forward)
+
+def _rolling(iterable, size, names, step, many):
+    hooks = [_ROLLING[n]() if n in _ROLLING else n() for n in names]
+    adds = [h.add for h in hooks]
+    removes = [h.remove for h in hooks]
+    window = collections.deque()
+    count = 0   # values until the next window is due
+    for value in iterable:
+        for add in adds:
+            add(value)
+        window.append(value)
+        if len(window) > size:
+            old = window.popleft()
+            for remove in removes:
+                remove(old)
+        if len(window) == size:
+            if count == 0:
+                if many:
+                    yield tuple(h.value() for h in hooks)
+                else:
+                    yield hooks[0].value()
+                count = step
+            count -= 1
+
+def merge_sorted(*iterables, **kwargs):
+    '''merge_sorted(*iterables, key = None, reverse = False)
+    Lazily merges iterables that are each sorted (by key) into one sorted
+    iterator, holding only one value per iterable (a heap of them). Ties
+    come out in the order of the iterables, so it is stable.
+    biters, soliditers or anything else can be merged.
+
+    merge_sorted([1, 4], biter([2, 3]), soliditer([0, 5]))
+    >>> 0, 1, 2, 3, 4, 5
+    '''
+    key = kwargs.pop('key', None)
+    reverse = kwargs.pop('reverse', False)
+    if kwargs:
+        raise TypeError("unexpected arguments: " + repr(kwargs.keys()))
+    heap = []
+    for order, iterable in enumerate(iterables):
+        next_value = iter(iterable).next if VERSION == 2 else \
+            iter(iterable).__next__
+        try:
+            value = next_value()
+        except StopIteration:
+            continue
+        k = value if key == None else key(value)
+        heap.append([_reversed_key(k) if reverse else k, order, value,
+                     next_value])
+    heapq.heapify(heap)
+    while len(heap) > 1:
+        entry = heap[0]
+        yield entry[2]
+        try:
+            value = entry[3]()
+        except StopIteration:
+            heapq.heappop(heap)
+            continue
+        k = value if key == None else key(value)
+        entry[0], entry[2] = _reversed_key(k) if reverse else k, value
+        heapq.heapreplace(heap, entry)
+    if heap:
+        k, order, value, next_value = heap[0]
+        yield value
+        for value in iter(next_value, _EMPTY):
+            yield value
+
+class _reversed_key(object):
+    '''sorts in the opposite order of the key it holds'''
+    __slots__ = ('key',)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+def group_sorted(iterable, key = None):
+    '''yields (key, group) for each run of values with the same key, like
+    itools.groupby, but each group is one slice of a soliditer (a tuple, or
+    the soliditer's slicetype) that stays valid after you move on. Only one
+    group is held at a time.
+
+    Grouping merged sorted inputs joins them:
+        for k, rows in group_sorted(merge_sorted(a, b, key = id), key = id):
+    '''
+    siter = iterable if type(iterable) == soliditer else soliditer(iterable)
+    buf = siter._databuf
+    islice = itools.islice
+    while len(buf) or siter.internal_extend(1, _WINDOW_REFILL):
+        k = buf[0] if key == None else key(buf[0])
+        n = 1
+        while True:
+            size = len(buf)
+            for value in islice(buf, n, size):
+                if (value if key == None else key(value)) != k:
+                    break
+                n += 1
+            else:
+                # read ahead geometrically, so long groups stay O(n)
+                if siter.internal_extend(size + 1,
+                                         2 * size + _WINDOW_REFILL):
+                    continue
+            break
+        yield k, siter.take(n)
+
+_EMPTY = object()
+
+class peekiter(object):
+    '''An iterator you can look one value into without consuming it.
+
+    The peeked value is just held onto until next is called, so peeking and
+    checking is_exhausted are O(1) and never re-wrap the iterator (like
+    itools.chain((value,), iterator) does -- doing that over and over nests
+    chains forever and leaks memory).
+
+    Usage:
+        myiter = peekiter(iter(range(3)))
+        myiter.peek()   # 0
+        next(myiter)    # 0
+        myiter.is_exhausted()   # False
+    '''
+    def __init__(self, iterable):
+        self._iter = iter(iterable)
+        self._peeked = _EMPTY
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        value = self._peeked
+        if value is _EMPTY:
+            return next(self._iter)
+        self._peeked = _EMPTY
+        return value
+    __next__ = next
+
+    def peek(self, default = _EMPTY):
+        '''returns the next value without consuming it. If the iterator is
+        exhausted returns default (raises StopIteration if not given)'''
+        if self._peeked is _EMPTY:
+            try:
+                self._peeked = next(self._iter)
+            except StopIteration:
+                if default is _EMPTY:
+                    raise
+                return default
+        return self._peeked
+
+    def is_exhausted(self):
+        if self._peeked is not _EMPTY:
+            return False
+        try:
+            self._peeked = next(self._iter)
+        except StopIteration:
+            return True
+        return False
+
+def peekable(iterable):
+    '''returns iterable as a peekiter, without re-wrapping it if it already
+    is one'''
+    if type(iterable) == peekiter:
+        return iterable
+    return peekiter(iterable)
 
 def isdone(iterator):
     '''tells you whether the iterator is out if items without harming it.
-    returns the new rebuilt iterable
+    returns the iterator as a peekiter (the same one if it already was)
     returns isdone, iterator'''
+    iterator = peekable(iterator)
+    return iterator.is_exhausted(), iterator
+
+_PREFETCH_DONE = object()
+_PREFETCH_POLL = 0.05
+
+class _PrefetchError(object):
+    def __init__(self, error):
+        self.error = error
+
+def _prefetch_put(out, item, stop):
+    '''put item on the queue, giving up if stop gets set while the queue
+    is full. returns whether it was put'''
+    while not stop.is_set():
+        try:
+            out.put(item, timeout = _PREFETCH_POLL)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+def _prefetch_worker(iterator, out, stop, chunk_size):
+    '''runs on the prefetch thread. Does not reference the prefetchiter so
+    that it can still be garbage collected while this is running'''
+    islice = itools.islice
+    end = _PREFETCH_DONE
     try:
-        value = next(iterator)
-        return False, itools.chain((value,), iterator)
-    except StopIteration:
-        return True, iterator
+        while not stop.is_set():
+            chunk = []
+            try:
+                chunk.extend(islice(iterator, chunk_size))
+            except BaseException as E:
+                # list.extend keeps what it got before the error
+                end = _PrefetchError(E)
+                if chunk:
+                    _prefetch_put(out, chunk, stop)
+                return
+            if chunk and not _prefetch_put(out, chunk, stop):
+                return
+            if len(chunk) < chunk_size:
+                break
+    except BaseException as E:
+        end = _PrefetchError(E)
+    finally:
+        # always end the stream (even on KeyboardInterrupt, GeneratorExit
+        # ...), the consumer would wait on the queue forever otherwise
+        _prefetch_put(out, end, stop)
+
+class prefetchiter(object):
+    '''An iterator that reads ahead of you on a background thread.
+
+    Values are pulled from iterable in chunks of chunk_size and held in a
+    queue of at most depth chunks, so slow (I/O bound) sources like file
+    readers and sockets are read while you are processing what you already
+    have. Exceptions raised by the source are raised to you once you have
+    consumed every value read before them.
+
+    The thread is stopped with close(), at the end of a with block or when
+    the prefetchiter is garbage collected. (It can only notice this between
+    reads of the source)
+
+    It plugs straight into the other iterators:
+        mysiter = soliditer(())
+        mysiter.extend(prefetchiter(read_lines(socket), chunk_size = 64))
+        mybiter.extend(prefetchiter(open_file))
+    '''
+    def __init__(self, iterable, depth = 4, chunk_size = 256):
+        if depth < 1 or chunk_size < 1:
+            raise ValueError("depth and chunk_size must be at least 1")
+        self._queue = queue.Queue(depth)
+        self._stop = threading.Event()
+        self._current = iter(())
+        self._done = False
+        self._thread = threading.Thread(target = _prefetch_worker,
+            args = (iter(iterable), self._queue, self._stop, chunk_size))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        try:
+            return next(self._current)
+        except StopIteration:
+            self._current = iter(self._get_chunk())
+            return next(self._current)
+    __next__ = next
+
+    def _get_chunk(self):
+        if self._done:
+            raise StopIteration
+        item = self._queue.get()
+        if type(item) == list:
+            return item
+        self._done = True
+        self._stop.set()
+        if item is _PREFETCH_DONE:
+            raise StopIteration
+        raise item.error
+
+    def chunks(self):
+        '''yields the rest of the values a whole chunk (list) at a time'''
+        chunk = list(self._current)
+        self._current = iter(())
+        if chunk:
+            yield chunk
+        while True:
+            try:
+                yield self._get_chunk()
+            except StopIteration:
+                return
+
+    def close(self, timeout = None):
+        '''stops the background thread, dropping anything read ahead.
+        If the source is blocked in a read the thread exits after it returns;
+        give a timeout to wait for that.'''
+        self._done = True
+        self._current = iter(())
+        self._stop.set()
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        if timeout != None:
+            self._thread.join(timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+from errors import NeedModule
+
+try:
+    import concurrent.futures as futures
+except ImportError:
+    futures = None
+
+def _map_chunk(function, chunk):
+    '''runs in the pool. Module level so process pools can pickle it'''
+    return [function(value) for value in chunk]
+
+def _get_executor(executor, workers):
+    '''returns executor, owned (whether we have to shut it down)'''
+    if futures == None:
+        raise NeedModule("concurrent.futures (pip install futures on "
+                         "python 2)")
+    if isinstance(executor, futures.Executor):
+        return executor, False
+    if executor == 'thread':
+        return futures.ThreadPoolExecutor(workers), True
+    if executor == 'process':
+        return futures.ProcessPoolExecutor(workers), True
+    raise ValueError("executor must be 'thread', 'process' or an Executor")
+
+def parallel_map(function, iterable, workers = None, chunk_size = 64,
+                 window = None, ordered = True, executor = 'thread'):
+    '''Like itools.imap, but function is called on a concurrent.futures pool.
+
+    The iterable (a biter, soliditer, flatten... anything) is read lazily
+    chunk_size values at a time and each chunk is sent to the pool as one
+    task. At most window chunks (default 2 per worker) are in flight, so
+    memory stays bounded however long the iterable is.
+    Results are yielded in input order, or as soon as each chunk is done
+    if ordered = False (faster when chunk times vary a lot).
+
+    executor can be 'thread' (for functions that release the GIL), 'process'
+    (for pure python CPU work -- function and values must be picklable) or
+    an Executor you already have, which is left running.
+
+    Usage:
+        for result in parallel_map(parse, biter(files), executor = 'process'):
+            ...
+    '''
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    if workers == None:
+        import multiprocessing
+        workers = multiprocessing.cpu_count()
+    if window == None:
+        window = 2 * workers
+    window = max(window, 1)
+    pool, owned = _get_executor(executor, workers)
+    it = iter(iterable)
+    islice = itools.islice
+    pending = collections.deque()
+    try:
+        while True:
+            while len(pending) < window:
+                chunk = list(islice(it, chunk_size))
+                if not chunk:
+                    break
+                pending.append(pool.submit(_map_chunk, function, chunk))
+            if not pending:
+                return
+            if ordered:
+                done = pending.popleft()
+            else:
+                done = next(iter(futures.wait(pending,
+                            return_when = futures.FIRST_COMPLETED)[0]))
+                pending.remove(done)
+            for result in done.result():
+                yield result
+    finally:
+        for future in pending:
+            future.cancel()
+        if owned:
+            pool.shutdown(wait = False)
 
 if VERSION == 3:
     def read_xrange(xrange_object):
@@ -440,7 +2023,7 @@ class brange(object):
                 return
 
         # or create one from start, stop, step
-        self.start, self.step = 0, None
+        self.start, self.step = 0, 1
         if len(inputs) == 1:
             self.stop, = inputs
         elif len(inputs) == 2:
@@ -485,7 +2068,7 @@ class brange(object):
                 raise IndexError
             if start < self.start:
                 raise IndexError
-            return Xrange(start, stop, step)
+            return brange(start, stop, step)
 
     def index(self, value):
         error = ValueError('object.index({0}): {0} not in object'.format(value))
@@ -500,14 +2083,47 @@ class brange(object):
             raise error
         return index
 
-def flatten(iterable):
-    '''flatten an iterator of any depth'''
-    iterable = biter(iterable)
-    for e in iterable:
-        if hasattr(e, '__iter__'):
-            iterable.front_extend(e)
+if VERSION == 2:
+    _ATOMIC_TYPES = (str, unicode, bytearray)
+else:
+    _ATOMIC_TYPES = (str, bytes, bytearray)
+
+def flatten(iterable, max_depth = None, atomic = _ATOMIC_TYPES):
+    '''flatten an iterator of any depth.
+
+    max_depth limits how many levels are flattened (None is all of them).
+    Anything that is an instance of atomic (strings by default) is yielded
+    whole instead of being iterated into.
+
+    Works on an explicit stack of iterators: leaves are yielded straight
+    out of the iterator they are in and numpy arrays are walked through
+    ravel(), so no object is made per value or per nesting step.
+    '''
+    atomic = tuple(atomic)
+    nested = {}     # type -> whether to iterate into values of it
+    stack = [iter(iterable)]
+    while stack:
+        top = stack[-1]
+        for e in top:
+            etype = type(e)
+            try:
+                is_nested = nested[etype]
+            except KeyError:
+                is_nested = nested[etype] = (hasattr(e, '__iter__') and
+                                             not isinstance(e, atomic))
+            if not is_nested or (max_depth != None and
+                                 len(stack) > max_depth):
+                yield e
+            elif (_NUMPY_ and etype == np.ndarray and e.dtype != object and
+                    (max_depth == None or
+                     len(stack) + e.ndim - 1 <= max_depth)):
+                for value in e.ravel():
+                    yield value
+            else:
+                stack.append(iter(e))
+                break
         else:
-            yield e
+            stack.pop()
 
 def find_depth(value):
     '''
@@ -525,9 +2141,9 @@ def find_depth(value):
     if not hasattr(value, '__iter__'):
         return 0, value
 
-    if hasattr(value, 'next'): # if it is an itterator
-        firstval = value.next()     # take a peek
-        value = itools.chain((firstval,), value)
+    if iter(value) is value: # if it is an itterator
+        value = peekable(value)
+        firstval = value.peek()     # take a peek
     else:
         firstval = value[0]
 
@@ -551,10 +2167,9 @@ def get_first(data):
      if not hasattr(data, '__iter__'):
           return data, data
 
-     if hasattr(data, 'next'): # if it is an itterator
-          firstval = data.next()     # take a peek
-          data = itools.chain((firstval,), data)
-          return firstval, data
+     if iter(data) is data: # if it is an itterator
+          data = peekable(data)
+          return data.peek(), data     # take a peek
 
      firstval = data[0]
      return firstval, data
@@ -580,8 +2195,127 @@ def special_figt(data_list, value, start = 0, stop = None, step = 1):
     else:
         return None
 
+# first_index_* fast paths. numpy arrays (and anything exposing a numeric
+# buffer) are scanned a chunk at a time with a boolean mask + argmax, so we
+# only ever look at the chunks up to the first hit and never create python
+# objects for the elements.
+_NO_FAST_PATH = object()
+_NP_CHUNK = 1 << 16
+_BUFFER_TYPECODES = 'bBhHiIlLqQfd'
+if VERSION == 2:
+    _REAL_TYPES = (int, long, float, bool)
+    _STRING_TYPES = (str, unicode)
+else:
+    _REAL_TYPES = (int, float, bool)
+    _STRING_TYPES = (str, bytes)
+_FLOAT_TYPES = (float,)
+if _NUMPY_:
+    _REAL_TYPES += (np.integer, np.floating, np.bool_)
+    _FLOAT_TYPES += (np.floating,)
+
+def _np_from_buffer(data):
+    '''returns a zero-copy numpy array of a numeric buffer object (or the
+    array itself), or None if it can't be done'''
+    if isinstance(data, np.ndarray):
+        return data
+    if isinstance(data, bytearray) or (VERSION == 3 and type(data) == bytes):
+        return np.frombuffer(data, np.uint8)
+    if isinstance(data, array.array) and data.typecode in _BUFFER_TYPECODES:
+        return np.frombuffer(data, data.typecode)
+    if VERSION == 3 and isinstance(data, memoryview) and data.ndim == 1:
+        return np.asarray(data)
+    return None
+
+def _np_mask_function(test, value, dtype):
+    '''returns a function that takes a chunk and returns the boolean mask for
+    the first_index test, or None if numpy can't give the same answer'''
+    if test in ('in', 'nin'):
+        if not all(isinstance(v, _REAL_TYPES) for v in value):
+            return None
+        values = np.array(tuple(value))
+        if test == 'in':
+            return lambda chunk: np.isin(chunk, values)
+        return lambda chunk: ~np.isin(chunk, values)
+
+    if not isinstance(value, _REAL_TYPES):
+        return None
+    if test == 'et' and value != value:     # nan
+        if dtype.kind != 'f':
+            return lambda chunk: np.zeros(len(chunk), bool)
+        return np.isnan
+    return {'gt': lambda chunk: chunk > value,
+            'gtet': lambda chunk: chunk >= value,
+            'lt': lambda chunk: chunk < value,
+            'ne': lambda chunk: chunk != value,
+            'et': lambda chunk: chunk == value,
+            }[test]
+
+def _np_chunks(data_list, start, stop, step):
+    '''returns data, length, get_chunk for scanning data_list with numpy the
+    same way islice / bslice would walk it. get_chunk(i) returns the chunk
+    starting at (sliced) index i. Returns None if it can't be done'''
+    data = _np_from_buffer(data_list)
+    if data is None or data.ndim != 1 or data.dtype.kind not in 'biuf':
+        return None
+    if step == None:
+        step = 1
+    if step > 0:
+        if start < 0 or (stop != None and stop < 0):
+            return None     # islice raises the error
+        data = data[start:stop:step]
+        length = len(data)
+        get_chunk = lambda i: data[i:i + _NP_CHUNK]
+    else:
+        if stop == None:
+            return None     # bslice raises the error
+        indexes = range(start, stop, step)
+        length = len(indexes)
+        if length and not (-len(data) <= indexes[0] < len(data) and
+                           -len(data) <= indexes[-1] < len(data)):
+            return None     # bslice raises IndexError (lazily)
+        get_chunk = lambda i: data.take(np.arange(start + i * step,
+            start + min(i + _NP_CHUNK, length) * step, step))
+    return data, length, get_chunk
+
+def _fast_first_index(data_list, test, value, start, stop, step):
+    '''the numpy / buffer version of the first_index_* functions.
+    test is the function name without "first_index_" (gt, et, in...)
+    Returns _NO_FAST_PATH if data_list has to go through the python version,
+    otherwise the same result the python version would give.'''
+    chunks = _np_chunks(data_list, start, stop, step) if _NUMPY_ else None
+    if chunks == None:
+        return _NO_FAST_PATH
+    data, length, get_chunk = chunks
+
+    if test in ('is', 'nis'):
+        # numeric ndarrays give a new object for every element, so nothing
+        # "is" the value. Buffers give (cached) python ints, bools are
+        # singletons -- those go through python
+        if type(data_list) != np.ndarray or data.dtype.kind == 'b':
+            return _NO_FAST_PATH
+        if test == 'is':
+            return None
+        return start if length else None
+
+    get_mask = _np_mask_function(test, value, data.dtype)
+    if get_mask == None:
+        return _NO_FAST_PATH
+    try:
+        with np.errstate(invalid = 'ignore'):     # comparisons with nan
+            for i in range(0, length, _NP_CHUNK):
+                mask = get_mask(get_chunk(i))
+                found = int(mask.argmax())
+                if mask[found]:
+                    return i + found + start
+    except (TypeError, OverflowError):
+        return _NO_FAST_PATH
+    return None
+
 def first_index_gt(data_list, value, start = 0, stop = None, step = 1):
     '''return the first index greater than value from a given list like object'''
+    index = _fast_first_index(data_list, 'gt', value, start, stop, step)
+    if index is not _NO_FAST_PATH:
+        return index
     if step == None or step > 0:
         data_list = itools.islice(data_list, start, stop, step)
     else:
@@ -593,6 +2327,9 @@ def first_index_gt(data_list, value, start = 0, stop = None, step = 1):
 
 def first_index_gtet(data_list, value, start = 0, stop = None, step = 1):
     '''return the first index greater than value from a given list like object'''
+    index = _fast_first_index(data_list, 'gtet', value, start, stop, step)
+    if index is not _NO_FAST_PATH:
+        return index
     if step == None or step > 0:
         data_list = itools.islice(data_list, start, stop, step)
     else:
@@ -604,6 +2341,9 @@ def first_index_gtet(data_list, value, start = 0, stop = None, step = 1):
 
 def first_index_lt(data_list, value, start = 0, stop = None, step = 1):
     '''return the first index less than value from a given list like object'''
+    index = _fast_first_index(data_list, 'lt', value, start, stop, step)
+    if index is not _NO_FAST_PATH:
+        return index
     if step == None or step > 0:
         data_list = itools.islice(data_list, start, stop, step)
     else:
@@ -615,6 +2355,9 @@ def first_index_lt(data_list, value, start = 0, stop = None, step = 1):
 
 def first_index_ne(data_list, value, start = 0, stop = None, step = 1):
     '''returns first index not equal to the value from list'''
+    index = _fast_first_index(data_list, 'ne', value, start, stop, step)
+    if index is not _NO_FAST_PATH:
+        return index
     if step == None or step > 0:
         data_list = itools.islice(data_list, start, stop, step)
     else:
@@ -627,18 +2370,18 @@ def first_index_ne(data_list, value, start = 0, stop = None, step = 1):
 def first_index_et(data_list, value, start = 0, stop = None, step = 1):
     '''same as data_list.index(value), except with exception handling (returns
     -1). Also finds 'nan' values '''
+    index = _fast_first_index(data_list, 'et', value, start, stop, step)
+    if index is not _NO_FAST_PATH:
+        return index
     if step == None or step > 0:
         data_list = itools.islice(data_list, start, stop, step)
     else:
         data_list = bslice(data_list, start, stop, step)
     try:
         if type(value) == float and math.isnan(value):
-            floats = set(float,)
-            if _NUMPY_:
-                floats.update((np.float64, np.float32, np.float96))
             isnan = math.isnan
             return next(data[0] for data in enumerate(data_list)
-              if (type(data[1]) in floats
+              if (isinstance(data[1], _FLOAT_TYPES)
               and isnan(data[1])))  + start
         else:
             return next(data[0] for data in
@@ -647,6 +2390,9 @@ def first_index_et(data_list, value, start = 0, stop = None, step = 1):
 
 def first_index_in(data_list, in_set, start = 0, stop = None, step = 1):
     '''finds the first index that is in a given set of any iterator'''
+    index = _fast_first_index(data_list, 'in', in_set, start, stop, step)
+    if index is not _NO_FAST_PATH:
+        return index
     if step == None or step > 0:
         data_list = itools.islice(data_list, start, stop, step)
     else:
@@ -659,6 +2405,9 @@ def first_index_in(data_list, in_set, start = 0, stop = None, step = 1):
 
 def first_index_nin(data_list, notin_set, start = 0, stop = None, step = 1):
     '''finds the first index that is not in a given set of any iterator'''
+    index = _fast_first_index(data_list, 'nin', notin_set, start, stop, step)
+    if index is not _NO_FAST_PATH:
+        return index
     if step == None or step > 0:
         data_list = itools.islice(data_list, start, stop, step)
     else:
@@ -670,6 +2419,9 @@ def first_index_nin(data_list, notin_set, start = 0, stop = None, step = 1):
     except StopIteration: return None
 
 def first_index_is(data_list, identity, start = 0, stop = None, step = 1):
+    index = _fast_first_index(data_list, 'is', identity, start, stop, step)
+    if index is not _NO_FAST_PATH:
+        return index
     if step == None or step > 0:
         data_list = itools.islice(data_list, start, stop, step)
     else:
@@ -681,6 +2433,9 @@ def first_index_is(data_list, identity, start = 0, stop = None, step = 1):
     except StopIteration: return None
 
 def first_index_nis(data_list, identity, start = 0, stop = None, step = 1):
+    index = _fast_first_index(data_list, 'nis', identity, start, stop, step)
+    if index is not _NO_FAST_PATH:
+        return index
     if step == None or step > 0:
         data_list = itools.islice(data_list, start, stop, step)
     else:
@@ -691,41 +2446,318 @@ def first_index_nis(data_list, identity, start = 0, stop = None, step = 1):
         return index + start
     except StopIteration: return None
 
+def _np_first_indexes_et(data_list, pending, nan_key, start, stop, step):
+    '''numpy version of first_indexes_et, or _NO_FAST_PATH'''
+    if not all(isinstance(v, _REAL_TYPES) for v in pending):
+        return _NO_FAST_PATH
+    chunks = _np_chunks(data_list, start, stop, step) if _NUMPY_ else None
+    if chunks == None:
+        return _NO_FAST_PATH
+    data, length, get_chunk = chunks
+    find_nan = nan_key != None and data.dtype.kind == 'f'
+    found = {}
+    for i in range(0, length, _NP_CHUNK):
+        if not pending and not find_nan:
+            break
+        chunk = get_chunk(i)
+        if pending:
+            values = np.array(tuple(pending))
+            hits = np.flatnonzero(np.isin(chunk, values))
+            if len(hits):
+                # unique gives the first position of each value in the chunk
+                hit_values, first = np.unique(chunk[hits], return_index = True)
+                for v, h in zip(hit_values.tolist(), hits[first].tolist()):
+                    found[pending.pop(v)] = i + h + start
+        if find_nan:
+            mask = np.isnan(chunk)
+            h = int(mask.argmax())
+            if mask[h]:
+                found[nan_key] = i + h + start
+                find_nan = False
+    return found
+
+def first_indexes_et(data_list, values, start = 0, stop = None, step = 1):
+    '''first_index_et for several values at once, in a single pass.
+    Returns a dict of {value: first index} for the values that were found
+    (missing values are left out). Stops as soon as every value is found,
+    so iterators (including biter and soliditer) are only consumed up to the
+    last value found. nan values are found the same way as first_index_et'''
+    pending, nan_key = {}, None
+    for v in values:
+        if type(v) == float and math.isnan(v):
+            nan_key = v
+        else:
+            pending[v] = v
+    found = _np_first_indexes_et(data_list, pending, nan_key, start, stop,
+                                 step)
+    if found is not _NO_FAST_PATH:
+        return found
+
+    if step == None or step > 0:
+        data_list = itools.islice(data_list, start, stop, step)
+    else:
+        data_list = bslice(data_list, start, stop, step)
+    isnan = math.isnan
+    find_nan = nan_key != None
+    found = {}
+    if not pending and not find_nan:
+        return found
+    for index, data in enumerate(data_list, start):
+        try:
+            if data in pending:
+                found[pending.pop(data)] = index
+            elif find_nan and isinstance(data, _FLOAT_TYPES) and isnan(data):
+                found[nan_key] = index
+                find_nan = False
+            else:
+                continue
+        except TypeError:   # unhashable, can't be equal to any of them
+            continue
+        # check only on a hit so we don't pull an extra value off iterators
+        if not pending and not find_nan:
+            break
+    return found
+
+''' Sorted versions of the first_index_* functions. If you know the data is
+sorted (smallest to largest) these do a binary search instead of a scan:
+O(log n) instead of O(n). numpy arrays and numeric buffers use
+np.searchsorted, everything else uses bisect (any sequence with len and
+__getitem__ works). Only step = 1 is supported.'''
+def _sorted_search(data_list, values, side, start, stop):
+    '''returns the insertion index/indexes of values, or None for a single
+    value when the index would be past stop'''
+    data = _np_from_buffer(data_list) if _NUMPY_ else None
+    if data is None and _NUMPY_ and isinstance(values, np.ndarray):
+        # one O(n) conversion beats len(values) python bisects
+        data = np.asarray(data_list)
+    if data is not None:
+        out = np.searchsorted(data[start:stop], values, side) + start
+        if np.ndim(out) == 0:
+            out = int(out)
+            stop = len(data) if stop == None else min(stop, len(data))
+            return out if out < stop else None
+        return out
+
+    stop = len(data_list) if stop == None else min(stop, len(data_list))
+    search = bisect.bisect_right if side == 'right' else bisect.bisect_left
+    if hasattr(values, '__iter__') and not isinstance(values, _STRING_TYPES):
+        return [search(data_list, v, start, stop) for v in values]
+    out = search(data_list, values, start, stop)
+    return out if out < stop else None
+
+def sorted_first_index_gt(data_list, value, start = 0, stop = None):
+    '''first_index_gt for sorted data'''
+    return _sorted_search(data_list, value, 'right', start, stop)
+
+def sorted_first_index_gtet(data_list, value, start = 0, stop = None):
+    '''first_index_gtet for sorted data'''
+    return _sorted_search(data_list, value, 'left', start, stop)
+
+def sorted_first_index_lt(data_list, value, start = 0, stop = None):
+    '''first_index_lt for sorted data. The smallest value is first, so this
+    only has to look at data_list[start]'''
+    stop = len(data_list) if stop == None else min(stop, len(data_list))
+    if start < stop and data_list[start] < value:
+        return start
+    return None
+
+def sorted_insert_indexes(data_list, values, side = 'right', start = 0,
+                          stop = None):
+    '''Batched version of the sorted searches. Returns the insertion index of
+    every value in values (in one np.searchsorted call if numpy is
+    available).
+    side = 'right' gives sorted_first_index_gt for each value
+    side = 'left' gives sorted_first_index_gtet for each value
+    Values that would be past the end get the index stop (len(data_list)
+    by default) instead of None'''
+    if side not in ('left', 'right'):
+        raise ValueError("side must be 'left' or 'right': " + repr(side))
+    return _sorted_search(data_list, values, side, start, stop)
+
 '''Numpy only functions
 These functions can only be used with numpy
 '''
 if _NUMPY_:
-    def np_index_to_coords(index, shape):
-        '''convert index to coordinates given the shape'''
-        coords = []
-        for i in range(1, len(shape)):
-            divisor = int(np.product(shape[i:]))
-            value = index//divisor
-            coords.append(value)
-            index -= value * divisor
-        coords.append(index)
-        return tuple(coords)
+    def np_index_to_coords(index, shape, order = 'C'):
+        '''convert flat index (or an array of them) to coordinates given the
+        shape. An int gives a tuple of ints, an array of indexes a tuple of
+        arrays (one per dimension) -- like np.unravel_index, which does the
+        work'''
+        coords = np.unravel_index(index, shape, order = order)
+        if np.ndim(index) == 0:
+            return tuple(int(c) for c in coords)
+        return coords
+
+    def _np_block_mask(block, value):
+        if type(value) == float and value != value:
+            return np.isnan(block)
+        return block == value
 
     def np_first_coords_et(data_matrix, value, start = 0):
-        '''the first coordinates that are equal to the value'''
-        index = first_index_et(data_matrix.flatten(), value, start)
-        shape = data_matrix.shape
-        return np_index_to_coords(index, shape)
-
-    def np_sort_together(data):
-        '''sorts a multi row array by keeping the rows together.
-        Sorts only first row
-        untested!
+        '''the first coordinates (in C order) that are equal to the value,
+        or None. start is a flat (C order) index to start from.
+
+        Never copies or flattens the data: it is compared a block of rows
+        at a time, so views with any strides or order are searched in place
+        and memory use stays bounded.'''
+        data = np.asarray(data_matrix)
+        if data.ndim < 2:
+            index = first_index_et(data.reshape(-1), value, start)
+            return None if index == None else np_index_to_coords(
+                index, data.shape)
+        row_size = int(np.prod(data.shape[1:]))
+        if row_size == 0:
+            return None
+        rows = max(_NP_CHUNK // row_size, 1)
+        row = start // row_size
+        with np.errstate(invalid = 'ignore'):
+            while row < data.shape[0]:
+                mask = _np_block_mask(data[row:row + rows], value)
+                flat = mask.reshape(-1)     # mask is new, so this is a view
+                offset = row * row_size
+                if offset < start:
+                    flat[:start - offset] = False
+                hit = flat.argmax()
+                if flat[hit]:
+                    return np_index_to_coords(offset + int(hit), data.shape)
+                row += rows
+        return None
+
+    _NP_SORT_CHUNK = 1 << 20    # columns per in-memory run for memmaps
+
+    def _np_lexorder(block, keys):
+        '''stable order of the columns of block by the key rows (first key
+        most significant)'''
+        return np.lexsort([block[k] for k in reversed(keys)])
+
+    def _np_lex_before(block, keys, key, strict):
+        '''mask of the columns of block that sort before (or equal to, if
+        not strict) the column with key values key'''
+        last = block[keys[-1]]
+        result = last < key[-1] if strict else last <= key[-1]
+        for k, value in reversed(list(zip(keys, key))[:-1]):
+            result = (block[k] < value) | ((block[k] == value) & result)
+        return result
+
+    def np_sort_together(data, keys = (0,), out = None, chunk_size = None,
+                         workers = None):
+        '''sorts the columns of a multi row array, keeping each column
+        together. Sorted by the rows in keys -- the first one, then the next
+        one for ties and so on -- and stable (np.lexsort).
+
+        np.memmap data (or any data with more columns than chunk_size) is
+        sorted out of core: runs of chunk_size columns are sorted in memory
+        (on a thread pool of workers when concurrent.futures is there),
+        written to a temporary memmap, then k-way merged into out a block
+        at a time. Give out as an np.memmap to keep the result on disk too,
+        otherwise it is returned as a new array.
+
+        np_sort_together([[3, 1, 2], [30, 10, 20]])
+        >>> [[1, 2, 3], [10, 20, 30]]
+
+        1-D data is sorted as a single row and comes back 1-D.
         '''
-        x, y = data
-        ndx = np.argsort(data[0])
-        data = np.dstack([n[ndx] for n in data])
-        data = np.transpose(data)
-        return data
+        data = np.asanyarray(data)
+        if data.ndim == 1:
+            row_out = None if out is None else out[np.newaxis]
+            ordered = np_sort_together(data[np.newaxis], keys, row_out,
+                                       chunk_size, workers)
+            return ordered[0] if out is None else out
+        keys = tuple(keys)
+        columns = data.shape[1]
+        if chunk_size == None and isinstance(data, np.memmap):
+            chunk_size = _NP_SORT_CHUNK
+        if chunk_size == None or columns <= chunk_size:
+            ordered = data[:, _np_lexorder(data, keys)]
+            if out is None:
+                return ordered
+            out[...] = ordered
+            return out
+        if out is None:
+            out = np.empty(data.shape, data.dtype)
+        _np_external_sort(data, keys, out, chunk_size, workers)
+        return out
+
+    def _np_external_sort(data, keys, out, chunk_size, workers):
+        runs = np.memmap(tempfile.TemporaryFile(), data.dtype, 'w+',
+                         shape = data.shape)
+        columns = data.shape[1]
+        spans = [(a, min(a + chunk_size, columns))
+                 for a in range(0, columns, chunk_size)]
+
+        def sort_run(span):
+            block = np.array(data[:, span[0]:span[1]])
+            runs[:, span[0]:span[1]] = block[:, _np_lexorder(block, keys)]
+        if futures != None and workers != 1 and len(spans) > 1:
+            for _ in parallel_map(sort_run, spans, workers = workers,
+                                  chunk_size = 1, ordered = False):
+                pass
+        else:
+            for span in spans:
+                sort_run(span)
+        # the merge buffers about chunk_size columns in all, but not so few
+        # per run that the rounds are all overhead
+        _np_merge_runs(runs, spans, keys, out,
+                       max(chunk_size // len(spans), min(chunk_size, 1024)))
+
+    def _np_merge_runs(runs, spans, keys, out, block):
+        '''k-way merge of the sorted column runs into out.
+
+        Each round takes from the buffered block of every run the columns
+        that nothing still on disk can come before: those below the last
+        buffered column of every other run with more left (strictly below
+        it for runs earlier on, so ties keep their run order). That
+        includes the whole block of the run with the smallest last column,
+        and the columns taken only need sorting amongst themselves.'''
+        position = [a for a, b in spans]
+        ends = [b for a, b in spans]
+        buffers = [runs[:, a:a] for a, b in spans]
+        written = 0
+        while True:
+            for r, buf in enumerate(buffers):
+                if not buf.shape[1] and position[r] < ends[r]:
+                    stop = min(position[r] + block, ends[r])
+                    buffers[r] = np.array(runs[:, position[r]:stop])
+                    position[r] = stop
+            live = [r for r, buf in enumerate(buffers) if buf.shape[1]]
+            if not live:
+                return
+            # smallest last key of the runs with more left, before / after r
+            lasts = [tuple(buf[k, -1] for k in keys)
+                     if position[r] < ends[r] else None
+                     for r, buf in enumerate(buffers)]
+            before, smallest = [], None
+            for last in lasts:
+                before.append(smallest)
+                if last != None and (smallest == None or last < smallest):
+                    smallest = last
+            after, smallest = [], None
+            for last in reversed(lasts):
+                after.append(smallest)
+                if last != None and (smallest == None or last < smallest):
+                    smallest = last
+            after.reverse()
+            pieces = []
+            for r in live:
+                buf = buffers[r]
+                take = np.ones(buf.shape[1], bool)
+                if before[r] != None:
+                    take &= _np_lex_before(buf, keys, before[r], True)
+                if after[r] != None:
+                    take &= _np_lex_before(buf, keys, after[r], False)
+                n = int(take.sum())     # buf is sorted, so take is a prefix
+                pieces.append(buf[:, :n])
+                buffers[r] = buf[:, n:]
+            merged = np.concatenate(pieces, axis = 1)
+            n = merged.shape[1]
+            out[:, written:written + n] = merged[:, _np_lexorder(merged,
+                                                                 keys)]
+            written += n
 
     def np_columnize_rows(data):
-        '''This does something similar to a Transpose, but on any set of data'''
-        return np.fliplr(np.rot90(data, k=-1))
+        '''This does something similar to a Transpose, but on any set of data
+        (swaps the first two axes). Returns a view, nothing is copied'''
+        return np.swapaxes(data, 0, 1)
 
     def np_std_repeat(data, times):
         '''repeats an array of data several times.
@@ -755,7 +2787,7 @@ if __name__ == '__main__':
     import pdb
     pdb.set_trace()
     mylist = [range(10), [range(20), range(15)]]
-    print tuple(flatten(mylist))
+    print(tuple(flatten(mylist)))
 #    import dbe
 #    import pdb
 #
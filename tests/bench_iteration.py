@@ -0,0 +1,510 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#    ******  The Cloud Toolbox v0.1.2******
+#    This is the cloud toolbox -- a single module used in several packages
+#    found at <https://github.com/cloudformdesign>
+#    For more information see <cloudformdesign.com>
+#
+#    This module may be a part of a python package, and may be out of date.
+#    This behavior is intentional, do NOT update it.
+#    
+#    You are encouraged to use this pacakge, or any code snippets in it, in
+#    your own projects. Hopefully they will be helpful to you!
+#        
+#    This project is Licenced under The MIT License (MIT)
+#    
+#    Copyright (c) 2013 Garrett Berg cloudformdesign.com
+#    An updated version of this file can be found at:
+#    <https://github.com/cloudformdesign/cloudtb>
+#    
+#    Permission is hereby granted, free of charge, to any person obtaining a 
+#    copy of this software and associated documentation files (the "Software"),
+#    to deal in the Software without restriction, including without limitation 
+#    the rights to use, copy, modify, merge, publish, distribute, sublicense,
+#    and/or sell copies of the Software, and to permit persons to whom the 
+#    Software is furnished to do so, subject to the following conditions:
+#    
+#    The above copyright notice and this permission notice shall be included in
+#    all copies or substantial portions of the Software.
+#    
+#    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL 
+#    THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+#    FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
+#    DEALINGS IN THE SOFTWARE.
+#
+#    http://opensource.org/licenses/MIT
+# -*- coding: utf-8 -*-
+'''
+Benchmarks for the iteration module. Run as __main__:
+    python bench_iteration.py
+
+These are not unittests, they print out the time taken per element so that
+you can see how the hot paths scale with the size of the data.
+'''
+import time
+
+try:
+    from .. import iteration
+except ValueError:
+    try:
+        import iteration
+    except ImportError:
+        import sys
+        sys.path.insert(1, '..')
+        import iteration
+
+def time_per_element(function, n, repeat = 3):
+    '''returns the best time per element (in seconds) of calling
+    function(n) repeat times'''
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        function(n)
+        took = time.time() - start
+        if best == None or took < best:
+            best = took
+    return best / n
+
+def soliditer_next(default_buf):
+    '''consume a soliditer one element at a time'''
+    def run(n):
+        si = iteration.soliditer(iter(range(n)), default_buf = default_buf)
+        for _ in si:
+            pass
+    return run
+
+def window_step(buf_type, size):
+    '''keep size elements buffered, popping one off the front and
+    appending one onto the back each step -- a lookahead window of size'''
+    def run(n):
+        buf = buf_type(range(size))
+        if buf_type == list:
+            popleft = lambda: buf.pop(0)
+        else:
+            popleft = buf.popleft
+        append = buf.append
+        for i in range(n):
+            popleft()
+            append(i)
+    return run
+
+def bench_soliditer_next(buf_sizes = (10, 1000, 10**4, 10**5), n = 10**5):
+    print('lookahead window step (popleft + append) -- ns per element')
+    print('{0:>11} {1:>12} {2:>12}'.format('window', 'solidbuffer',
+                                           'list.pop(0)'))
+    for size in buf_sizes:
+        solid = time_per_element(window_step(iteration.solidbuffer, size), n)
+        old = time_per_element(window_step(list, size), n)
+        print('{0:>11} {1:12.1f} {2:12.1f}'.format(size, solid * 1e9,
+                                                  old * 1e9))
+    print('')
+    print('soliditer next() -- ns per element')
+    print('{0:>11} {1:>12}'.format('default_buf', 'soliditer'))
+    for size in buf_sizes:
+        solid = time_per_element(soliditer_next(size), n * 10)
+        print('{0:>11} {1:12.1f}'.format(size, solid * 1e9))
+
+def first_index_python(name, data, value):
+    '''run a first_index_* function with the numpy fast path turned off'''
+    fast = iteration._fast_first_index
+    iteration._fast_first_index = lambda *args: iteration._NO_FAST_PATH
+    try:
+        return getattr(iteration, 'first_index_' + name)(data, value)
+    finally:
+        iteration._fast_first_index = fast
+
+def bench_first_index(n = 10**6):
+    '''time to find a value in the last element of n numbers'''
+    import numpy as np
+    import array
+    print('first_index_* on {0} elements (hit on the last one) -- ms'.format(n))
+    print('{0:>6} {1:>12} {2:>10} {3:>10}'.format('test', 'type', 'fast',
+                                                  'python'))
+    datas = (('ndarray', np.zeros(n)), ('array', array.array('d', [0] * n)),
+             ('bytearray', bytearray(n)))
+    for name, value in (('gt', 0.5), ('et', 1), ('ne', 0), ('in', (1, 2))):
+        for dtype, data in datas:
+            data[-1] = 1
+            start = time.time()
+            fast = getattr(iteration, 'first_index_' + name)(data, value)
+            fast_time = time.time() - start
+            start = time.time()
+            slow = first_index_python(name, data, value)
+            slow_time = time.time() - start
+            assert fast == slow == n - 1
+            print('{0:>6} {1:>12} {2:10.2f} {3:10.2f}'.format(name, dtype,
+                fast_time * 1e3, slow_time * 1e3))
+
+def bench_sorted_search(n = 10**6, queries = 10**5):
+    '''linear first_index_gt against the sorted (binary search) versions'''
+    import numpy as np
+    data = np.arange(n)
+    values = np.random.randint(0, n, queries)
+    print('first_index_gt on {0} sorted elements -- ms'.format(n))
+    start = time.time()
+    for v in values[:100]:
+        iteration.first_index_gt(data, v)
+    linear = (time.time() - start) / 100
+    start = time.time()
+    for v in values[:100]:
+        iteration.sorted_first_index_gt(data, v)
+    single = (time.time() - start) / 100
+    start = time.time()
+    iteration.sorted_insert_indexes(data, values)
+    batched = (time.time() - start) / queries
+    print('{0:>32} {1:10.4f}'.format('first_index_gt per query', linear * 1e3))
+    print('{0:>32} {1:10.4f}'.format('sorted_first_index_gt per query',
+                                     single * 1e3))
+    print('{0:>32} {1:10.4f}'.format('sorted_insert_indexes per query',
+                                     batched * 1e3))
+
+def bench_typed_memory(n = 10**6):
+    '''bytes per element of n floats in a soliditer lookahead buffer'''
+    import sys
+    print('soliditer lookahead of {0} floats -- bytes per element'.format(n))
+    si = iteration.soliditer((n * 1.1 for n in range(n)))
+    si[n - 1]
+    data = si._databuf._data
+    size = sys.getsizeof(data) + sum(sys.getsizeof(v) for v in data)
+    print('{0:>20} {1:10.1f}'.format('list', size / float(n)))
+    si = iteration.soliditer((n * 1.1 for n in range(n)), typecode = 'd')
+    si[n - 1]
+    size = si._databuf._data.nbytes
+    print('{0:>20} {1:10.1f}'.format('typecode = "d"', size / float(n)))
+
+def bench_chunks(n = 10**6, chunk = 2**16):
+    '''walk a soliditer a chunk at a time: take vs siter[:n] + consume(n)
+    vs next'''
+    print('soliditer through {0} values in {1} value chunks -- ms'.format(
+        n, chunk))
+    def sliced(si):
+        while si.buffer_size() or si._iterbuf:
+            data = si[:chunk]
+            si.consume(len(data))
+            if not data:
+                break
+    runs = (('next', lambda si: [v for v in si]),
+            ('slice + consume', sliced),
+            ('chunks', lambda si: [c for c in si.chunks(chunk)]))
+    for name, run in runs:
+        si = iteration.soliditer(iter(range(n)))
+        start = time.time()
+        run(si)
+        print('{0:>20} {1:10.1f}'.format(name, (time.time() - start) * 1e3))
+
+def slow_reader(lines, line_size = 100, delay = 0.001):
+    '''stands in for a file or socket: sleeps (releasing the GIL) for every
+    block of 10 lines it reads'''
+    for n in range(lines):
+        if n % 10 == 0:
+            time.sleep(delay)
+        yield 'x' * line_size
+
+def bench_prefetch(lines = 5000, work = 0.001):
+    '''soliditer over an I/O bound source, with and without a prefetchiter
+    reading ahead while the (also sleeping) consumer works'''
+    print('soliditer over {0} slow lines -- seconds'.format(lines))
+    def consume(si):
+        for n, line in enumerate(si):
+            if n % 10 == 0:
+                time.sleep(work)
+    for name, prefetch in (('direct', False), ('prefetchiter', True)):
+        source = slow_reader(lines)
+        if prefetch:
+            source = iteration.prefetchiter(source, chunk_size = 64)
+        si = iteration.soliditer(source, default_buf = 64)
+        start = time.time()
+        consume(si)
+        print('{0:>20} {1:10.3f}'.format(name, time.time() - start))
+
+def cpu_work(value, loops = 2000):
+    '''pure python busywork. Module level so process pools can pickle it'''
+    total = value
+    for n in range(loops):
+        total = (total * 31 + n) % 1000003
+    return total
+
+def bench_parallel_map(n = 20000, chunk_size = 256):
+    '''parallel_map of CPU bound work on process pools of growing size,
+    against plain map. Scales with the number of cores you have'''
+    import multiprocessing
+    cores = multiprocessing.cpu_count()
+    print('parallel_map over {0} values ({1} cores) -- seconds'.format(
+        n, cores))
+    start = time.time()
+    expected = list(map(cpu_work, range(n)))
+    print('{0:>20} {1:10.3f}'.format('map', time.time() - start))
+    workers = 1
+    while workers <= max(cores, 2):
+        for ordered in (True, False):
+            start = time.time()
+            got = list(iteration.parallel_map(cpu_work, range(n),
+                       workers = workers, chunk_size = chunk_size,
+                       ordered = ordered, executor = 'process'))
+            name = '{0} workers{1}'.format(workers,
+                                           '' if ordered else ' unordered')
+            print('{0:>20} {1:10.3f}'.format(name, time.time() - start))
+            assert sorted(got) == sorted(expected)
+        workers *= 2
+
+def flatten_biter(iterable):
+    '''the old flatten: front_extends a biter for every nested value'''
+    iterable = iteration.biter(iterable)
+    next_value = iterable.next
+    while True:
+        try:
+            e = next_value()
+        except StopIteration:
+            return
+        if hasattr(e, '__iter__'):
+            iterable.front_extend(e)
+        else:
+            yield e
+
+def ragged(leaves, seed = 0):
+    '''a ragged nested list with leaves values, lists of 0 to 20 values
+    nested 1 to 4 deep'''
+    import random
+    rand = random.Random(seed)
+    out, count = [], 0
+    while count < leaves:
+        node = list(range(min(rand.randint(0, 20), leaves - count)))
+        count += len(node)
+        for _ in range(rand.randint(0, 3)):
+            node = [node, rand.random()] if rand.random() < .5 else [node]
+            count += len(node) - 1
+        out.append(node)
+    return out
+
+def bench_flatten(leaves = 10**6):
+    '''flatten a ragged nested list, and a list of numpy arrays'''
+    import numpy as np
+    data = ragged(leaves)
+    arrays = [np.arange(1000.).reshape(10, 100) for _ in range(leaves // 1000)]
+    print('flatten {0} leaves -- seconds'.format(leaves))
+    for name, function in (('biter (old)', flatten_biter),
+                           ('stack', iteration.flatten)):
+        for dname, d in (('ragged', data), ('numpy', arrays)):
+            start = time.time()
+            count = sum(1 for _ in function(d))
+            print('{0:>12} {1:>8} {2:10.3f}'.format(name, dname,
+                                                   time.time() - start))
+
+def bench_windows(n = 10**4):
+    '''rolling sums over n values: slice + consume(1) (O(size) per step)
+    against windows() and rolling() (O(1) per step)'''
+    import numpy as np
+    print('rolling sums over {0} values -- seconds'.format(n))
+    print('{0:>8} {1:>16} {2:>10} {3:>10} {4:>10} {5:>10}'.format(
+        'size', 'slice+consume', 'windows', 'np windows', 'rolling',
+        'np rolling'))
+    data = np.random.random(n)
+    for size in (10, 100, 1000):
+        times = []
+        si = iteration.soliditer(iter(data.tolist()))
+        start = time.time()
+        while si.internal_extend(size):
+            sum(si[:size])
+            si.consume(1)
+        times.append(time.time() - start)
+        for d, typecode in ((iter(data.tolist()), None), (iter(data), 'd')):
+            start = time.time()
+            for w in iteration.windows(d, size, typecode = typecode):
+                pass
+            times.append(time.time() - start)
+        for d in (iter(data.tolist()), data):
+            start = time.time()
+            for total in iteration.rolling(d, size):
+                pass
+            times.append(time.time() - start)
+        print('{0:>8} {1:16.3f} {2:10.3f} {3:10.3f} {4:10.3f} '
+              '{5:10.3f}'.format(size, *times))
+
+def bench_spill(n = 5 * 10**6, spill_after = 10**5):
+    '''look n values ahead in a float soliditer that spills to disk, then
+    one that does not, printing the peak memory after each (run on its own,
+    peak memory only goes up)'''
+    import random
+    import itertools
+    print('soliditer[{0}] -- seconds, peak MB'.format(n))
+    for spill in (spill_after, None):
+        values = itertools.islice(itertools.count(), n + 1)
+        si = iteration.soliditer(values, typecode = 'd',
+                                 spill_after = spill)
+        start = time.time()
+        si[n]
+        ahead = time.time() - start
+        start = time.time()
+        for i in range(10**4):
+            si[random.randrange(n)]
+        peeks = (time.time() - start) / 1e4
+        print('{0:>20} {1:8.2f} {2:10.1f}   random peek {3:.1f} us'.format(
+            'spill_after={0}'.format(spill), ahead, max_rss_mb(), peeks * 1e6))
+        del si
+
+def bench_index(n = 10**5, queries = 10**3):
+    '''repeated soliditer.index lookups into an n value lookahead buffer'''
+    import random
+    print('{0} index lookups in {1} buffered values -- seconds'.format(
+        queries, n))
+    targets = [random.randrange(n) for i in range(queries)]
+    for indexed in (False, True):
+        si = iteration.soliditer(iter(range(n)), indexed = indexed)
+        si[n - 1]
+        start = time.time()
+        for value in targets:
+            si.index(value)
+        print('{0:>20} {1:10.4f}'.format('indexed={0}'.format(indexed),
+                                         time.time() - start))
+
+def np_index_to_coords_loop(index, shape):
+    '''the old np_index_to_coords, one index at a time'''
+    import numpy as np
+    coords = []
+    for i in range(1, len(shape)):
+        divisor = int(np.product(shape[i:]))
+        value = index // divisor
+        coords.append(value)
+        index -= value * divisor
+    coords.append(index)
+    return tuple(coords)
+
+def np_first_coords_et_flatten(data_matrix, value, start = 0):
+    '''the old np_first_coords_et: copy it flat, then search'''
+    index = iteration.first_index_et(data_matrix.flatten(), value, start)
+    return np_index_to_coords_loop(index, data_matrix.shape)
+
+def bench_np_helpers(n = 10**8):
+    '''the numpy helpers on an n element float32 array, against the old
+    versions (found value is the last one)'''
+    import numpy as np
+    print('numpy helpers on {0} values -- seconds'.format(n))
+    data = np.zeros((n // 1000, 10, 100), np.float32)
+    data[-1, -1, -1] = 1
+    for name, view in (('C order', data),
+                       ('transposed', data.transpose(2, 1, 0))):
+        for fname, function in (('flatten', np_first_coords_et_flatten),
+                                ('blocks', iteration.np_first_coords_et)):
+            start = time.time()
+            function(view, 1)
+            print('{0:>32} {1:10.3f}'.format('first_coords_et {0} {1}'.format(
+                name, fname), time.time() - start))
+    indexes = np.random.randint(0, n, 10**6)
+    start = time.time()
+    [np_index_to_coords_loop(i, data.shape) for i in indexes]
+    print('{0:>32} {1:10.3f}'.format('1e6 index_to_coords loop',
+                                     time.time() - start))
+    start = time.time()
+    iteration.np_index_to_coords(indexes, data.shape)
+    print('{0:>32} {1:10.3f}'.format('1e6 index_to_coords batch',
+                                     time.time() - start))
+    for fname, function in (
+            ('rot90', lambda d: np.fliplr(np.rot90(d, k = -1))),
+            ('swapaxes', iteration.np_columnize_rows)):
+        start = time.time()
+        np.ascontiguousarray(function(data[:, :, 0]))
+        print('{0:>32} {1:10.3f}'.format('columnize + copy ' + fname,
+                                         time.time() - start))
+
+def bench_sort_together(n = 2 * 10**7, chunk_size = 2 * 10**6):
+    '''np_sort_together of a (3, n) float table by two keys: in memory
+    against the out of core merge sort of a memmap of it'''
+    import numpy as np
+    import tempfile
+    print('np_sort_together (3, {0}) by 2 keys -- seconds'.format(n))
+    data = np.memmap(tempfile.TemporaryFile(), 'f8', 'w+', shape = (3, n))
+    data[0] = np.random.randint(0, 1000, n)
+    data[1] = np.random.random(n)
+    data[2] = np.arange(n)
+    out = np.memmap(tempfile.TemporaryFile(), 'f8', 'w+', shape = (3, n))
+    start = time.time()
+    expected = iteration.np_sort_together(np.array(data), (0, 1))
+    print('{0:>20} {1:10.2f}'.format('in memory', time.time() - start))
+    for workers in (1, None):
+        start = time.time()
+        iteration.np_sort_together(data, (0, 1), out = out,
+                                   chunk_size = chunk_size, workers = workers)
+        print('{0:>20} {1:10.2f}'.format('memmap, {0} workers'.format(
+            workers or 'all'), time.time() - start))
+    assert np.array_equal(expected, out)
+
+def bench_merge(k = 10, n = 10**5):
+    '''merge k sorted runs of n values: merge_sorted against chaining them
+    and sorting in memory, then group_sorted against itools.groupby'''
+    import itertools
+    import random
+    print('merge {0} sorted runs of {1} -- seconds'.format(k, n))
+    runs = [sorted(random.randrange(n) for i in range(n)) for r in range(k)]
+    start = time.time()
+    sorted(itertools.chain(*runs))
+    print('{0:>20} {1:10.3f}'.format('chain + sorted', time.time() - start))
+    start = time.time()
+    for value in iteration.merge_sorted(*runs):
+        pass
+    print('{0:>20} {1:10.3f}'.format('merge_sorted', time.time() - start))
+    start = time.time()
+    for key, group in itertools.groupby(iteration.merge_sorted(*runs)):
+        tuple(group)
+    print('{0:>20} {1:10.3f}'.format('merge + groupby', time.time() - start))
+    start = time.time()
+    for key, group in iteration.group_sorted(iteration.merge_sorted(*runs)):
+        pass
+    print('{0:>20} {1:10.3f}'.format('merge + group_sorted',
+                                     time.time() - start))
+
+def max_rss_mb():
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+def bench_refill_memory(refills = 10**7):
+    '''peek into the same iterator (isdone) and refill a soliditer one
+    value at a time, printing the peak memory as it goes. Used to grow
+    forever when every peek re-wrapped the iterator in a chain'''
+    import itertools
+    checkpoint = refills // 5
+    print('memory over {0} isdone peeks -- peak MB'.format(refills))
+    it = itertools.repeat(0, refills + 1)
+    for i, _ in enumerate(itertools.repeat(None, refills)):
+        done, it = iteration.isdone(it)
+        next(it)
+        if i % checkpoint == 0:
+            print('{0:>12} {1:10.1f}'.format(i, max_rss_mb()))
+    print('memory over {0} soliditer refills -- peak MB'.format(refills))
+    si = iteration.soliditer(itertools.repeat(0, refills), default_buf = 1)
+    for i, _ in enumerate(si):
+        if i % checkpoint == 0:
+            print('{0:>12} {1:10.1f}'.format(i, max_rss_mb()))
+
+if __name__ == '__main__':
+    bench_soliditer_next()
+    print('')
+    bench_first_index()
+    print('')
+    bench_sorted_search()
+    print('')
+    bench_refill_memory()
+    print('')
+    bench_typed_memory()
+    print('')
+    bench_chunks()
+    print('')
+    bench_prefetch()
+    print('')
+    bench_parallel_map()
+    print('')
+    bench_flatten()
+    print('')
+    bench_windows()
+    print('')
+    bench_spill()
+    print('')
+    bench_index()
+    print('')
+    bench_np_helpers()
+    print('')
+    bench_sort_together()
+    print('')
+    bench_merge()
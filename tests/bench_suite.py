@@ -0,0 +1,367 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#    ******  The Cloud Toolbox v0.1.2******
+#    This is the cloud toolbox -- a single module used in several packages
+#    found at <https://github.com/cloudformdesign>
+#    For more information see <cloudformdesign.com>
+#
+#    This module may be a part of a python package, and may be out of date.
+#    This behavior is intentional, do NOT update it.
+#    
+#    You are encouraged to use this pacakge, or any code snippets in it, in
+#    your own projects. Hopefully they will be helpful to you!
+#        
+#    This project is Licenced under The MIT License (MIT)
+#    
+#    Copyright (c) 2013 Garrett Berg cloudformdesign.com
+#    An updated version of this file can be found at:
+#    <https://github.com/cloudformdesign/cloudtb>
+#    
+#    Permission is hereby granted, free of charge, to any person obtaining a 
+#    copy of this software and associated documentation files (the "Software"),
+#    to deal in the Software without restriction, including without limitation 
+#    the rights to use, copy, modify, merge, publish, distribute, sublicense,
+#    and/or sell copies of the Software, and to permit persons to whom the 
+#    Software is furnished to do so, subject to the following conditions:
+#    
+#    The above copyright notice and this permission notice shall be included in
+#    all copies or substantial portions of the Software.
+#    
+#    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL 
+#    THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+#    FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
+#    DEALINGS IN THE SOFTWARE.
+#
+#    http://opensource.org/licenses/MIT
+'''
+Micro-benchmark suite for the iteration module's hot paths, with
+machine-readable (JSON) output so they can be tracked over time:
+    python bench_suite.py --out results.json
+    python bench_suite.py --sizes 100,10000 --filter first_index
+    python bench_suite.py --compare old.json --out new.json
+
+Every case is timed on sizes from 10**2 to 10**7 (less for the slow ones)
+after warmup runs, and the best, mean and standard deviation of the repeats
+are recorded along with nanoseconds per element. Each group of cases also
+has plain list / itertools baselines to compare against.
+
+(bench_iteration.py has the one-off benchmarks that go with particular
+changes; this is the suite to run before and after any change.)
+'''
+import sys
+import json
+import platform
+import itertools
+import timeit
+
+try:
+    from .. import iteration
+except (ValueError, ImportError):
+    try:
+        import iteration
+    except ImportError:
+        import os
+        sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+        import iteration
+
+if sys.version_info.major == 2:
+    range = xrange
+
+SIZES = tuple(10 ** p for p in range(2, 8))
+CASES = []
+
+def case(group, name, max_size = None, baseline = False):
+    '''registers setup(n) as a benchmark case. setup does the untimed
+    preparation and returns the function to time'''
+    def register(setup):
+        CASES.append({'group': group, 'name': name, 'setup': setup,
+                      'max_size': max_size, 'baseline': baseline})
+        return setup
+    return register
+
+def exhaust(iterable):
+    for _ in iterable:
+        pass
+
+# baselines
+@case('iterate', 'list', baseline = True)
+def _list_iter(n):
+    data = list(range(n))
+    return lambda: exhaust(data)
+
+@case('iterate', 'itertools.chain', baseline = True)
+def _chain_iter(n):
+    parts = [list(range(n // 10))] * 10
+    return lambda: exhaust(itertools.chain(*parts))
+
+# biter
+@case('biter', 'iterate')
+def _biter_iter(n):
+    data = list(range(n))
+    return lambda: exhaust(iteration.biter(data))
+
+@case('biter', 'next')
+def _biter_next(n):
+    data = list(range(n))
+    def run():
+        b = iteration.biter(data)
+        next_value = b.next
+        for _ in data:
+            next_value()
+    return run
+
+@case('biter', 'extend x10 + iterate')
+def _biter_extend(n):
+    part = list(range(n // 10))
+    def run():
+        b = iteration.biter(())
+        for _ in range(10):
+            b.extend(part)
+        exhaust(b)
+    return run
+
+@case('biter', 'take 1024 chunks')
+def _biter_chunks(n):
+    data = list(range(n))
+    return lambda: exhaust(iteration.biter(data).chunks(1024))
+
+# soliditer
+@case('soliditer', 'next')
+def _soliditer_next(n):
+    data = list(range(n))
+    return lambda: exhaust(iteration.soliditer(iter(data)))
+
+@case('soliditer', 'take 1024 chunks')
+def _soliditer_chunks(n):
+    data = list(range(n))
+    return lambda: exhaust(iteration.soliditer(iter(data)).chunks(1024))
+
+@case('soliditer', 'typed take 1024 chunks')
+def _soliditer_typed_chunks(n):
+    data = list(range(n))
+    return lambda: exhaust(iteration.soliditer(iter(data),
+                                               typecode = 'd').chunks(1024))
+
+@case('soliditer', 'peek [i] then consume(1)', max_size = 10 ** 6)
+def _soliditer_peek(n):
+    data = list(range(n))
+    def run():
+        si = iteration.soliditer(iter(data))
+        for i in range(n - 10):
+            si[10]
+            si.consume(1)
+    return run
+
+# solidslice
+@case('solidslice', 'itertools.islice', baseline = True)
+def _islice(n):
+    data = list(range(n))
+    return lambda: exhaust(itertools.islice(iter(data), 0, n, 2))
+
+@case('solidslice', 'siter[0:n:2]', max_size = 10 ** 6)
+def _solidslice(n):
+    data = list(range(n))
+    return lambda: iteration.soliditer(iter(data))[0:n:2]
+
+@case('solidslice', 'solidslice consume', max_size = 10 ** 6)
+def _solidslice_consume(n):
+    data = list(range(n))
+    return lambda: exhaust(iteration.solidslice(
+        iteration.soliditer(iter(data)), 0, n, 2))
+
+# flatten
+def _nested(n):
+    '''n leaves, in lists of 10 nested three deep'''
+    leaves = [list(range(10)) for _ in range(max(n // 10, 1))]
+    return [[leaves[i:i + 10]] for i in range(0, len(leaves), 10)]
+
+@case('flatten', 'chain.from_iterable x3', baseline = True)
+def _chain_flatten(n):
+    data = _nested(n)
+    chain = itertools.chain.from_iterable
+    return lambda: exhaust(chain(chain(chain(data))))
+
+@case('flatten', 'flatten')
+def _flatten(n):
+    data = _nested(n)
+    return lambda: exhaust(iteration.flatten(data))
+
+# brange
+@case('brange', 'range', baseline = True)
+def _range(n):
+    return lambda: exhaust(range(n))
+
+@case('brange', 'iterate')
+def _brange_iter(n):
+    return lambda: exhaust(iteration.brange(n))
+
+@case('brange', 'index', max_size = 10 ** 6)
+def _brange_index(n):
+    def run():
+        b = iteration.brange(n)
+        for i in range(n):
+            b[i]
+    return run
+
+@case('brange', 'slice', max_size = 10 ** 6)
+def _brange_slice(n):
+    def run():
+        b = iteration.brange(n)
+        for i in range(n - 2):
+            b[1:i + 2]
+    return run
+
+# first_index_*: the value is at the end so all the data is searched
+def _first_index_data(name, n):
+    '''data, value for first_index_<name> to find at the end'''
+    data = list(range(n))
+    last = data[-1]
+    if name == 'gt':
+        return data, last - 1
+    elif name == 'gtet':
+        return data, last
+    elif name == 'lt':
+        return data[::-1], 1
+    elif name == 'ne':
+        return [0] * (n - 1) + [1], 0
+    elif name == 'et':
+        return data, last
+    elif name == 'in':
+        return data, set((last,))
+    elif name == 'nin':
+        return [0] * (n - 1) + [1], set((0,))
+    elif name == 'is':
+        return data, last
+    elif name == 'nis':
+        return [None] * (n - 1) + [1], None
+
+_BASELINE_TESTS = {'gt': lambda v, x: v > x, 'gtet': lambda v, x: v >= x,
+                   'lt': lambda v, x: v < x, 'ne': lambda v, x: v != x,
+                   'et': lambda v, x: v == x, 'in': lambda v, x: v in x,
+                   'nin': lambda v, x: v not in x, 'is': lambda v, x: v is x,
+                   'nis': lambda v, x: v is not x}
+
+def _register_first_index(name):
+    test = _BASELINE_TESTS[name]
+    @case('first_index_' + name, 'list generator', baseline = True)
+    def baseline(n):
+        data, value = _first_index_data(name, n)
+        return lambda: next(i for i, v in enumerate(data) if test(v, value))
+
+    if name == 'et':
+        @case('first_index_et', 'list.index', baseline = True)
+        def list_index(n):
+            data, value = _first_index_data(name, n)
+            return lambda: data.index(value)
+
+    @case('first_index_' + name, 'list')
+    def python(n):
+        data, value = _first_index_data(name, n)
+        function = getattr(iteration, 'first_index_' + name)
+        return lambda: function(data, value)
+
+    if name not in ('is', 'nis', 'in', 'nin'):
+        @case('first_index_' + name, 'numpy array')
+        def fast(n):
+            data, value = _first_index_data(name, n)
+            data = iteration.np.array(data)
+            function = getattr(iteration, 'first_index_' + name)
+            return lambda: function(data, value)
+
+for _name in ('gt', 'gtet', 'lt', 'ne', 'et', 'in', 'nin', 'is', 'nis'):
+    _register_first_index(_name)
+
+def measure(function, warmup, repeats):
+    '''returns the times (seconds) of repeats runs, after warmup runs'''
+    timer = timeit.default_timer
+    for _ in range(warmup):
+        function()
+    times = []
+    for _ in range(repeats):
+        start = timer()
+        function()
+        times.append(timer() - start)
+    return times
+
+def summarize(times, n):
+    mean = sum(times) / len(times)
+    variance = sum((t - mean) ** 2 for t in times) / max(len(times) - 1, 1)
+    return {'best': min(times), 'mean': mean, 'stdev': variance ** 0.5,
+            'variance': variance, 'times': times,
+            'ns_per_element': min(times) / n * 1e9}
+
+def run_suite(sizes = SIZES, warmup = 1, repeats = 5, match = None,
+              log = None):
+    '''runs every case (whose group or name contains match) at every size
+    (up to its max_size). Returns the results as a json-able dict'''
+    results = []
+    for c in CASES:
+        title = '{0}: {1}'.format(c['group'], c['name'])
+        if match and match not in title:
+            continue
+        if c['group'].startswith('first_index') and 'numpy' in c['name'] \
+                and not iteration._NUMPY_:
+            continue
+        for n in sizes:
+            if c['max_size'] != None and n > c['max_size']:
+                continue
+            function = c['setup'](n)
+            result = summarize(measure(function, warmup, repeats), n)
+            result.update({'group': c['group'], 'name': c['name'],
+                           'size': n, 'baseline': c['baseline']})
+            results.append(result)
+            if log:
+                log('{0:<45} {1:>9} {2:12.1f} ns/elem  +-{3:.1f}%'.format(
+                    title, n, result['ns_per_element'],
+                    100 * result['stdev'] / result['mean']
+                    if result['mean'] else 0))
+    meta = {'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': iteration.np.__version__ if iteration._NUMPY_ else None,
+            'warmup': warmup, 'repeats': repeats, 'sizes': list(sizes)}
+    return {'meta': meta, 'results': results}
+
+def compare(old, new, log = None):
+    '''logs (default: prints) the change in best time of every case in both
+    result sets'''
+    if log == None:
+        log = lambda line: sys.stdout.write(line + '\n')
+    key = lambda r: (r['group'], r['name'], r['size'])
+    before = dict((key(r), r) for r in old['results'])
+    for r in new['results']:
+        if key(r) in before:
+            ratio = r['best'] / before[key(r)]['best']
+            log('{0:<45} {1:>9} {2:8.2f}x{3}'.format(
+                '{0}: {1}'.format(r['group'], r['name']), r['size'], ratio,
+                '  SLOWER' if ratio > 1.2 else ''))
+
+def main(args = None):
+    import argparse
+    parser = argparse.ArgumentParser(description = __doc__.split('\n')[1])
+    parser.add_argument('--sizes', default = ','.join(map(str, SIZES)),
+                        help = 'comma separated input sizes')
+    parser.add_argument('--warmup', type = int, default = 1)
+    parser.add_argument('--repeats', type = int, default = 5)
+    parser.add_argument('--filter', default = None,
+                        help = 'only run cases whose name contains this')
+    parser.add_argument('--out', default = None, help = 'json file to write')
+    parser.add_argument('--compare', default = None,
+                        help = 'json results to compare against')
+    args = parser.parse_args(args)
+    sizes = [int(float(s)) for s in args.sizes.split(',')]
+    log = lambda line: sys.stderr.write(line + '\n')
+    results = run_suite(sizes, args.warmup, args.repeats, args.filter, log)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results, log)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent = 1)
+    else:
+        json.dump(results, sys.stdout, indent = 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#    ******  The Cloud Toolbox v0.1.2******
+#    This is the cloud toolbox -- a single module used in several packages
+#    found at <https://github.com/cloudformdesign>
+#    For more information see <cloudformdesign.com>
+#
+#    This module may be a part of a python package, and may be out of date.
+#    This behavior is intentional, do NOT update it.
+#    
+#    You are encouraged to use this pacakge, or any code snippets in it, in
+#    your own projects. Hopefully they will be helpful to you!
+#        
+#    This project is Licenced under The MIT License (MIT)
+#    
+#    Copyright (c) 2013 Garrett Berg cloudformdesign.com
+#    An updated version of this file can be found at:
+#    <https://github.com/cloudformdesign/cloudtb>
+#    
+#    Permission is hereby granted, free of charge, to any person obtaining a 
+#    copy of this software and associated documentation files (the "Software"),
+#    to deal in the Software without restriction, including without limitation 
+#    the rights to use, copy, modify, merge, publish, distribute, sublicense,
+#    and/or sell copies of the Software, and to permit persons to whom the 
+#    Software is furnished to do so, subject to the following conditions:
+#    
+#    The above copyright notice and this permission notice shall be included in
+#    all copies or substantial portions of the Software.
+#    
+#    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL 
+#    THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+#    FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
+#    DEALINGS IN THE SOFTWARE.
+#
+#    http://opensource.org/licenses/MIT
+# -*- coding: utf-8 -*-
+'''
+Benchmarks for the textools module. Run as __main__:
+    python bench_textools.py
+'''
+import time
+import random
+
+try:
+    from .. import textools
+except (ValueError, ImportError):
+    try:
+        import textools
+    except ImportError:
+        import sys
+        sys.path.insert(1, '..')
+        import textools
+
+def make_text(words = 10**5):
+    random.seed(0)
+    vocab = ('research', 'Research', 'is', 'this', 'This', 'search', 're',
+             'easy', 'with', 'tool', 'light', 'seen\n')
+    return ' '.join(random.choice(vocab) for n in range(words))
+
+def bench_re_search_spans(words = 10**5):
+    '''spans of every match and group: plain finditer against 
+    re_search_spans (tuples and columns) and the full re_search'''
+    text = make_text(words)
+    regexp = textools.re.compile(r'((R|r)e ?se\w*)|(((T|t)h)?is)')
+    def finditer():
+        for m in regexp.finditer(text):
+            m.regs
+    def spans():
+        for span in textools.re_search_spans(regexp, text):
+            pass
+    def columns():
+        textools.re_search_spans(regexp, text, columns = True)
+    def research():
+        for n in textools.re_search(regexp, text, return_type = list):
+            pass
+    matches = sum(1 for m in regexp.finditer(text))
+    print('spans of {0} matches in {1} bytes -- seconds, relative to '
+          'finditer'.format(matches, len(text)))
+    base = None
+    for name, function in (('finditer', finditer), 
+                           ('re_search_spans', spans),
+                           ('spans columns', columns),
+                           ('re_search', research)):
+        best = None
+        for _ in range(3):
+            start = time.time()
+            function()
+            took = time.time() - start
+            if best == None or took < best:
+                best = took
+        if base == None:
+            base = best
+        print('{0:>20} {1:10.3f} {2:8.2f}x'.format(name, best, best / base))
+
+def bench_research_plan(texts = 2000):
+    '''re_search of a few patterns over many short texts, with the research
+    plan cache cleared before each call and left to work'''
+    lines = make_text(texts * 10).split('\n')[:texts]
+    patterns = (r'((R|r)e ?se\w*)|(((T|t)h)?is)', r'(\w+) (is|with) (\w+)',
+                r'(?P<word>t\w+)( (?P<next>\w+))?')
+    def run(clear):
+        for line in lines:
+            for pattern in patterns:
+                if clear:
+                    textools.clear_research_plans()
+                textools.re_search(pattern, line)
+    print('re_search {0} patterns over {1} lines -- seconds'.format(
+          len(patterns), len(lines)))
+    for name, clear in (('uncached', True), ('cached', False)):
+        textools.clear_research_plans()
+        start = time.time()
+        run(clear)
+        print('{0:>20} {1:10.3f}'.format(name, time.time() - start))
+    print('{0:>20} {1}'.format('stats', textools.research_plan_stats()))
+
+def bench_lazy_parts(words = 10**5):
+    '''RegGroupParts built by re_search on a group heavy pattern when only 
+    the match text is read, against building every tree like re_search 
+    used to'''
+    text = make_text(words)
+    regexp = r'(((\w)(\w))((\w)(\w))?((\w)(\w))?)(\w*)'
+    built = [0]
+    original_init = textools.RegGroupPart.__init__
+    def counting_init(self, *args, **kwargs):
+        built[0] += 1
+        original_init(self, *args, **kwargs)
+    textools.RegGroupPart.__init__ = counting_init
+    def walk(part):
+        for n in part.data_list:
+            if type(n) != str:
+                walk(n)
+    try:
+        print('RegGroupParts built by re_search of {0} -- count, '
+              'seconds'.format(regexp))
+        for name, read in (('text only', lambda m: m.text), 
+                           ('whole tree', walk)):
+            built[0] = 0
+            start = time.time()
+            for m in textools.get_matches(textools.re_search(regexp, text,
+                    return_type = iter)):
+                read(m)
+            print('{0:>20} {1:10} {2:10.3f}'.format(name, built[0], 
+                                                    time.time() - start))
+    finally:
+        textools.RegGroupPart.__init__ = original_init
+
+def rss_mb():
+    '''current resident memory of this process in MB (linux only)'''
+    import os
+    with open('/proc/self/statm') as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf('SC_PAGE_SIZE') / float(1 << 20)
+
+def bench_compact_result(words = 2 * 10**5):
+    '''memory per match of a re_search held as a tuple of RegGroupParts
+    against a ResearchResult'''
+    import gc
+    import os
+    import sys
+    text = make_text(words)
+    regexp = r'((R|r)e ?se\w*)|(((T|t)h)?is)|(\w+)'
+    def as_tuple():
+        return textools.re_search(regexp, text)
+    def as_tuple_trees():
+        researched = textools.re_search(regexp, text)
+        for m in textools.get_matches(researched):
+            str(m)
+        return researched
+    def as_result():
+        return textools.re_search(regexp, text, 
+                                  return_type = textools.ResearchResult)
+    matches = len(as_result())
+    print('re_search of {0} matches -- bytes per match, seconds'.format(
+          matches))
+    for name, function in (('tuple', as_tuple), 
+                           ('tuple, trees built', as_tuple_trees),
+                           ('ResearchResult', as_result)):
+        # measure in a child so memory freed by one case isn't reused by
+        # the next one
+        pid = os.fork()
+        if pid:
+            os.waitpid(pid, 0)
+            continue
+        gc.collect()
+        before = rss_mb()
+        start = time.time()
+        researched = function()
+        took = time.time() - start
+        used = (rss_mb() - before) * (1 << 20)
+        print('{0:>20} {1:10.0f} {2:10.3f}'.format(name, used / matches, 
+                                                   took))
+        sys.stdout.flush()
+        os._exit(0)
+
+if __name__ == '__main__':
+    bench_re_search_spans()
+    print('')
+    bench_research_plan()
+    print('')
+    bench_lazy_parts()
+    print('')
+    bench_compact_result()
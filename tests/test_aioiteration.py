@@ -0,0 +1,152 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#    ******  The Cloud Toolbox v0.1.2******
+#    This is the cloud toolbox -- a single module used in several packages
+#    found at <https://github.com/cloudformdesign>
+#    For more information see <cloudformdesign.com>
+#
+#    This module may be a part of a python package, and may be out of date.
+#    This behavior is intentional, do NOT update it.
+#    
+#    You are encouraged to use this pacakge, or any code snippets in it, in
+#    your own projects. Hopefully they will be helpful to you!
+#        
+#    This project is Licenced under The MIT License (MIT)
+#    
+#    Copyright (c) 2013 Garrett Berg cloudformdesign.com
+#    An updated version of this file can be found at:
+#    <https://github.com/cloudformdesign/cloudtb>
+#    
+#    Permission is hereby granted, free of charge, to any person obtaining a 
+#    copy of this software and associated documentation files (the "Software"),
+#    to deal in the Software without restriction, including without limitation 
+#    the rights to use, copy, modify, merge, publish, distribute, sublicense,
+#    and/or sell copies of the Software, and to permit persons to whom the 
+#    Software is furnished to do so, subject to the following conditions:
+#    
+#    The above copyright notice and this permission notice shall be included in
+#    all copies or substantial portions of the Software.
+#    
+#    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL 
+#    THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+#    FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
+#    DEALINGS IN THE SOFTWARE.
+#
+#    http://opensource.org/licenses/MIT
+'''tests for aioiteration. Python 3 only'''
+import asyncio
+import unittest
+
+try:
+    from .. import aioiteration
+except (ValueError, ImportError):
+    import sys
+    sys.path.insert(1, '..')
+    import aioiteration
+
+async def source(n, delay = 0):
+    for value in range(n):
+        if delay:
+            await asyncio.sleep(delay)
+        yield value
+
+async def collect(aiterable):
+    return [value async for value in aiterable]
+
+_loop = asyncio.new_event_loop()
+
+def run(coroutine):
+    return _loop.run_until_complete(coroutine)
+
+class abiterTest(unittest.TestCase):
+    def test_extend(self):
+        b = aioiteration.abiter(source(5))
+        b.extend(range(5, 8))
+        b.append(8)
+        b.front_extend(source(2))
+        self.assertEqual([0, 1] + list(range(9)), run(collect(b)))
+
+    def test_take_slice(self):
+        b = aioiteration.abiter(source(100))
+        self.assertEqual((0, 1, 2), run(b.take(3)))
+        self.assertEqual([5, 7, 9], run(collect(b[2:8:2])))
+        self.assertEqual(10, run(b.__anext__()))
+        chunks = run(collect(b.chunks(40)))
+        self.assertEqual([tuple(range(11, 51)), tuple(range(51, 91)),
+                          tuple(range(91, 100))], chunks)
+        self.assertEqual((), run(b.take(3)))
+
+class asoliditerTest(unittest.TestCase):
+    def test_peek(self):
+        s = aioiteration.asoliditer(source(100))
+        self.assertEqual(30, run(s.peek(30)))
+        self.assertEqual(30, run(s[30]))
+        self.assertEqual(0, run(s.__anext__()))
+        self.assertEqual(31, run(s.peek(30)))
+        self.assertRaises(IndexError, run, s.peek(100))
+        self.assertEqual(list(range(1, 100)), run(collect(s)))
+
+    def test_take(self):
+        s = aioiteration.asoliditer(source(50))
+        s.extend(range(50, 60))
+        s.append(60)
+        s.front_extend((-2, -1))
+        self.assertEqual((-2, -1, 0), run(s.take(3)))
+        self.assertEqual((1, 2), run(s.peek_chunk(2)))
+        run(s.consume(2))
+        self.assertEqual([(3, 4, 5, 6)], run(collect(s.chunks(4)))[:1])
+        self.assertEqual((), run(s.take(4)))
+        s = aioiteration.asoliditer(source(10), typecode = 'd')
+        self.assertEqual([0., 1., 2.], list(run(s.take(3))))
+
+    def test_slice(self):
+        s = aioiteration.asoliditer(source(20))
+        self.assertEqual((2, 4, 6), run(s[2:8:2]))
+        self.assertEqual([15, 17, 19], run(collect(s[15::2])))
+        self.assertEqual(0, run(s.peek(0)))
+        sl = aioiteration.asolidslice(s, 3, 9, 3, consume = True)
+        self.assertEqual([3, 6], run(collect(sl)))
+        self.assertEqual(6, run(s.peek(0)))
+        self.assertRaises(IndexError, aioiteration.asolidslice, s, -1)
+
+    def test_hard_limit(self):
+        s = aioiteration.asoliditer(source(100), request_hard_limit = 10)
+        self.assertRaises(aioiteration.RequestError, run, s.peek(50))
+
+    def test_source_error(self):
+        '''values read before the source raised stay in the stream'''
+        async def failing():
+            for value in range(5):
+                yield value
+            raise KeyError('source failed')
+        s = aioiteration.asoliditer(failing())
+        s.extend(range(5, 8))
+        self.assertRaises(KeyError, run, s.peek(10))
+        self.assertEqual(5, s.buffer_size())
+        self.assertEqual((0, 1, 2, 3, 4), run(s.take(5)))
+
+    def test_overlap(self):
+        '''reading ahead lets other coroutines run'''
+        events = []
+        async def other():
+            for n in range(3):
+                events.append(n)
+                await asyncio.sleep(0.001)
+        async def main():
+            s = aioiteration.asoliditer(source(20, delay = 0.001))
+            task = s.readahead(20)
+            await other()
+            await task
+            return s.buffer_size()
+        self.assertEqual(20, run(main()))
+        self.assertEqual([0, 1, 2], events)
+        async def both():
+            s = aioiteration.asoliditer(source(30, delay = 0.0005))
+            return await asyncio.gather(s.peek(25), s.take(5), s.peek(3))
+        self.assertEqual([25, (0, 1, 2, 3, 4), 8], run(both()))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -56,6 +56,7 @@ except ValueError:
 
 import unittest
 import random
+import math
 
 DEBUG = True
 
@@ -176,7 +177,57 @@ class bitterTest(unittest.TestCase, std_iterator):
 
     def test_slice_repeat(self):
         return test_slice_repeat(self, reobject = True)
-    
+
+    def test_many_extends(self):
+        # used to nest an itertools.chain per extend (recursion error)
+        b1 = self.get_object(range(10))
+        for n in range(100000):
+            b1.extend((n,))
+            b1.front_extend((-n,))
+        self.assertEqual(-99999, next(b1))
+        self.assertEqual(range(-99998, 1) + range(10) + range(100000),
+                         list(b1))
+
+    def test_chunks(self):
+        return test_chunks(self)
+
+    def test_mixed_iter(self):
+        b1 = self.get_object(range(10))
+        b1.extend(range(10, 20))
+        fast = iter(b1)
+        self.assertEqual([0, 1], [next(fast), next(fast)])
+        self.assertEqual(2, next(b1))
+        self.assertEqual(5, b1[2])
+        self.assertEqual(range(6, 20), list(fast))
+
+    def test_pushback_in_loop(self):
+        b1 = self.get_object([1, 2, 3])
+        got = []
+        for x in b1:
+            got.append(x)
+            if x == 1:
+                b1.front_extend(['p'])
+            elif x == 2:
+                b1.insert(0, 'q')
+                b1.extend([4])
+        self.assertEqual([1, 'p', 2, 'q', 3, 4], got)
+        # pushed back in front of a partly used iterable
+        b1 = self.get_object(iter(range(5)))
+        got = []
+        for x in b1:
+            got.append(x)
+            if x in (1, 3):
+                b1.front_extend(range(x * 10, x * 10 + 2))
+        self.assertEqual([0, 1, 10, 11, 2, 3, 30, 31, 4], got)
+
+def test_chunks(self):
+    b1 = self.get_object(iter(range(100)))
+    self.assertEqual(range(5), list(b1.peek_chunk(5)))
+    self.assertEqual(range(7), list(b1.take(7)))
+    self.assertEqual(range(7, 10), list(b1.peek_chunk(3)))
+    chunks = [list(c) for c in b1.chunks(40)]
+    self.assertEqual([range(7, 47), range(47, 87), range(87, 100)], chunks)
+    self.assertEqual(0, len(b1.take(5)))
 
 class soliditerTest(unittest.TestCase, std_iterator):
     def get_object(self, *args, **kwargs):
@@ -185,6 +236,640 @@ class soliditerTest(unittest.TestCase, std_iterator):
     def test_getitem(self):
         return test_getitem(self, recreate = False)
 
+    def test_chunks(self):
+        return test_chunks(self)
+
+class solidbufferTest(unittest.TestCase):
+    def test_popleft_consume(self):
+        buf = iteration.solidbuffer(range(1000))
+        data = range(1000)
+        for n in range(300):
+            self.assertEqual(data[n], buf.popleft())
+        buf.consume(200)
+        self.assertEqual(500, len(buf))
+        self.assertEqual(data[500], buf[0])
+        self.assertEqual(data[-1], buf[-1])
+        self.assertEqual(data[500:520:3], buf[0:20:3])
+        self.assertEqual(data[:499:-1], buf[::-1])
+        self.assertEqual(list(data[500:]), list(buf))
+    
+    def test_front_extend_insert(self):
+        buf = iteration.solidbuffer(range(100))
+        buf.consume(90)
+        buf.front_extend('abc')
+        self.assertEqual(['a', 'b', 'c', 90], buf[:4])
+        buf.front_extend(range(20))
+        self.assertEqual(33, len(buf))
+        self.assertEqual(0, buf[0])
+        buf.insert(1, 'inserted')
+        self.assertEqual(1, buf.index('inserted'))
+        self.assertEqual(23, buf.index('c', 10))
+        self.assertRaises(ValueError, buf.index, 'c', 0, 10)
+    
+    def test_soliditer_large_buffer(self):
+        si = iteration.soliditer(iter(range(5000)), default_buf = 1000)
+        self.assertEqual(0, next(si))
+        self.assertEqual(1001, si[1000])
+        si.consume(1000)
+        self.assertEqual(range(1001, 5000), list(si))
+        self.assertRaises(StopIteration, next, si)
+
+    def test_array_storage(self):
+        buf = iteration.solidbuffer(range(100), typecode = 'i')
+        buf.consume(90)
+        buf.front_extend((1, 2))
+        self.assertEqual([1, 2, 90], list(buf[:3]))
+        self.assertEqual(4, buf.index(92))
+        self.assertEqual(99, buf.popleft() + buf.popleft() + buf.popleft() + 6)
+
+    @unittest.skipIf(not iteration._NUMPY_, 'needs numpy')
+    def test_npbuffer(self):
+        buf = iteration.npbuffer(range(1000), dtype = 'd')
+        for n in range(300):
+            self.assertEqual(n, buf.popleft())
+        view = buf[:10]
+        buf.consume(200)
+        buf.extend(range(5000))
+        buf.front_extend((-1, -2))
+        buf.insert(1, 7)
+        # views are never written over
+        self.assertEqual(range(300, 310), list(view))
+        self.assertEqual([-1, 7, -2, 500], list(buf[:4]))
+        self.assertEqual(503, buf.index(0))
+        self.assertRaises(ValueError, buf.index, 0.5)
+        self.assertEqual(5503, len(buf))
+
+    def test_typed_soliditer(self):
+        si = iteration.soliditer((float(n) for n in range(1000)),
+                                 typecode = 'd')
+        self.assertEqual(0, next(si))
+        self.assertEqual([1, 4, 7, 10], list(si[0:10:3]))
+        self.assertEqual(range(991, 1000), list(si[990:]))
+        si.consume(100)
+        self.assertEqual(101, si[0])
+        if iteration._NUMPY_:
+            self.assertTrue(si[:10].base is not None)   # a view
+        si = iteration.soliditer(range(10), typecode = 'i', slicetype = list)
+        self.assertEqual([2, 3], si[2:4])
+        si = iteration.soliditer(range(10), typecode = 'd')
+        chunk = si.take(4)
+        self.assertEqual(range(4), list(chunk))
+        self.assertEqual([4, 5], list(si.peek_chunk(2, copy = True)))
+        self.assertEqual([[4, 5, 6], [7, 8, 9]], [list(c) for c in
+                                                   si.chunks(3)])
+        self.assertEqual(range(4), list(chunk))
+
+class soliditeeTest(unittest.TestCase):
+    def test_cursors(self):
+        tee = iteration.soliditee(iter(range(100)), 3)
+        a, b, c = tee.cursors
+        self.assertEqual([0, 1, 2], [next(a) for n in range(3)])
+        self.assertEqual(5, a.peek(2))
+        self.assertEqual(5, a[2])
+        self.assertEqual((4, 6), a[1:5:2])
+        self.assertEqual(0, next(b))
+        c.consume(10)
+        self.assertEqual((10, 11), c.take(2))
+        self.assertEqual([1, 2], [next(b), next(b)])
+        self.assertEqual(range(3, 100), list(b))
+        self.assertEqual(range(12, 100), list(c))
+        self.assertEqual(range(3, 100), list(a))
+        self.assertEqual(0, tee.buffer_size())
+        self.assertRaises(IndexError, a.peek, 0)
+
+    def test_trim(self):
+        tee = iteration.soliditee(range(100), 2, default_buf = 1)
+        fast, slow = tee.cursors
+        fast.consume(50)
+        self.assertEqual(50, tee.buffer_size())
+        self.assertEqual([0, 50], tee.lags())
+        chunks = slow.chunks(3)
+        self.assertEqual([(0, 1, 2), (3, 4, 5)], [next(chunks), next(chunks)])
+        self.assertEqual(44, tee.buffer_size())
+        slow.consume(40)
+        self.assertEqual(0, fast.lag())
+        self.assertEqual(4, slow.lag())
+        self.assertEqual(4, tee.buffer_size())
+        slow.close()
+        self.assertEqual(0, tee.buffer_size())
+        late = tee.add_cursor()
+        self.assertEqual(50, next(late))
+        self.assertEqual(range(51, 100), list(fast[1:]))
+
+    def test_bounded(self):
+        tee = iteration.soliditee(range(100), 2, max_buffer = 10,
+                                  typecode = 'd')
+        a, b = tee.cursors
+        a.consume(10)
+        self.assertEqual(10 * 8, tee.buffered_bytes())
+        self.assertRaises(iteration.RequestError, next, a)
+        self.assertEqual([0., 1.], list(b.take(2)))
+        self.assertEqual(10., next(a))
+        untyped = iteration.soliditee(range(10))
+        untyped.cursors[0].consume(5)
+        self.assertTrue(untyped.buffered_bytes() > 5 * 8)
+
+    def test_bounded_slices(self):
+        tee = iteration.soliditee(range(100), 2, max_buffer = 10,
+                                  default_buf = 1)
+        a, b = tee.cursors
+        self.assertRaises(iteration.RequestError, a.__getitem__, 
+                          slice(0, 20))
+        self.assertRaises(iteration.RequestError, a.__getitem__, 
+                          slice(5, None))
+        self.assertTrue(tee.buffer_size() <= 11)
+        self.assertEqual(range(2, 10), list(a[2:10]))
+        short = iteration.soliditee(range(8), max_buffer = 10)
+        self.assertEqual(range(3, 8), list(short.cursors[0][3:]))
+
+    def test_lag_readahead(self):
+        tee = iteration.soliditee(range(100), 2, default_buf = 50)
+        fast, slow = tee.cursors
+        self.assertEqual([0, 0], tee.lags())
+        fast.peek(30)
+        fast.consume(3)
+        self.assertEqual([0, 3], tee.lags())
+        slow.consume(5)
+        self.assertEqual([2, 0], tee.lags())
+
+class windowsTest(unittest.TestCase):
+    def test_windows(self):
+        expected = [tuple(range(n, n + 5)) for n in range(0, 196, 3)]
+        got = [tuple(w) for w in iteration.windows(iter(range(200)), 5, 3)]
+        self.assertEqual(expected, got)
+        self.assertEqual(expected, list(iteration.windows(range(200), 5, 3,
+                                                          copy = True)))
+        w = next(iteration.windows(range(10), 4))
+        self.assertEqual((4, 0, 3, (1, 2)), (len(w), w[0], w[-1], tuple(w[1:3])))
+        self.assertRaises(IndexError, w.__getitem__, 4)
+        self.assertEqual([], list(iteration.windows(range(3), 4)))
+        self.assertRaises(ValueError, iteration.windows, range(3), 0)
+        si = iteration.soliditer(range(10), typecode = 'i')
+        self.assertEqual([(0, 1, 2, 3), (4, 5, 6, 7)], [tuple(w) for w in
+                          iteration.windows(si, 4, 4)])
+
+    def test_numpy(self):
+        if not iteration._NUMPY_:
+            self.skipTest('numpy is not installed')
+        np = iteration.np
+        expected = [range(n, n + 4) for n in range(0, 97, 2)]
+        for data in (np.arange(100), iter(range(100))):
+            got = list(iteration.windows(data, 4, 2, typecode = 'd'))
+            self.assertEqual(expected, [list(w) for w in got])
+        data = np.arange(10)
+        view = next(iteration.windows(data, 3))
+        self.assertTrue(np.may_share_memory(view, data))
+        keep = next(iteration.windows(data, 3, copy = True))
+        self.assertFalse(np.may_share_memory(keep, data))
+
+    def test_rolling(self):
+        data = [random.randint(-100, 100) for n in range(500)]
+        for size, step in ((1, 1), (7, 1), (7, 3), (50, 50)):
+            windows = [data[n:n + size] for n in
+                       range(0, len(data) - size + 1, step)]
+            expected = [(sum(w), min(w), max(w)) for w in windows]
+            self.assertEqual(expected, list(iteration.rolling(iter(data),
+                                size, ('sum', 'min', 'max'), step)))
+            self.assertEqual([e[0] for e in expected],
+                             list(iteration.rolling(data, size, step = step)))
+            if iteration._NUMPY_:
+                got = iteration.rolling(iteration.np.array(data), size,
+                                        ('sum', 'min', 'max'), step)
+                self.assertEqual(expected, [tuple(g) for g in got])
+        class count(object):
+            def __init__(self):
+                self.n = 0
+            def add(self, value):
+                self.n += 1
+            def remove(self, value):
+                self.n -= 1
+            def value(self):
+                return self.n
+        self.assertEqual([3, 3], list(iteration.rolling(range(4), 3, count)))
+
+    @unittest.skipIf(not iteration._NUMPY_, 'needs numpy')
+    def test_np_rolling(self):
+        np = iteration.np
+        data = np.random.RandomState(5).rand(1001)
+        for size in (1, 2, 13, 1000, 1001, 1002):
+            got = iteration.rolling(data, size, ('sum', 'min', 'max'))
+            expected = iteration.rolling(data.tolist(), size, 
+                                         ('sum', 'min', 'max'))
+            got, expected = list(got), list(expected)
+            self.assertEqual(len(expected), len(got))
+            self.assertTrue(np.allclose(expected, got))
+        # sums don't drift over a long array
+        sums = iteration.rolling(np.full(10**6, 0.1), 3)
+        self.assertEqual(0.1 + 0.1 + 0.1, list(sums)[-1])
+
+class indexTest(unittest.TestCase):
+    def test_index(self):
+        for kwargs in ({}, {'indexed': True}, {'typecode': 'i'},
+                       {'typecode': 'i', 'indexed': True},
+                       {'spill_after': 20, 'indexed': True}):
+            si = iteration.soliditer(iter(range(100) * 2), **kwargs)
+            self.assertEqual(50, si.index(50))
+            self.assertEqual(150, si.index(50, 51))
+            self.assertEqual(10, si.index(10, 0, 60))
+            self.assertRaises(ValueError, si.index, 70, 0, 60)
+            self.assertRaises(ValueError, si.index, 1000)
+            self.assertTrue(99 in si)
+            self.assertFalse(-1 in si)
+            self.assertEqual(200, si.buffer_size())
+            si.consume(120)
+            self.assertEqual(10, si.index(30))
+            self.assertEqual(0, si.index(20))
+            si.front_extend([30, 5])
+            self.assertEqual((0, 1, 12), (si.index(30), si.index(5),
+                                          si.index(30, 1)))
+            si._databuf.insert(1, 77)
+            self.assertEqual((1, 2, 3), (si.index(77), si.index(5),
+                                         si.index(20)))
+            self.assertEqual(30, next(si))
+            self.assertEqual(0, si.index(77))
+
+    def test_unhashable(self):
+        si = iteration.soliditer(iter([[1], [2], [3], [2]]), indexed = True)
+        self.assertEqual(1, si.index([2]))
+        self.assertEqual(3, si.index([2], 2))
+        self.assertTrue([3] in si)
+
+    def test_nan(self):
+        nan = float('nan')
+        for kwargs in ({'typecode': 'd'}, {'spill_after': 4},
+                       {'typecode': 'd', 'spill_after': 4}, {}):
+            si = iteration.soliditer(iter([1.0, nan, 2.0] * 5), 
+                                     indexed = True, **kwargs)
+            si[5]
+            self.assertEqual(1.0, next(si))
+            self.assertTrue(math.isnan(next(si)))
+            self.assertEqual(1, si.index(1.0))
+            self.assertEqual(0, si.index(2.0))
+            self.assertRaises(ValueError, si.index, 7.0)
+            si.front_extend([nan, 3.0])
+            self.assertEqual(1, si.index(3.0))
+            si.consume(4)
+            self.assertEqual(2, si.index(1.0))
+            values = list(si)
+            self.assertEqual(11, len(values))
+            self.assertEqual([2.0, 1.0] * 3 + [2.0], 
+                             [v for v in values if v == v])
+
+    def test_indexed_buffer(self):
+        buf = iteration.indexedbuffer(iteration.solidbuffer())
+        buf.extend(range(10))
+        buf.append(3)
+        self.assertEqual(3, buf.index(3))
+        self.assertEqual(10, buf.index(3, 4))
+        self.assertEqual(0, buf.popleft())
+        buf.consume(3)
+        self.assertEqual(6, buf.index(3))
+        self.assertFalse(0 in buf)
+        self.assertTrue(9 in buf)
+
+class npHelpersTest(unittest.TestCase):
+    def setUp(self):
+        if not iteration._NUMPY_:
+            self.skipTest('numpy is not installed')
+
+    def test_coords(self):
+        np = iteration.np
+        shape = (3, 4, 5)
+        self.assertEqual((1, 2, 3), iteration.np_index_to_coords(33, shape))
+        coords = iteration.np_index_to_coords(np.arange(60), shape)
+        self.assertEqual([tuple(c) for c in np.ndindex(*shape)],
+                         list(zip(*[c.tolist() for c in coords])))
+        data = np.arange(60).reshape(shape)
+        for view in (data, data.transpose(2, 0, 1), data[:, ::2, ::-1],
+                     np.asfortranarray(data)):
+            for value in (view.flat[0], view.flat[17], view.flat[-1]):
+                got = iteration.np_first_coords_et(view, value)
+                self.assertEqual(value, view[got])
+            self.assertEqual(None, iteration.np_first_coords_et(view, 99))
+        twice = np.concatenate([data, data]).reshape(6, 4, 5)
+        self.assertEqual((3, 1, 3), iteration.np_first_coords_et(twice, 8,
+                                                                 start = 9))
+        big = np.zeros((2000, 3, 7))
+        big[1500, 2, 1] = np.nan
+        self.assertEqual((1500, 2, 1), iteration.np_first_coords_et(
+            big, float('nan')))
+
+    def test_sort_together(self):
+        np = iteration.np
+        self.assertEqual([[1, 2, 3], [10, 20, 30]], iteration.np_sort_together(
+            [[3, 1, 2], [30, 10, 20]]).tolist())
+        # 1-D in, 1-D out (in memory, out of core and into out)
+        self.assertEqual([1, 2, 3], iteration.np_sort_together(
+            [3, 1, 2]).tolist())
+        self.assertEqual(list(range(10)), iteration.np_sort_together(
+            np.arange(10)[::-1], chunk_size = 3).tolist())
+        out = np.empty(3, int)
+        self.assertTrue(out is iteration.np_sort_together([2, 3, 1],
+                                                          out = out))
+        self.assertEqual([1, 2, 3], out.tolist())
+        for seed in range(5):
+            rand = np.random.RandomState(seed)
+            n = rand.randint(1, 3000)
+            data = rand.randint(0, 5, (3, n))
+            data[2] = np.arange(n)      # shows whether ties kept their order
+            for keys in ((0,), (0, 1), (1, 0)):
+                expected = data[:, np.lexsort([data[k] for k in keys[::-1]])]
+                got = iteration.np_sort_together(data, keys)
+                self.assertTrue(np.array_equal(expected, got))
+                for workers in (1, None):
+                    got = iteration.np_sort_together(data, keys,
+                        chunk_size = rand.randint(20, 400), workers = workers)
+                    self.assertTrue(np.array_equal(expected, got))
+
+    def test_sort_memmap(self):
+        import tempfile
+        np = iteration.np
+        shape = (2, 10**4)
+        data = np.memmap(tempfile.TemporaryFile(), 'f8', 'w+', shape = shape)
+        data[0] = np.random.random(shape[1])
+        data[1] = np.arange(shape[1])
+        out = np.memmap(tempfile.TemporaryFile(), 'f8', 'w+', shape = shape)
+        got = iteration.np_sort_together(data, out = out, chunk_size = 1000)
+        self.assertTrue(got is out)
+        expected = np.array(data)[:, np.argsort(data[0], kind = 'mergesort')]
+        self.assertTrue(np.array_equal(expected, out))
+
+    def test_columnize(self):
+        np = iteration.np
+        data = np.arange(24).reshape(2, 3, 4)
+        columns = iteration.np_columnize_rows(data)
+        self.assertTrue(np.array_equal(np.fliplr(np.rot90(data, k = -1)),
+                                       columns))
+        self.assertTrue(np.may_share_memory(columns, data))
+
+class mergeTest(unittest.TestCase):
+    def test_merge(self):
+        lists = [sorted(random.randint(0, 50) for n in range(random.randint(
+                 0, 40))) for k in range(6)]
+        sources = [iter(lists[0]), iteration.biter(lists[1]),
+                   iteration.soliditer(lists[2])] + lists[3:]
+        self.assertEqual(sorted(sum(lists, [])),
+                         list(iteration.merge_sorted(*sources)))
+        self.assertEqual([], list(iteration.merge_sorted()))
+        self.assertEqual([5, 4, 3, 2, 2, 1], list(iteration.merge_sorted(
+            [5, 2, 1], [4, 3, 2], reverse = True)))
+        pairs = iteration.merge_sorted([(1, 'a'), (2, 'a')],
+                                       [(1, 'b'), (2, 'b')],
+                                       key = lambda p: p[0])
+        self.assertEqual([(1, 'a'), (1, 'b'), (2, 'a'), (2, 'b')], list(pairs))
+        self.assertRaises(TypeError, list, iteration.merge_sorted([], k = 1))
+
+    def test_lazy(self):
+        pulled = []
+        def source(name):
+            for n in range(10**6):
+                pulled.append(name)
+                yield n
+        merged = iteration.merge_sorted(source('a'), source('b'))
+        self.assertEqual([0, 0, 1, 1, 2], [next(merged) for n in range(5)])
+        self.assertTrue(len(pulled) <= 8)
+
+    def test_group(self):
+        data = [1, 1, 2, 3, 3, 3] + [4] * 1000 + [5]
+        groups = list(iteration.group_sorted(iter(data)))
+        self.assertEqual([1, 2, 3, 4, 5], [k for k, g in groups])
+        self.assertEqual([(1, 1), (2,), (3, 3, 3), (4,) * 1000, (5,)],
+                         [g for k, g in groups])
+        self.assertEqual([], list(iteration.group_sorted([])))
+        joined = iteration.group_sorted(iteration.merge_sorted(
+            [(1, 'x'), (3, 'y')], [(1, 'p'), (2, 'q'), (3, 'r')],
+            key = lambda r: r[0]), key = lambda r: r[0])
+        self.assertEqual([(1, ((1, 'x'), (1, 'p'))), (2, ((2, 'q'),)),
+                          (3, ((3, 'y'), (3, 'r')))], list(joined))
+        si = iteration.soliditer(range(10), typecode = 'i')
+        self.assertEqual([[0, 1, 2], [3, 4, 5], [6, 7, 8], [9]],
+                         [list(g) for k, g in iteration.group_sorted(
+                             si, key = lambda v: v // 3)])
+
+class spillbufferTest(unittest.TestCase):
+    def test_spill_while_consuming(self):
+        for typecode in (None, 'd'):
+            buf = iteration.spillbuffer(typecode = typecode, spill_after = 10)
+            got = []
+            for i in range(300):
+                buf.extend(range(i * 10, i * 10 + 10))
+                got.extend(buf.popleft() for n in range(5))
+                buf.consume(4)
+                last = int(got[-1])
+                got.extend(range(last + 1, last + 5))
+                disk = buf._disk
+                if disk == None:
+                    continue
+                # the file only holds what is left, at most twice over
+                self.assertTrue(len(disk) <= 2 * buf.spilled() + 10)
+                if typecode == None:
+                    self.assertEqual(len(disk) + 1, len(disk._offsets))
+                    self.assertEqual(disk._size, disk._offsets[-1])
+                else:
+                    self.assertEqual(len(disk) * 8, disk._size)
+            self.assertEqual(range(2700), got)
+            self.assertEqual(300, len(buf))
+            self.assertEqual(range(2700, 3000), list(buf))
+            self.assertEqual([2700, 2850], [buf[0], buf[150]])
+            buf.close()
+
+    def test_spill(self):
+        for typecode in (None, 'd', 'i'):
+            si = iteration.soliditer(iter(range(1000)), typecode = typecode,
+                                     spill_after = 100)
+            self.assertEqual(700, si[700])
+            buf = si._databuf
+            self.assertTrue(buf.spilled() > 500)
+            self.assertEqual(range(695, 702), list(si[695:702]))
+            self.assertEqual(range(3), list(si.take(3)))
+            self.assertEqual(3, next(si))
+            si.consume(600)
+            self.assertEqual(604, si[0])
+            self.assertEqual(46, buf.index(650))
+            buf.insert(2, -1)
+            si.front_extend([7, 8])
+            self.assertEqual([7, 8, 604, 605, -1, 606], list(si[:6]))
+            self.assertEqual([7, 8, 604, 605, -1] + range(606, 1000),
+                             list(si))
+            self.assertEqual(0, buf.spilled())
+            buf.close()
+
+    def test_records(self):
+        records = [{'n': n, 'name': str(n) * (n % 7)} for n in range(300)]
+        buf = iteration.spillbuffer(records, spill_after = 10)
+        self.assertTrue(buf.spilled() > 200)
+        self.assertEqual(records[123], buf[123])
+        self.assertEqual(records[-1], buf[-1])
+        self.assertEqual(records[5:250:7], buf[5:250:7])
+        self.assertEqual(records, list(buf))
+        self.assertTrue(buf.nbytes() < iteration.solidbuffer(records).nbytes())
+
+class peekiterTest(unittest.TestCase):
+    def test_peek(self):
+        pi = iteration.peekiter(range(3))
+        self.assertEqual(0, pi.peek())
+        self.assertEqual(0, pi.peek())
+        self.assertEqual(0, next(pi))
+        self.assertFalse(pi.is_exhausted())
+        self.assertEqual([1, 2], list(pi))
+        self.assertTrue(pi.is_exhausted())
+        self.assertEqual('default', pi.peek('default'))
+        self.assertRaises(StopIteration, pi.peek)
+
+    def test_helpers_dont_rewrap(self):
+        it = iter(range(1000))
+        for n in range(1000):
+            done, it2 = iteration.isdone(it)
+            self.assertFalse(done)
+            if n:
+                self.assertTrue(it2 is it)
+            it = it2
+            value, it = iteration.get_first(it)
+            self.assertEqual(n, value)
+            self.assertEqual(n, next(it))
+        self.assertTrue(iteration.isdone(it)[0])
+        depth, it = iteration.find_depth(iter([[1, 2], [3]]))
+        self.assertEqual(2, depth)
+        self.assertEqual([[1, 2], [3]], list(it))
+
+class flattenTest(unittest.TestCase):
+    def test_flatten(self):
+        data = [range(3), [range(2), [[5, 'ab', u'cd']]], 7, (), [[[]]]]
+        self.assertEqual([0, 1, 2, 0, 1, 5, 'ab', u'cd', 7],
+                         list(iteration.flatten(data)))
+        self.assertEqual(list('abc'), list(iteration.flatten('abc')))
+        self.assertEqual([(1, 2), 3, 'de'], list(iteration.flatten(
+            [(1, 2), [3, 'de']], atomic = (tuple,))))
+        deep = 1
+        for n in range(5000):
+            deep = [deep, n]
+        self.assertEqual([1] + range(5000), list(iteration.flatten(deep)))
+
+    def test_max_depth(self):
+        data = [[1, [2, [3]]], 4]
+        self.assertEqual(data, list(iteration.flatten(data, max_depth = 0)))
+        self.assertEqual([1, [2, [3]], 4],
+                         list(iteration.flatten(data, max_depth = 1)))
+        self.assertEqual([1, 2, [3], 4],
+                         list(iteration.flatten(data, max_depth = 2)))
+        self.assertEqual([1, 2, 3, 4], list(iteration.flatten(data, 3)))
+
+    def test_numpy(self):
+        if not iteration._NUMPY_:
+            self.skipTest('numpy is not installed')
+        np = iteration.np
+        data = [np.arange(6).reshape(2, 3), [np.arange(2)], 9]
+        self.assertEqual([0, 1, 2, 3, 4, 5, 0, 1, 9],
+                         list(iteration.flatten(data)))
+        rows = list(iteration.flatten(data, max_depth = 1))
+        self.assertEqual([[0, 1, 2], [3, 4, 5]], [list(r) for r in rows[:2]])
+        objects = np.array([[1, 2], [3]], dtype = object)
+        self.assertEqual([1, 2, 3], list(iteration.flatten(objects)))
+
+def failing_source(n, error = KeyError):
+    for i in range(n):
+        yield i
+    raise error('source failed')
+
+class prefetchiterTest(unittest.TestCase):
+    def test_order(self):
+        for chunk_size in (1, 7, 100, 1000):
+            pi = iteration.prefetchiter(iter(range(500)), depth = 2,
+                                        chunk_size = chunk_size)
+            self.assertEqual(range(500), list(pi))
+            self.assertRaises(StopIteration, next, pi)
+        pi = iteration.prefetchiter(range(50), chunk_size = 16)
+        self.assertEqual([0, 1], [next(pi), next(pi)])
+        self.assertEqual([range(2, 16), range(16, 32), range(32, 48),
+                          [48, 49]], list(pi.chunks()))
+
+    def test_exception(self):
+        pi = iteration.prefetchiter(failing_source(10), chunk_size = 4)
+        got = []
+        self.assertRaises(KeyError, got.extend, pi)
+        self.assertEqual(range(10), got)
+        self.assertRaises(StopIteration, next, pi)
+
+    def test_base_exception(self):
+        for error in (KeyboardInterrupt, GeneratorExit, SystemExit):
+            pi = iteration.prefetchiter(failing_source(10, error),
+                                        chunk_size = 4)
+            got = []
+            self.assertRaises(error, got.extend, pi)
+            self.assertEqual(range(10), got)
+            self.assertRaises(StopIteration, next, pi)
+
+    def test_close(self):
+        source = iter(range(10**6))
+        with iteration.prefetchiter(source, depth = 2, chunk_size = 10) as pi:
+            self.assertEqual(0, next(pi))
+            thread = pi._thread
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertRaises(StopIteration, next, pi)
+        pi = iteration.prefetchiter(iter(range(10**6)), depth = 2)
+        thread = pi._thread
+        del pi
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+
+    def test_extend(self):
+        si = iteration.soliditer(range(3))
+        si.extend(iteration.prefetchiter(range(3, 100), chunk_size = 8))
+        self.assertEqual(range(10), list(si[:10]))
+        self.assertEqual(range(100), list(si))
+        bi = iteration.biter(range(3))
+        bi.extend(iteration.prefetchiter(range(3, 100), chunk_size = 8))
+        self.assertEqual(range(100), list(bi))
+
+def square(value):
+    return value * value
+
+def fail_on_13(value):
+    if value == 13:
+        raise KeyError(value)
+    return value
+
+class parallelMapTest(unittest.TestCase):
+    def setUp(self):
+        if iteration.futures == None:
+            self.skipTest('concurrent.futures is not installed')
+
+    def test_ordered(self):
+        expected = [v * v for v in range(1000)]
+        for chunk_size in (1, 10, 64, 2000):
+            got = iteration.parallel_map(square, iter(range(1000)),
+                                         workers = 3, chunk_size = chunk_size)
+            self.assertEqual(expected, list(got))
+        got = iteration.parallel_map(square, iteration.biter(range(100)),
+                                     executor = 'process', workers = 2)
+        self.assertEqual(expected[:100], list(got))
+
+    def test_unordered(self):
+        got = iteration.parallel_map(square, iteration.soliditer(range(1000)),
+                                     chunk_size = 7, ordered = False)
+        self.assertEqual([v * v for v in range(1000)], sorted(got))
+
+    def test_window(self):
+        pulled = []
+        def source():
+            for n in range(10**6):
+                pulled.append(n)
+                yield n
+        got = iteration.parallel_map(square, source(), workers = 2,
+                                     chunk_size = 10, window = 3)
+        self.assertEqual(0, next(got))
+        self.assertTrue(len(pulled) <= 40)
+        got.close()
+
+    def test_exception(self):
+        got = []
+        self.assertRaises(KeyError, got.extend, iteration.parallel_map(
+            fail_on_13, range(100), chunk_size = 5))
+        self.assertEqual(range(10), got)
+        self.assertRaises(ValueError, list, iteration.parallel_map(
+            square, range(10), executor = 'cluster'))
+
 class fiTests(unittest.TestCase):
     def setUp(self):
         self.a1 = range(-1000, 1000)
@@ -204,6 +889,107 @@ class fiTests(unittest.TestCase):
         self.assertEqual(453, iteration.first_index_ne(empt, 0))
         self.assertEqual(453, iteration.first_index_nis(empt, 0))
         self.assertEqual(453, iteration.first_index_nin(empt, (0,10,200)))
+
+    @unittest.skipIf(not iteration._NUMPY_, 'needs numpy')
+    def testFastPath(self):
+        import numpy as np
+        import array
+        data = [random.randint(0, 100) for n in range(200000)]
+        compare = (np.array(data), array.array('i', data), bytearray(data))
+        calls = (('gt', 95), ('gtet', 99), ('lt', 2), ('ne', data[0]),
+                 ('et', 50), ('in', set((7, 8))), ('nin', range(1, 100)))
+        slices = ((0, None, 1), (10, None, 3), (500, 100000, 1),
+                  (150000, -1, -1), (199999, 10, -7))
+        for name, value in calls:
+            function = getattr(iteration, 'first_index_' + name)
+            for args in slices:
+                expected = function(data, value, *args)
+                for c in compare:
+                    self.assertEqual(expected, function(c, value, *args))
+        self.assertEqual(None, iteration.first_index_is(compare[0], 5))
+        self.assertEqual(3, iteration.first_index_nis(compare[0], 5, 3))
+
+    @unittest.skipIf(not iteration._NUMPY_, 'needs numpy')
+    def testFastPathNan(self):
+        import numpy as np
+        data = np.zeros(100000)
+        data[77777] = np.nan
+        self.assertEqual(77777, iteration.first_index_et(data, float('nan')))
+        self.assertEqual(None, iteration.first_index_et(data, float('nan'),
+                                                        77778))
+        self.assertEqual(None, iteration.first_index_gt(data, 0))
+
+    def testMultiTarget(self):
+        nan = float('nan')
+        data = [5, 3, nan, 3, 'x', [1], 7, 5] + self.a1
+        values = (3, 7, nan, 'x', 999, 5000)
+        expected = dict((v, iteration.first_index_et(data, v)) for v in values)
+        del expected[5000]
+        self.assertEqual(repr(sorted(expected.items())), repr(sorted(
+            iteration.first_indexes_et(data, values).items())))
+        self.assertEqual({7: 6, 999: 2007}, iteration.first_indexes_et(
+            data, (7, 999), 5, None, 1))
+        # stops as soon as everything is found
+        si = iteration.soliditer(iter(range(100)))
+        self.assertEqual({10: 10, 3: 3}, iteration.first_indexes_et(si,
+                                                                    (3, 10)))
+        self.assertEqual(11, next(si))
+        if iteration._NUMPY_:
+            import numpy as np
+            self.assertEqual({6: 6, 9000: 9000}, iteration.first_indexes_et(
+                np.arange(10 ** 5), (6, 9000, -1), 5))
+
+class sortedFiTests(unittest.TestCase):
+    def setUp(self):
+        self.data = sorted(random.randint(0, 500) for n in range(2000))
+        self.compare = [self.data, tuple(self.data)]
+        if iteration._NUMPY_:
+            import numpy as np
+            self.compare.append(np.array(self.data))
+
+    def testSameAsLinear(self):
+        data = self.data
+        for value in (-1, 0, 5, 250, 499, 500, 501):
+            for start, stop in ((0, None), (100, None), (100, 1500),
+                                (100, 5000)):
+                for name in ('gt', 'gtet', 'lt'):
+                    expected = getattr(iteration, 'first_index_' + name)(
+                        data, value, start, stop)
+                    function = getattr(iteration, 'sorted_first_index_' +
+                                       name)
+                    for c in self.compare:
+                        self.assertEqual(expected, function(c, value,
+                                                            start, stop))
+
+    def testBatched(self):
+        data = self.data
+        values = range(-5, 510, 7)
+        for side, name in (('right', 'gt'), ('left', 'gtet')):
+            function = getattr(iteration, 'first_index_' + name)
+            expected = [function(data, v) for v in values]
+            expected = [len(data) if e == None else e for e in expected]
+            for c in self.compare:
+                got = iteration.sorted_insert_indexes(c, values, side)
+                self.assertEqual(expected, list(got))
+        self.assertRaises(ValueError, iteration.sorted_insert_indexes,
+                          data, values, 'middle')
+
+    def testStopPastEnd(self):
+        self.assertEqual(2, iteration.sorted_first_index_gt([1, 2, 3], 2,
+                                                            0, 10))
+        self.assertEqual(1, iteration.sorted_first_index_gtet([1, 2, 3], 2,
+                                                              0, 10))
+        self.assertEqual(None, iteration.sorted_first_index_gt([1, 2, 3], 3,
+                                                               0, 10))
+        self.assertEqual([0, 3], iteration.sorted_insert_indexes([1, 2, 3],
+                                                    [0, 5], 'right', 0, 10))
+    
+    def testStrings(self):
+        words = ['apple', 'banana', 'cherry']
+        self.assertEqual(1, iteration.sorted_first_index_gtet(words, 'b'))
+        self.assertEqual(2, iteration.sorted_first_index_gt(words, 'banana'))
+        self.assertEqual([0, 2], iteration.sorted_insert_indexes(words, 
+                                    ['a', 'c'], 'left'))
     
 if __name__ == '__main__':
     unittest.main()        
@@ -0,0 +1,308 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#    ******  The Cloud Toolbox v0.1.2******
+#    This is the cloud toolbox -- a single module used in several packages
+#    found at <https://github.com/cloudformdesign>
+#    For more information see <cloudformdesign.com>
+#
+#    This module may be a part of a python package, and may be out of date.
+#    This behavior is intentional, do NOT update it.
+#    
+#    You are encouraged to use this pacakge, or any code snippets in it, in
+#    your own projects. Hopefully they will be helpful to you!
+#        
+#    This project is Licenced under The MIT License (MIT)
+#    
+#    Copyright (c) 2013 Garrett Berg cloudformdesign.com
+#    An updated version of this file can be found at:
+#    <https://github.com/cloudformdesign/cloudtb>
+#    
+#    Permission is hereby granted, free of charge, to any person obtaining a 
+#    copy of this software and associated documentation files (the "Software"),
+#    to deal in the Software without restriction, including without limitation 
+#    the rights to use, copy, modify, merge, publish, distribute, sublicense,
+#    and/or sell copies of the Software, and to permit persons to whom the 
+#    Software is furnished to do so, subject to the following conditions:
+#    
+#    The above copyright notice and this permission notice shall be included in
+#    all copies or substantial portions of the Software.
+#    
+#    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL 
+#    THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+#    FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
+#    DEALINGS IN THE SOFTWARE.
+#
+
+import pdb
+try:
+    from .. import textools
+except ValueError:
+    try:
+        import textools
+        print 'Running from within cloudtb'
+    except:
+        import sys
+        sys.path.insert(1, '..')
+        import textools
+        print 'Running as __main__'
+
+import unittest
+import random
+import tempfile
+import threading
+import os
+import re
+
+TEXT = ("""Researching my re search is really easy with this handy new tool!
+ It shows me my matches and group number, I think it is great that
+ they're seen in this new light!\n""")
+REGEXP = r'((R|r)e ?se\w*)|(((T|t)h)?is)'
+
+def spans(researched):
+    return [(m.match_data[0], m.match_data[1], m.text, str(m)) 
+            for m in researched if type(m) not in (str, unicode)]
+
+class researchFileTest(unittest.TestCase):
+    def setUp(self):
+        random.seed(11)
+        words = TEXT.split(' ')
+        self.text = ' '.join(random.choice(words) for n in range(3000))
+        f = tempfile.NamedTemporaryFile(delete = False)
+        f.write(self.text)
+        f.close()
+        self.path = f.name
+    
+    def tearDown(self):
+        os.remove(self.path)
+    
+    def research_file(self, *args, **kwargs):
+        return list(textools.re_search_file(REGEXP, self.path, *args, 
+                                            **kwargs))
+    
+    def testWholeFile(self):
+        expected = list(textools.re_search(REGEXP, self.text))
+        got = self.research_file()
+        self.assertEqual([str(n) for n in expected], [str(n) for n in got])
+        self.assertEqual(spans(expected), spans(got))
+    
+    def testWindows(self):
+        expected = spans(textools.re_search(REGEXP, self.text))
+        for window, overlap in ((1, 20), (7, 16), (64, 32), (1000, 11)):
+            matches = []
+            got = list(textools.re_search_file(REGEXP, self.path, 
+                return_matches = matches, window = window, 
+                overlap = overlap))
+            self.assertEqual(''.join(textools.get_iter_str_researched(got)),
+                             self.text)
+            self.assertEqual(expected, spans(got))
+            self.assertEqual(expected, spans(matches))
+    
+    def testAnchors(self):
+        # ^ and \\b have to see the text before each window
+        for regexp in (r'(?m)^\w+', r'\bis\b', r'(?<=my )\w+'):
+            expected = spans(textools.re_search(regexp, self.text))
+            got = textools.re_search_file(regexp, self.path, window = 5,
+                                          overlap = 16)
+            self.assertEqual(expected, spans(got))
+    
+    def testStartEnd(self):
+        start, end = 100, 2000
+        expected = spans(textools.re_search(REGEXP, self.text, start, end))
+        got = self.research_file(start, end, window = 50, overlap = 20)
+        self.assertEqual(expected, spans(got))
+        self.assertEqual(self.text[start:end], 
+                         ''.join(textools.get_iter_str_researched(got)))
+    
+    def testEmpty(self):
+        self.assertEqual([''], self.research_file(5, 5))
+        self.assertEqual([self.text], 
+            [''.join(textools.re_search_file('', self.path, window = 100))])
+        self.assertRaises(ValueError, self.research_file, window = 0)
+
+class researchSpansTest(unittest.TestCase):
+    def testSameAsResearch(self):
+        random.seed(3)
+        words = TEXT.split(' ')
+        text = ' '.join(random.choice(words) for n in range(300))
+        for regexp in (REGEXP, r'(a)|(b)?c*', r'\w+(?P<end>ing)?', r'x*'):
+            expected = []
+            for m in textools.re_search(regexp, text):
+                if type(m) in (str, unicode):
+                    continue
+                match = m.match_data[0]
+                regs = [(i, r) for i, r in enumerate(m.match_data[2].search(
+                    text, m.match_data[1][0]).regs) if r[0] >= 0]
+                expected.extend((match, i) + r for i, r in regs)
+            got = list(textools.re_search_spans(regexp, text))
+            self.assertEqual(expected, got)
+            columns = textools.re_search_spans(regexp, text, columns = True)
+            self.assertEqual(got, zip(*columns))
+    
+    def testStartEnd(self):
+        got = list(textools.re_search_spans(r'(b)', 'abcabc', 2, 5))
+        self.assertEqual([(0, 0, 4, 5), (0, 1, 4, 5)], got)
+        columns = textools.re_search_spans('q', 'abc', columns = True)
+        self.assertEqual([[], [], [], []], [list(c) for c in columns])
+        self.assertEqual([textools._SPAN_TYPECODE] * 4,
+                         [c.typecode for c in columns])
+
+class researchPlanTest(unittest.TestCase):
+    def setUp(self):
+        textools.clear_research_plans()
+    
+    def tearDown(self):
+        textools.clear_research_plans(textools.RESEARCH_PLAN_CACHE_SIZE)
+    
+    def testNesting(self):
+        plan = textools.get_research_plan(r'((a)(?:b(c))|(?P<x>d(?=(e))))*f')
+        self.assertEqual((None, 0, 1, 1, 1, 4), plan.parents)
+        self.assertEqual((6, 6, 3, 4, 6, 6), plan.ends)
+        self.assertEqual(r'((a)(?:b(c))|(?P<x>d(?=(e))))*f', 
+                         plan.reg_groups[0])
+        
+    def testStats(self):
+        for n in range(3):
+            textools.re_search(REGEXP, TEXT)
+            textools.re_search_spans(REGEXP, TEXT)
+        stats = textools.research_plan_stats()
+        # REGEXP and the regexp get_regex_groups uses to split it
+        self.assertEqual(2, stats['misses'])
+        self.assertEqual(2, stats['size'])
+        self.assertEqual(5, stats['hits'])
+        plan = textools.get_research_plan(re.compile(REGEXP))
+        self.assertTrue(plan is textools.get_research_plan(REGEXP))
+        self.assertFalse(plan is textools.get_research_plan(REGEXP, re.I))
+    
+    def testBounded(self):
+        textools.clear_research_plans(maxsize = 4)
+        plans = [textools.get_research_plan('a' * n) for n in range(10)]
+        self.assertEqual(4, textools.research_plan_stats()['size'])
+        self.assertTrue(plans[-1] is textools.get_research_plan('a' * 9))
+        self.assertFalse(plans[0] is textools.get_research_plan(''))
+    
+    def testThreads(self):
+        patterns = ['(a)(%d)' % n for n in range(20)]
+        def run():
+            for pattern in patterns * 5:
+                textools.get_research_plan(pattern)
+        threads = [threading.Thread(target = run) for n in range(4)]
+        [t.start() for t in threads]
+        [t.join() for t in threads]
+        stats = textools.research_plan_stats()
+        self.assertEqual(400, stats['hits'] + stats['misses'])
+        self.assertEqual(20, stats['size'])
+    
+    def testSiblingText(self):
+        # groups after a nested group used to repeat its text
+        text = 'CMP_TYPE = type(x)'
+        for regexp in (r'(\w+)\s*=\s*((\w+)|(\d+))', r'((\w)(\w))+'):
+            researched = textools.re_search(regexp, text)
+            self.assertEqual(text, textools.get_str_researched(researched))
+
+class lazyRegGroupPartTest(unittest.TestCase):
+    def testLazy(self):
+        researched = textools.re_search(REGEXP, TEXT)
+        matches = list(textools.get_matches(researched))
+        self.assertTrue(all(m._data_list == None for m in matches))
+        self.assertEqual(['Researching', 're search', 'is', 'this'],
+                         [m.text for m in matches[:4]])
+        self.assertTrue(all(m._data_list == None for m in matches))
+        self.assertEqual('<*m0>[[{{R}<g[2]>esearching}<g[0, 1]>]]',
+                         str(matches[0]))
+        self.assertEqual([0, 1], matches[0].indexes)
+        self.assertEqual(None, matches[1]._data_list)
+        self.assertEqual([0, 3], matches[2].indexes)
+    
+    def testSameAsEager(self):
+        regexp = re.compile(REGEXP)
+        eager = []
+        for i, m in enumerate(regexp.finditer(TEXT)):
+            groups = tuple(m.group(i) for i in range(len(m.regs)))
+            part = textools.RegGroupPart(groups, None, 0, 
+                                         (i, m.span(), regexp))
+            part.init(TEXT, m.regs)
+            eager.append(str(part))
+        lazy = [str(m) for m in textools.get_matches(
+                textools.re_search(regexp, TEXT, no_groups = True))]
+        self.assertEqual(eager, lazy)
+    
+    def testReplace(self):
+        researched = textools.re_search(REGEXP, TEXT)
+        replaced = textools.re_search_replace(researched, 'X')
+        self.assertEqual(re.sub(REGEXP, 'X', TEXT), 
+                         textools.get_str_researched(replaced))
+
+class researchResultTest(unittest.TestCase):
+    def research(self, regexp, text, *args):
+        return (textools.re_search(regexp, text, *args),
+                textools.re_search(regexp, text, *args, 
+                                   return_type = textools.ResearchResult))
+    
+    def testSameAsResearch(self):
+        for regexp in (REGEXP, r'(\w+)\s*=\s*((\w+)|(\d+))', r'((((t))))',
+                       r'(?P<n>re)(search)?', r'(x)|(y)|(z)', ''):
+            researched, result = self.research(regexp, TEXT)
+            self.assertEqual(textools.format_re_search(researched),
+                             textools.format_re_search(result))
+            matches = list(textools.get_matches(researched))
+            self.assertEqual(len(matches), len(result))
+            for m, view in zip(matches, result[:]):
+                self.assertEqual((m.text, m.groups, m.indexes, m.reg, 
+                                  m.match_data), 
+                                 (view.text, view.groups, view.indexes, 
+                                  view.reg, view.match_data))
+    
+    def testNotNested(self):
+        # groups outside their parent: re_search can't build these either
+        # (it asserts when the parts are built, ResearchResult raises a
+        # ValueError right away)
+        for regexp, text in ((r'((a)|(b))+', 'ab'), (r'(?<=(a))b', 'ab')):
+            researched = textools.re_search(regexp, text)
+            self.assertRaises(AssertionError, textools.format_re_search,
+                              researched)
+            self.assertRaises(ValueError, textools.re_search, 
+                              regexp, text, 
+                              return_type = textools.ResearchResult)
+    
+    def testIndexing(self):
+        result = textools.re_search(REGEXP, TEXT, 5, 120, 
+                                    return_type = textools.ResearchResult)
+        self.assertEqual('re search', result[0].text)
+        self.assertEqual('<*m0>[[{{r}<g[2]>e search}<g[0, 1]>]]', 
+                         str(result[0]))
+        self.assertEqual(result[len(result) - 1].text, result[-1].text)
+        self.assertEqual(['is', 'this'], [m.text for m in result[1:3]])
+        self.assertEqual('r', result[0].data_list[0].text)
+        self.assertEqual(None, result[0].data_list[0].match_data)
+        self.assertRaises(IndexError, result.__getitem__, len(result))
+        self.assertEqual(TEXT[5:], 
+                         ''.join(textools.get_iter_str_researched(result)))
+        self.assertEqual(len(result.groups) * 4 * result.groups.itemsize
+                         + (len(result) + 1) * result.groups.itemsize,
+                         result.nbytes())
+        self.assertEqual(textools._SPAN_TYPECODE, result.starts.typecode)
+    
+    def testReplace(self):
+        researched, result = self.research(REGEXP, TEXT)
+        upper = lambda m: m.text.upper()
+        expected = textools.re_search_replace(researched, upper)
+        got = textools.re_search_replace(result, upper)
+        self.assertEqual(textools.format_re_search(expected), 
+                         textools.format_re_search(got))
+        self.assertEqual(textools.get_str_researched(expected), 
+                         textools.get_str_researched(got))
+        self.assertEqual(['RESEARCHING'], result[0].replace_list)
+        self.assertEqual(re.sub(REGEXP, 'X', TEXT), 
+            textools.re_search_replace(result, 'X', preview = False))
+    
+    def testTypes(self):
+        self.assertRaises(TypeError, textools.re_search, REGEXP, TEXT,
+            return_matches = True, return_type = textools.ResearchResult)
+        self.assertRaises(TypeError, textools.re_search, REGEXP, TEXT,
+                          return_type = set)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -39,7 +39,13 @@
 
 import pdb
 import os
+import shutil
 import re
+import sre_parse
+import mmap
+import array
+import collections
+import threading
 import iteration
 import functions
 
@@ -52,10 +58,28 @@ WORD_SET = set(('_',))
 WORD_SET.update(LOWER_LETTER_SET)
 WORD_SET.update(UPPER_LETTER_SET)
 
+# re_search_file reads the file in windows of this many bytes, plus an
+# overlap on each side for context and for matches crossing the boundary
+RESEARCH_WINDOW = 1 << 20
+RESEARCH_OVERLAP = 1 << 12
+# number of ResearchPlans kept by get_research_plan
+RESEARCH_PLAN_CACHE_SIZE = 256
+# array typecode for span columns. 'l' is only 32 bits on windows, 'q' is
+# 64 everywhere but python 2 doesn't have it
+if array.array('l').itemsize >= 8:
+    _SPAN_TYPECODE = 'l'
+else:
+    try:
+        array.array('q')
+        _SPAN_TYPECODE = 'q'
+    except ValueError:
+        _SPAN_TYPECODE = 'l'
+
 def format_re_search(list_data, pretty = False):
     '''Returns a string of researched data that is semi-easy to read.
     If pretty == True then each item starts on it's own line with a '>>| '
-    at the front (easier to read)'''
+    at the front (easier to read)
+    list_data can be any re_search output, including a ResearchResult'''
     strings = (str(n) for n in list_data)
     if pretty:
         return '\n>>|'.join(strings)
@@ -69,7 +93,8 @@ def get_orig_researched(re_searched):
 
 def get_str_researched(re_searched):
     '''returns the origional string if replace has not been called,
-    else returns the replacement string'''
+    else returns the replacement string. Takes any re_search output, 
+    including a ResearchResult'''
     return ''.join(get_iter_str_researched(re_searched))
 
 def get_iter_str_researched(re_searched):
@@ -102,12 +127,9 @@ def _re_search_yield(regexp, text, start = 0, end = None,
     re_search with return_type = iter instead
     
     matches = [] if you want it to keep track of matches'''
-    if type(regexp) in (str, tuple):
-        pat = regexp
-    else:
-        pat = regexp.pattern
-
-    if pat == '':
+    plan = get_research_plan(regexp)
+    regexp = plan.regexp
+    if plan.pattern == '':
         yield text
         raise StopIteration
     
@@ -117,12 +139,10 @@ def _re_search_yield(regexp, text, start = 0, end = None,
     del end
     
     stop = start
-    if type(regexp) == str:    
-        regexp = re.compile(regexp)
     if no_groups:
         regex_groups = None
     else:
-        regex_groups = get_regex_groups(pat)
+        regex_groups = plan.reg_groups
     match = 0
     count = 0
     prev_stop = stop
@@ -166,7 +186,7 @@ def _re_search_yield(regexp, text, start = 0, end = None,
         index = iteration.first_index_ne(groups, None)
         new_RegGroupPart = RegGroupPart(groups, regex_groups, index, 
                                         match_data = (match, span, regexp))
-        new_RegGroupPart.init(text, regs)
+        new_RegGroupPart.init(text, regs, ends = plan.ends)
         if matches != None:
             matches.append(new_RegGroupPart)
         yield new_RegGroupPart
@@ -230,12 +250,23 @@ they're seen in this new light!"""
         are supported. If you choose iter and you want it to return the
         matches, then return_matches must equal an empty array (where the
             matches will be stored)
-    '''
-    if return_type not in (tuple, list, iter):
-        raise TypeError("return_type must be tuple, list, or iter function")
         
+        return_type = ResearchResult stores the matches in arrays instead of
+        RegGroupPart objects, for searches with a great many matches. It can
+        be used anywhere the other outputs are.
+    '''
+    if return_type not in (tuple, list, iter, ResearchResult):
+        raise TypeError("return_type must be tuple, list, iter function or "
+                        "ResearchResult")
+    
+    if return_type == ResearchResult:
+        if return_matches:
+            raise TypeError("ResearchResult is indexed by match, "
+                            "return_matches is not needed")
+        return ResearchResult(regexp, text, start, end, no_groups)
+    
     if return_type == iter:
-        if return_matches or return_matches != []:
+        if return_matches != None and return_matches != []:
             raise TypeError("for iterator return, matches must be None or []")
         itresearch = _re_search_yield(regexp, text, start, end, return_matches,
                             no_groups = no_groups)
@@ -249,7 +280,219 @@ they're seen in this new light!"""
         return return_type(_re_search_yield(regexp, text, start, end,
                                             no_groups = no_groups))
     
-class RegGroupPart(object):
+def _mmap_read(fileno, start, end):
+    '''read file[start:end] through a map of only that region, so the pages
+    are released again when it is closed'''
+    offset = start - start % mmap.ALLOCATIONGRANULARITY
+    mm = mmap.mmap(fileno, end - offset, access = mmap.ACCESS_READ, 
+                   offset = offset)
+    try:
+        return mm[start - offset:end - offset]
+    finally:
+        mm.close()
+
+def _re_search_file_yield(regexp, path, start = 0, end = None, matches = None,
+                          no_groups = False, window = None, overlap = None):
+    '''Internal implementation of re_search_file. Maps the file one window
+    at a time so only window + 2 * overlap bytes are held in memory'''
+    if window == None:
+        window = RESEARCH_WINDOW
+    if overlap == None:
+        overlap = RESEARCH_OVERLAP
+    if window < 1 or overlap < 0:
+        raise ValueError("window must be > 0 and overlap >= 0")
+    plan = get_research_plan(regexp)
+    regexp, pat = plan.regexp, plan.pattern
+    if no_groups or pat == '':
+        regex_groups = None
+    else:
+        regex_groups = plan.reg_groups
+    
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if end == None or end > size:
+            end = size
+        if start >= end:
+            # mmap can't map an empty region
+            yield ''
+            return
+        search = regexp.search
+        match = 0
+        wstart = stop = prev_stop = start
+        while True:
+            wend = min(end, wstart + window)
+            # keep at least one byte in front of the window so that
+            # ^, \b and lookbehinds see the real text before it
+            cstart = max(0, wstart - max(overlap, 1))
+            cend = min(end, wend + overlap)
+            chunk = _mmap_read(f.fileno(), cstart, cend)
+            while stop < wend and pat != '':
+                searched = search(chunk, stop - cstart, cend - cstart)
+                if searched == None:
+                    break
+                mstart, mstop = searched.span()
+                mstart, mstop = mstart + cstart, mstop + cstart
+                if mstart >= wend:
+                    # it starts in the overlap, the next window gets it
+                    break
+                if mstart == mstop:
+                    # Empty match
+                    stop = mstop + 1
+                    continue
+                if prev_stop < mstart:
+                    yield chunk[prev_stop - cstart:mstart - cstart]
+                    
+                regs = tuple((s + cstart, e + cstart) if s >= 0 
+                             else (s, e) for s, e in searched.regs)
+                get_group = searched.group
+                groups = tuple((get_group(i) for i in range(len(regs))))
+                index = iteration.first_index_ne(groups, None)
+                new_RegGroupPart = RegGroupPart(groups, regex_groups, 
+                    index, match_data = (match, (mstart, mstop), regexp))
+                new_RegGroupPart.init(chunk, regs, cstart, plan.ends)
+                if matches != None:
+                    matches.append(new_RegGroupPart)
+                yield new_RegGroupPart
+                prev_stop = stop = mstop
+                match += 1
+                
+            if wend == end:
+                break
+            wstart = max(stop, wend)
+            if prev_stop < wstart:
+                yield chunk[prev_stop - cstart:wstart - cstart]
+                prev_stop = wstart
+            stop = wstart
+        yield chunk[prev_stop - cstart:end - cstart]
+
+def re_search_file(regexp, path, start = 0, end = None, return_matches = None,
+                   no_groups = False, window = None, overlap = None):
+    '''re_search over the file at path without reading it into memory.
+    
+    The file is memory mapped and searched one window (default 
+    RESEARCH_WINDOW bytes) at a time, so memory use is bounded by the 
+    window size rather than the file size. Each window is searched with
+    overlap (default RESEARCH_OVERLAP) bytes of the text around it, so a
+    match that starts in a window and crosses into the next one is found
+    whole as long as it is no longer than overlap.
+    
+    Returns an iterator of the same text / RegGroupPart stream as 
+    re_search(..., return_type = iter), except:
+        - match_data spans (and .reg) are absolute offsets in the file
+        - text between matches may be split into several strings at window
+            boundaries. ''.join on the text is still the file's text.
+    
+    If return_matches is a list the matches are appended to it as they are
+    yielded.
+    '''
+    if return_matches != None and return_matches != []:
+        raise TypeError("return_matches must be None or []")
+    return _re_search_file_yield(regexp, path, start, end, return_matches,
+                                 no_groups, window, overlap)
+    
+def _re_search_spans_yield(regexp, text, start = 0, end = None):
+    '''Internal implementation of re_search_spans'''
+    if end == None:
+        end = len(text)
+    match = 0
+    for searched in regexp.finditer(text, start, end):
+        regs = searched.regs
+        mstart, mstop = regs[0]
+        if mstart == mstop:
+            # Empty match, re_search skips these too
+            continue
+        for group, (gstart, gstop) in enumerate(regs):
+            if gstart >= 0:
+                yield match, group, gstart, gstop
+        match += 1
+
+def re_search_spans(regexp, text, start = 0, end = None, columns = False):
+    '''The spans of re_search without building RegGroupPart objects or 
+    copying any of the text.
+    
+    Yields a (match_no, group_no, start, end) tuple for group 0 of every 
+    match followed by each group that took part in it, numbered the same
+    as the matches and groups of re_search. Empty matches are skipped 
+    like re_search does.
+    
+    If columns == True, returns a tuple of four array.array columns
+    (match_nos, group_nos, starts, ends) instead of an iterator. The
+    typecode holds 64 bit offsets where the platform has one.
+    
+    EXAMPLE:
+    >>> list(re_search_spans(r'(a)|(b)', 'xab'))
+    [(0, 0, 1, 2), (0, 1, 1, 2), (1, 0, 2, 3), (1, 2, 2, 3)]
+    '''
+    regexp = get_research_plan(regexp).regexp
+    spans = _re_search_spans_yield(regexp, text, start, end)
+    if not columns:
+        return spans
+    out = tuple(array.array(_SPAN_TYPECODE) for n in range(4))
+    add_match, add_group, add_start, add_end = (c.append for c in out)
+    for match, group, gstart, gstop in spans:
+        add_match(match)
+        add_group(group)
+        add_start(gstart)
+        add_end(gstop)
+    return out
+    
+class _RegGroupBase(object):
+    '''what RegGroupPart and RegGroupView share. Subclasses give indexes,
+    replace_list, data_list, match_data and groups'''
+    __slots__ = ()
+    
+    def get_replaced(self, only_self = False, get_index = False):
+        '''get the string after the replacement function has been
+        performed'''
+        for i in self.indexes:
+            if (self.replace_list and 
+            type(self.replace_list[i]) in (str, unicode)):
+                if get_index:
+                    return i, self.replace_list[i]
+                else:
+                    return self.replace_list[i]
+        
+        if only_self:
+            if get_index:
+                return None, None
+            else:
+                return None
+                
+        out = ''.join(n if type(n) == str else n.get_replaced() for n in
+                self.data_list)
+        if get_index:
+            return None, out
+        else:
+            return out
+    
+    def __str__(self):
+        start, end = '', ''
+        if self.match_data != None:
+            match = self.match_data[0]
+            start = '<*m{0}>[['.format(match)
+            end = r']]'
+        if self.replace_list:
+            replace = None
+            len_rl = len(self.replace_list)
+            for i in self.indexes:
+                if i < len_rl and self.replace_list[i] != None:
+                    replace = self.replace_list[i]
+                    break
+            if replace:
+                end += r'==>[[{0}]]'.format(replace)
+        str_data = ''.join([str(n) for n in self.data_list])
+        return start + '{{{0}}}<g{1}>'.format(str_data, self.indexes) + end
+    
+    def __repr__(self):
+        return object.__repr__(self) + '["""' + str(self) + '"""]'
+    
+    def group(self, index):
+        '''Function so that RegPart can interface with things that use 
+        regexp match objects. IMPORTANT: cannot interface the same way with
+        the "groups" call'''
+        return self.groups[index]
+        
+class RegGroupPart(_RegGroupBase):
     def __init__(self, groups, reg_groups, index, match_data = None):
         '''
         - groups is all re.group(n)   NOTE: NOT re.search.groups(). See 
@@ -263,11 +506,33 @@ class RegGroupPart(object):
         '''
         self.groups = groups
         self.reg_groups = reg_groups
-        self.indexes = [index]
+        self._index = index
+        self._indexes = [index]
         self.match_data = match_data
         self.replace_list = None
         self.text = groups[index]
-        self.data_list = None
+        self._data_list = None
+        self._ends = None
+    
+    @property
+    def data_list(self):
+        '''the text and RegGroupParts inside this group. Built on first 
+        access if init was given the ends table'''
+        if self._data_list == None and self._ends != None:
+            self._build(self.groups[self._index], self.reg[0])
+        return self._data_list
+    
+    @data_list.setter
+    def data_list(self, value):
+        self._data_list = value
+    
+    @property
+    def indexes(self):
+        '''the group indexes this part is. Groups with the same span as this
+        one are only found when data_list is built'''
+        if self._data_list == None and self._ends != None:
+            self._build(self.groups[self._index], self.reg[0])
+        return self._indexes
     
     def do_replace(self, replace):
         '''Performs replacement.
@@ -290,52 +555,47 @@ class RegGroupPart(object):
         [n.do_replace(replace) for n in self.data_list if type(n) != str]
         return self
     
-    def get_replaced(self, only_self = False, get_index = False):
-        '''get the string after the replacement function has been
-        performed'''
-        for i in self.indexes:
-            if (self.replace_list and 
-            type(self.replace_list[i]) in (str, unicode)):
-                if get_index:
-                    return i, self.replace_list[i]
-                else:
-                    return self.replace_list[i]
-        
-        if only_self:
-            if get_index:
-                return None, None
-            else:
-                return None
-                
-        out = ''.join(n if type(n) == str else n.get_replaced() for n in
-                self.data_list)
-        if get_index:
-            return None, out
-        else:
-            return out
-    
-    def init(self, text, regs):
+    def init(self, text, regs, offset = 0, ends = None):
         '''
         - text is the outside text
         - regs is a view of the regs starting at itself. it is NOT
             the output of re.search.regs (has to be fixed for this object)
+        - offset is the position of text[0] when regs are absolute positions
+            in a larger text (i.e. text is a window of a file)
+        - ends is ResearchPlan.ends. The groups nested in this one are then
+            known up front instead of guessed from the regs, so nothing is
+            built until data_list (or str, get_replaced, do_replace) needs
+            it. Only regs are kept, the parts are cut from self.text.
         
         This works by going through the reg tuple and pulling out the strings
         that are relevant to it's own group -- the ones that fall within it's own
         start and end points
         It then stores them as new objects, and stores the text in between as well
         '''
+        self.reg = regs[self._index]
+        self._regs = regs
+        if ends == None:
+            return self._build(text, offset)
+        self._ends = ends
+    
+    def _build(self, text, offset):
+        '''builds data_list, returns its length'''
+        regs = self._regs
+        ends = self._ends
         groups = self.groups
         reg_groups = self.reg_groups
-        index = self.indexes[0]
+        index = self._index
         myreg = regs[index]
         mystart, myend = myreg
         data_list = []
+        if ends == None:
+            stop_index = len(regs)
+        else:
+            stop_index = ends[index]
         index += 1
-        len_regs = len(regs)
 #        pdb.set_trace
         prev_end = mystart
-        while index < len_regs:
+        while index < stop_index:
 #            if self.indexes[0] == 0:
 #                pdb.set_trace()
             reg = regs[index]
@@ -344,7 +604,7 @@ class RegGroupPart(object):
                 index += 1
                 continue
             if reg == myreg:
-                self.indexes.append(index)
+                self._indexes.append(index)
                 index += 1
                 continue
             if check_start >= myend and check_end > myend:
@@ -353,50 +613,253 @@ class RegGroupPart(object):
             cur_start, cur_end = check_start, check_end
             
             if not prev_end > cur_start and prev_end != cur_start:
-                data_list.append(text[prev_end:cur_start])
+                data_list.append(text[prev_end - offset:cur_start - offset])
             
             newregpart = RegGroupPart(groups, reg_groups, index)
-            converted = newregpart.init(text, regs)
+            converted = newregpart.init(text, regs, offset, ends)
             data_list.append(newregpart)
-            index += converted
-            prev_end = regs[index-1][1]
+            if ends == None:
+                index += converted
+                prev_end = regs[index-1][1]
+            else:
+                index = ends[index]
+                prev_end = cur_end
             
         if not data_list:
-            data_list.append(text[mystart:myend])
+            data_list.append(text[mystart - offset:myend - offset])
         else:
             if cur_end != myend:
-                data_list.append(text[cur_end:myend])
-        self.reg = myreg
-        self.data_list = data_list
+                data_list.append(text[cur_end - offset:myend - offset])
+        self._data_list = data_list
         return len(data_list)
-   
-    def __str__(self):
-        start, end = '', ''
-        if self.match_data != None:
-            match = self.match_data[0]
-            start = '<*m{0}>[['.format(match)
-            end = r']]'
-        if self.replace_list:
-            replace = None
-            len_rl = len(self.replace_list)
-            for i in self.indexes:
-                if i < len_rl and self.replace_list[i] != None:
-                    replace = self.replace_list[i]
-                    break
-            if replace:
-                end += r'==>[[{0}]]'.format(replace)
-        str_data = ''.join([str(n) for n in self.data_list])
-        return start + '{{{0}}}<g{1}>'.format(str_data, self.indexes) + end
+        
+class RegGroupView(_RegGroupBase):
+    '''A RegGroupPart look alike over one row of a ResearchResult. These
+    are made when asked for and hold nothing but their position, all data
+    lives in the result's columns.
     
-    def __repr__(self):
-        return object.__repr__(self) + '["""' + str(self) + '"""]'
+    Replacements are stored once per match, so do_replace on a nested view
+    sets the replace_list of its whole match'''
+    __slots__ = ('result', 'match', 'row')
     
-    def group(self, index):
-        '''Function so that RegPart can interface with things that use 
-        regexp match objects. IMPORTANT: cannot interface the same way with
-        the "groups" call'''
-        return self.groups[index]
+    def __init__(self, result, match, row):
+        self.result = result
+        self.match = match
+        self.row = row
+    
+    @property
+    def reg(self):
+        result, row = self.result, self.row
+        return result.starts[row], result.ends[row]
+    
+    @property
+    def text(self):
+        start, end = self.reg
+        return self.result.text[start:end]
+    
+    @property
+    def groups(self):
+        return self.result.match_groups(self.match)
+    
+    @property
+    def reg_groups(self):
+        return self.result.reg_groups
+    
+    @property
+    def match_data(self):
+        result = self.result
+        if self.row != result.match_rows[self.match]:
+            return None
+        return self.match, self.reg, result.regexp
+    
+    @property
+    def replace_list(self):
+        return self.result.replacements.get(self.match)
+    
+    @replace_list.setter
+    def replace_list(self, value):
+        self.result.replacements[self.match] = value
+    
+    def _rows(self):
+        '''(row, is_same_span) of the rows directly under this one'''
+        result, row = self.result, self.row
+        parents, starts, ends = result.parents, result.starts, result.ends
+        reg = starts[row], ends[row]
+        for r in range(row + 1, result.match_rows[self.match + 1]):
+            if parents[r] == row:
+                yield r, (starts[r], ends[r]) == reg
+    
+    @property
+    def indexes(self):
+        groups = self.result.groups
+        return [groups[self.row]] + [groups[r] for r, same in self._rows() 
+                                     if same]
+    
+    @property
+    def data_list(self):
+        result = self.result
+        text, starts, ends = result.text, result.starts, result.ends
+        prev_end, myend = self.reg
+        data_list = []
+        for r, same in self._rows():
+            if same:
+                continue
+            if prev_end < starts[r]:
+                data_list.append(text[prev_end:starts[r]])
+            data_list.append(RegGroupView(result, self.match, r))
+            prev_end = ends[r]
+        if prev_end < myend or not data_list:
+            data_list.append(text[prev_end:myend])
+        return data_list
+    
+    def do_replace(self, replace):
+        '''Performs replacement, see RegGroupPart.do_replace'''
+        if hasattr(replace, '__call__'):
+            replace = replace(self)
         
+        if type(replace) in (str, unicode):
+            replace = (replace,)
+        check_in = set((type(None), str, unicode))
+        replace_list = self.replace_list
+        if replace_list != None:
+            for i, r in enumerate(replace):
+                if type(replace_list[i]) in check_in:
+                    replace_list[i] = r
+        else:
+            self.replace_list = list(replace)   # make a copy
+        return self
+
+class ResearchResult(object):
+    '''All the matches of one re_search in parallel arrays instead of a
+    tree of RegGroupParts per match. Get one with 
+    re_search(..., return_type = ResearchResult).
+    
+    Every group that took part in a match is a row of:
+        groups      the group number
+        starts      start position in text
+        ends        end position in text
+        parents     the row it is nested in, -1 for the match itself. A 
+                        row with the same span as its parent is one of the
+                        parent's indexes rather than a nested part
+    match_rows[n] is the first row of match n (with one more at the end)
+    and replacements holds the replace_list of each replaced match.
+    
+    Iterating gives the same text / part stream as re_search, with 
+    RegGroupViews in place of RegGroupParts, so format_re_search,
+    get_str_researched and re_search_replace take it directly.
+    len() is the number of matches and indexing gives the view of a match.
+    '''
+    def __init__(self, regexp, text, start = 0, end = None, 
+                 no_groups = False):
+        plan = get_research_plan(regexp)
+        self.regexp = plan.regexp
+        self.pattern = plan.pattern
+        self.text = text
+        self.start = start
+        if no_groups or plan.pattern == '':
+            self.reg_groups = None
+        else:
+            self.reg_groups = plan.reg_groups
+        self.groups = array.array(_SPAN_TYPECODE)
+        self.starts = array.array(_SPAN_TYPECODE)
+        self.ends = array.array(_SPAN_TYPECODE)
+        self.parents = array.array(_SPAN_TYPECODE)
+        self.match_rows = array.array(_SPAN_TYPECODE)
+        self.replacements = {}
+        if plan.pattern != '':
+            self._search(plan.ends, start, end)
+        self.match_rows.append(len(self.groups))
+    
+    def _search(self, plan_ends, start, end):
+        if end == None:
+            end = len(self.text)
+        add_match = self.match_rows.append
+        groups = self.groups
+        for searched in self.regexp.finditer(self.text, start, end):
+            regs = searched.regs
+            if regs[0][0] == regs[0][1]:
+                # Empty match, re_search skips these
+                continue
+            add_match(len(groups))
+            self._add(regs, plan_ends, 0, -1)
+    
+    def _add(self, regs, plan_ends, index, parent):
+        '''adds the row of regs[index] and the ones nested in it. Walks the
+        regs the same way as RegGroupPart.init'''
+        row = len(self.groups)
+        myreg = regs[index]
+        mystart, myend = myreg
+        self._add_row(index, mystart, myend, parent)
+        mygroup = index
+        stop_index = plan_ends[index]
+        index += 1
+        while index < stop_index:
+            reg = regs[index]
+            check_start, check_end = reg
+            if check_start < 0:
+                index += 1
+                continue
+            if reg == myreg:
+                self._add_row(index, mystart, myend, row)
+                index += 1
+                continue
+            if check_start >= myend and check_end > myend:
+                break
+            if check_start < mystart or check_end > myend:
+                # a group that isn't inside its parent (repeated
+                # alternations, lookbehinds) can't be stored as a tree
+                raise ValueError("group {0} is not inside group {1} in "
+                    "pattern: {2!r}".format(index, mygroup, self.pattern))
+            self._add(regs, plan_ends, index, row)
+            index = plan_ends[index]
+    
+    def _add_row(self, group, start, end, parent):
+        self.groups.append(group)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.parents.append(parent)
+    
+    def __len__(self):
+        return len(self.match_rows) - 1
+    
+    def __getitem__(self, index):
+        if type(index) == slice:
+            return [self[n] for n in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("match index out of range")
+        return RegGroupView(self, index, self.match_rows[index])
+    
+    def __iter__(self):
+        text = self.text
+        if self.pattern == '':
+            yield text
+            return
+        match_rows, starts, ends = self.match_rows, self.starts, self.ends
+        prev_end = self.start
+        for match in range(len(self)):
+            row = match_rows[match]
+            if prev_end < starts[row]:
+                yield text[prev_end:starts[row]]
+            yield RegGroupView(self, match, row)
+            prev_end = ends[row]
+        yield text[prev_end:]
+    
+    def match_groups(self, match):
+        '''returns the tuple of all groups of a match, like 
+        RegGroupPart.groups (None for groups that took no part)'''
+        groups = [None] * (self.regexp.groups + 1)
+        text = self.text
+        for row in range(self.match_rows[match], self.match_rows[match + 1]):
+            groups[self.groups[row]] = text[self.starts[row]:self.ends[row]]
+        return tuple(groups)
+    
+    def nbytes(self):
+        '''returns the bytes used by the columns (not the text)'''
+        return sum(c.itemsize * len(c) for c in (self.groups, self.starts,
+                   self.ends, self.parents, self.match_rows))
+
 def re_in(txt, rcmp_iter):
     _len = len(txt)
     return bool([ri for ri in rcmp_iter if ri.match(txt, 0, _len)])
@@ -521,6 +984,11 @@ def _convert_groups(itgroups, groups = None, top_level = True):
     return lgroups
 
 def get_regex_groups(regexp):
+    '''returns the pattern of each group in regexp, group 0 first. Cached
+    with the rest of the regexp's ResearchPlan'''
+    return list(get_research_plan(regexp).reg_groups)
+
+def _get_regex_groups_uncached(regexp):
     assert(re.compile(regexp))
     lookahead = r'(?<!\\)'
 #    accept_lookahead = r'(?<=\\\\)'
@@ -546,6 +1014,121 @@ def get_regex_groups(regexp):
     list_groups = _get_regex_groups(researched)
     return _convert_groups(list_groups)
     
+def _group_parents(regexp):
+    '''returns a tuple of the group number each group is directly nested
+    in (group 0 is the whole match, its parent is None)'''
+    parents = [None] * (regexp.groups + 1)
+    def walk(subpattern, parent):
+        for op, av in subpattern:
+            if op == sre_parse.SUBPATTERN:
+                group = av[0]
+                if group != None:
+                    parents[group] = parent
+                    walk(av[-1], group)
+                else:
+                    walk(av[-1], parent)
+            elif type(av) in (tuple, list):
+                walk_av(av, parent)
+    def walk_av(av, parent):
+        for n in av:
+            if isinstance(n, sre_parse.SubPattern):
+                walk(n, parent)
+            elif type(n) in (tuple, list):
+                walk_av(n, parent)
+    walk(sre_parse.parse(regexp.pattern, regexp.flags), 0)
+    return tuple(parents)
+
+class ResearchPlan(object):
+    '''Everything re_search needs to know about a regexp before it sees any
+    text. Get these through get_research_plan so they are cached.
+        regexp      the compiled regexp
+        parents     the group each group is directly nested in
+        ends        groups are numbered by their open paranthesis so the
+                        groups nested in group n are n + 1 to ends[n] - 1
+        reg_groups  the output of get_regex_groups, built on first use
+    '''
+    def __init__(self, regexp):
+        if type(regexp) in (str, unicode):
+            regexp = re.compile(regexp)
+        self.regexp = regexp
+        self.pattern = regexp.pattern
+        self.flags = regexp.flags
+        self.parents = _group_parents(regexp)
+        ends = list(range(1, len(self.parents) + 1))
+        for group, parent in enumerate(self.parents):
+            while parent != None:
+                ends[parent] = max(ends[parent], group + 1)
+                parent = self.parents[parent]
+        self.ends = tuple(ends)
+        self._reg_groups = None
+    
+    @property
+    def reg_groups(self):
+        if self._reg_groups == None:
+            self._reg_groups = _get_regex_groups_uncached(self.pattern)
+        return self._reg_groups
+
+class _ResearchPlanCache(object):
+    '''least recently used cache of ResearchPlans keyed by 
+    (pattern, flags). Safe to use from several threads'''
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.plans = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, regexp, flags = 0):
+        if type(regexp) in (str, unicode):
+            key = regexp, flags
+        else:
+            key = regexp.pattern, regexp.flags
+        with self.lock:
+            plan = self.plans.pop(key, None)
+            if plan != None:
+                self.plans[key] = plan
+                self.hits += 1
+                return plan
+            self.misses += 1
+        if type(regexp) in (str, unicode):
+            regexp = re.compile(regexp, flags)
+        # build outside of the lock, two threads may build the same plan
+        plan = ResearchPlan(regexp)
+        with self.lock:
+            self.plans[key] = plan
+            while len(self.plans) > self.maxsize:
+                self.plans.popitem(last = False)
+        return plan
+    
+    def stats(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 
+                    'size': len(self.plans), 'maxsize': self.maxsize}
+    
+    def clear(self, maxsize = None):
+        with self.lock:
+            self.plans.clear()
+            self.hits = self.misses = 0
+            if maxsize != None:
+                self.maxsize = maxsize
+
+_research_plans = _ResearchPlanCache(RESEARCH_PLAN_CACHE_SIZE)
+
+def get_research_plan(regexp, flags = 0):
+    '''returns the (cached) ResearchPlan of a pattern string and flags or
+    of a compiled regexp'''
+    return _research_plans.get(regexp, flags)
+
+def research_plan_stats():
+    '''returns a dict of the research plan cache's hits, misses, size and 
+    maxsize'''
+    return _research_plans.stats()
+
+def clear_research_plans(maxsize = None):
+    '''empties the research plan cache and resets its stats. Changes the
+    number of plans it keeps if maxsize is given'''
+    _research_plans.clear(maxsize)
+
 def get_rcmp_list(replacement_list):
     '''given a list of [[regex_str, replace_with], ...]
     returns the values or'ed together and the list to be 
@@ -656,6 +1239,16 @@ class subfun(object):
             self.regs.append(matchobj.regs[0])
             return txt
 
+def _replace_file(src, dst):
+    '''rename src to dst, overwriting dst. os.rename won't overwrite on
+    windows and os.replace is python 3 only'''
+    if hasattr(os, 'replace'):
+        os.replace(src, dst)
+        return
+    if os.name == 'nt' and os.path.exists(dst):
+        os.remove(dst)
+    os.rename(src, dst)
+
 def system_replace_regexp(path, regexp, replace):
     '''A powerful tool that is similar to searchmonkey or other tools...
     but actually works for python regexp! Does user output to make sure
@@ -667,34 +1260,47 @@ def system_replace_regexp(path, regexp, replace):
             system_replace_regexp(new_path, regexp, replace)
         return
     
-    with open(path) as f:
-        text = f.read()
-    
     rcmp = re.compile(regexp)
-    if not rcmp.findall(text):
-        print "-- Could not find string on path:", path
-        return
-    
-    mysub = subfun(replace = '')
-    start_text = text
-    text = rcmp.sub(mysub, text)
-    file_msg_start = ('##### About to operate on file < {path} > with the '
-        'following Replacements:')
-    replaceheader = '\n     --- REPLACE ITEM &&&&&&&&&&&&&&&&&&& \n{orig_text}'
-    replace_mid =   '\n     --- WITH ---------------------\n{new_text}'
-    
-    print file_msg_start.format(path = path)
-    for old, new in mysub.subbed:
-        print replaceheader.format(orig_text = old),
-        print replace_mid.format(new_text = new),
-    uin = raw_input("-- IS THIS OK (Y/n):")
-    if uin.lower() == 'y':
-        print '...REPLACING',
-        with open(path, 'w') as f:
-            f.write(text)
-        print 'DONE\n'
-    else:
-        print 'not replacing file\n'
+    dirname, fname = os.path.split(path)
+    tmp_path = os.path.join(dirname, '.' + fname + '.replacing')
+    subbed = []
+    try:
+        # stream the replaced text into a temporary file so the original 
+        # never has to be read into memory at once
+        with open(tmp_path, 'wb') as tmp:
+            for n in re_search_file(rcmp, path, no_groups = True):
+                if type(n) in (str, unicode):
+                    tmp.write(n)
+                else:
+                    new = n.do_replace(replace).get_replaced()
+                    subbed.append((n.text, new))
+                    tmp.write(new)
+        if not subbed:
+            print "-- Could not find string on path:", path
+            return
+        
+        file_msg_start = ('##### About to operate on file < {path} > with '
+            'the following Replacements:')
+        replaceheader = ('\n     --- REPLACE ITEM &&&&&&&&&&&&&&&&&&& '
+            '\n{orig_text}')
+        replace_mid =   '\n     --- WITH ---------------------\n{new_text}'
+        
+        print file_msg_start.format(path = path)
+        for old, new in subbed:
+            print replaceheader.format(orig_text = old),
+            print replace_mid.format(new_text = new),
+        uin = raw_input("-- IS THIS OK (Y/n):")
+        if uin.lower() == 'y':
+            print '...REPLACING',
+            shutil.copymode(path, tmp_path)
+            _replace_file(tmp_path, path)
+            print 'DONE\n'
+        else:
+            print 'not replacing file\n'
+    finally:
+        # not there anymore if it replaced the file
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
     
     print '################################'    
 
@@ -706,6 +1312,7 @@ def re_search_replace(researched, repl, preview = True, remove_plain = False,
         the results
     
     If repl is a function, then it is called given the RegGroupPart object
+    (or RegGroupView if researched is a ResearchResult)
     
     if preview = True then it retuns a data_list with the 
         RegPart objects who's .replace_str member has been updated.